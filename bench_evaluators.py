@@ -0,0 +1,326 @@
+"""
+Benchmarks for the time-range evaluators.
+
+Run `python bench_evaluators.py` to time every scenario, print ops/sec and
+the p50/p99 latency of single calls, and optionally save the results as JSON
+or compare them with a saved baseline:
+
+    python bench_evaluators.py --output baseline.json
+    python bench_evaluators.py --baseline baseline.json --threshold 0.15
+
+The exit status is 1 when a scenario regressed by more than the threshold.
+Everything runs offline with fixed seeds.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import platform
+import random
+import sys
+import time
+
+from conflicts import find_conflicts
+from evaluate_dayandtimerange import (compile_dayandtimerange, evaluate_dayandtimerange,
+                                      evaluate_dayandtimerange_sync, generate_time_ranges)
+from evaluate_timerange import evaluate_timerange, evaluate_timerange_sync
+from rule_index import RuleIndex
+
+NOW = datetime.datetime(2024, 6, 4, 6, 0, 0, tzinfo=datetime.timezone.utc)
+
+TIMERANGE_DATA = {
+    'now': datetime.datetime(2024, 6, 4, 10, 30),
+    'condition': {'not_operator': False},
+    'terms': {'start': '10:00:00', 'end': '11:00:00'},
+}
+
+TIMERANGE_LOGACTION_DATA = {
+    'now': datetime.datetime(2024, 6, 4, 10, 30),
+    'not_operator': False,
+    'start': '10:00:00',
+    'end': '11:00:00',
+}
+
+DAYANDTIMERANGE_TERMS = {
+    'same_day': {
+        'start_day_of_week': 1,
+        'start_time': '08:00:00',
+        'end_day_of_week': 1,
+        'end_time': '18:00:00'
+    },
+    'overnight': {
+        'start_day_of_week': 0,
+        'start_time': '22:00:00',
+        'end_day_of_week': 4,
+        'end_time': '07:30:00'
+    },
+    'cross_week': {
+        'start_day_of_week': 5,
+        'start_time': '22:00:00',
+        'end_day_of_week': 0,
+        'end_time': '07:30:00'
+    },
+}
+
+DAYANDTIMERANGE_DATA = {
+    'now': NOW,
+    'terms': DAYANDTIMERANGE_TERMS['overnight'],
+    'condition': {},
+}
+
+
+def random_terms(rng):
+    return {
+        'start_day_of_week': rng.randrange(7),
+        'start_time': '%02d:%02d:%02d' % (rng.randrange(24), rng.randrange(60), rng.randrange(60)),
+        'end_day_of_week': rng.randrange(7),
+        'end_time': '%02d:%02d:%02d' % (rng.randrange(24), rng.randrange(60), rng.randrange(60)),
+    }
+
+
+def random_instants(rng, count):
+    start = datetime.datetime(2024, 6, 3)
+    return [start + datetime.timedelta(seconds=rng.randrange(7 * 86400)) for _ in range(count)]
+
+
+def scenarios(scale=1):
+    """
+    Returns (name, ops per call, callable) for every benchmark scenario.
+    """
+    rng = random.Random(20240604)
+
+    cases = [
+        ('timerange.terms', 1, lambda: evaluate_timerange_sync(TIMERANGE_DATA)),
+        ('timerange.logaction', 1,
+         lambda: evaluate_timerange_sync(TIMERANGE_LOGACTION_DATA, 'logaction')),
+    ]
+
+    for shape, terms in DAYANDTIMERANGE_TERMS.items():
+        data = {'now': NOW, 'terms': terms, 'condition': {}}
+        logaction = dict(terms, now=NOW)
+        cases.append((f'dayandtimerange.terms.{shape}', 1,
+                      lambda data=data: evaluate_dayandtimerange_sync(data)))
+        cases.append((f'dayandtimerange.logaction.{shape}', 1,
+                      lambda data=logaction: evaluate_dayandtimerange_sync(data, 'logaction')))
+
+    cases.append(('generate_time_ranges', 1,
+                  lambda: generate_time_ranges(6, '22:00:00', 1, '07:30:00')))
+
+    batch_size = 10000 * scale
+    rule = compile_dayandtimerange({'terms': DAYANDTIMERANGE_TERMS['overnight']})
+    instants = random_instants(rng, batch_size)
+    cases.append(('batch.matches', batch_size,
+                  lambda: [rule.matches(instant) for instant in instants]))
+    try:
+        import numpy as np
+        from vectorized import evaluate_array
+    except ImportError:
+        pass
+    else:
+        timestamps = np.array([instant.replace(tzinfo=None) for instant in instants],
+                              dtype='datetime64[us]')
+        cases.append(('batch.vectorized', batch_size, lambda: evaluate_array(rule, timestamps)))
+
+    rule_count = 10000 * scale
+    rules = {rule_id: compile_dayandtimerange({'terms': random_terms(rng)})
+             for rule_id in range(rule_count)}
+    index = RuleIndex(rules)
+    cases.append(('ruleset.scan', rule_count,
+                  lambda: [rule_id for rule_id, rule in rules.items() if rule.matches(NOW)]))
+    cases.append(('ruleset.index', rule_count, lambda: index.active(NOW)))
+
+    return cases
+
+
+def measure(func, ops, samples, min_time, min_calls=200, max_calls=100000):
+    """
+    Times func and returns ops/sec plus p50/p99 latency per op in seconds.
+
+    Throughput comes from samples runs of func repeated enough times to
+    last at least min_time each. Latency comes from timing single calls of
+    func, as many as fit in samples * min_time but no fewer than min_calls,
+    so the p99 reflects slow individual calls rather than slow samples. A
+    call of a batch scenario covers ops operations, so its latency per op
+    is the call's duration divided by ops.
+    """
+    func()
+    repeat = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        repeat *= 2
+
+    total = elapsed
+    for _ in range(samples - 1):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        total += time.perf_counter() - start
+
+    per_call = elapsed / repeat
+    calls = min(max(int(samples * min_time / per_call), min_calls), max_calls)
+    timer = time.perf_counter_ns
+    overhead = min(-timer() + timer() for _ in range(100))
+    latencies = []
+    for _ in range(calls):
+        start = timer()
+        func()
+        latencies.append(max(timer() - start - overhead, 0) / 1e9 / ops)
+    latencies.sort()
+    return {
+        'ops_per_sec': samples * repeat * ops / total,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'calls': calls,
+    }
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    rank = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def run(selected=None, samples=20, min_time=0.01, scale=1):
+    results = {}
+    for name, ops, func in scenarios(scale):
+        if selected and not any(name.startswith(prefix) for prefix in selected):
+            continue
+        results[name] = measure(func, ops, samples, min_time)
+        print_result(name, results[name])
+    return results
+
+
+def print_result(name, result):
+    print(f'{name:40} {result["ops_per_sec"]:14,.0f} ops/s'
+          f'  p50 {result["p50"] * 1e9:10.0f} ns  p99 {result["p99"] * 1e9:10.0f} ns')
+
+
+def compare_results(results, baseline, threshold):
+    """
+    Compares ops/sec against a baseline.
+
+    Returns:
+        list of tuple: (name, baseline ops/sec, current ops/sec, change) for
+            every scenario slower than the baseline by more than threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['ops_per_sec']
+        change = result['ops_per_sec'] / before - 1
+        if change < -threshold:
+            regressions.append((name, before, result['ops_per_sec'], change))
+    return regressions
+
+
+def time_sync(func, data, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func(data)
+    return (time.perf_counter() - start) / number
+
+
+def time_await(coroutine_func, data, number):
+    async def run():
+        start = time.perf_counter()
+        for _ in range(number):
+            await coroutine_func(data)
+        return (time.perf_counter() - start) / number
+    return asyncio.run(run())
+
+
+def time_asyncio_run(coroutine_func, data, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        asyncio.run(coroutine_func(data))
+    return (time.perf_counter() - start) / number
+
+
+def bench_call_overhead(number=100000):
+    """
+    Compares the per-call cost of the sync fast path and the coroutine paths.
+    """
+    cases = [
+        ('evaluate_timerange', evaluate_timerange_sync, evaluate_timerange, TIMERANGE_DATA),
+        ('evaluate_dayandtimerange', evaluate_dayandtimerange_sync,
+         evaluate_dayandtimerange, DAYANDTIMERANGE_DATA),
+    ]
+    for name, sync_func, coroutine_func, data in cases:
+        sync_cost = time_sync(sync_func, data, number)
+        await_cost = time_await(coroutine_func, data, number)
+        run_cost = time_asyncio_run(coroutine_func, data, max(number // 100, 1))
+        print(f'{name}:')
+        print(f'  sync            {sync_cost * 1e9:10.0f} ns/call')
+        print(f'  await in loop   {await_cost * 1e9:10.0f} ns/call')
+        print(f'  asyncio.run     {run_cost * 1e9:10.0f} ns/call')
+
+
+def bench_conflicts(count=100000):
+    """
+    Times find_conflicts over a large set of random rules.
+    """
+    rng = random.Random(20240604)
+    rules = {f'r{index}': compile_dayandtimerange({'terms': random_terms(rng)})
+             for index in range(count)}
+    start = time.perf_counter()
+    report = find_conflicts(rules)
+    elapsed = time.perf_counter() - start
+    print(f'find_conflicts: {count:,} rules in {elapsed:.2f} s, '
+          f'{len(report.overlaps):,} overlaps, {len(report.shadowed):,} shadowed')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('scenarios', nargs='*', help='only run scenarios starting with these names')
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--min-time', type=float, default=0.01,
+                        help='minimum duration of one sample in seconds')
+    parser.add_argument('--scale', type=int, default=1, help='multiplier for batch and rule-set sizes')
+    parser.add_argument('--output', help='save the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against results saved with --output')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed ops/sec drop against the baseline, as a fraction')
+    parser.add_argument('--call-overhead', action='store_true',
+                        help='only compare the sync and async call paths')
+    parser.add_argument('--conflicts', type=int, metavar='RULES',
+                        help='only time find_conflicts over this many random rules')
+    args = parser.parse_args(argv)
+
+    if args.call_overhead:
+        bench_call_overhead()
+        return 0
+    if args.conflicts:
+        bench_conflicts(args.conflicts)
+        return 0
+
+    results = run(args.scenarios, args.samples, args.min_time, args.scale)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare_results(results, json.load(baseline)['results'], args.threshold)
+        for name, before, after, change in regressions:
+            print(f'REGRESSION {name}: {before:,.0f} -> {after:,.0f} ops/s ({change:+.1%})')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
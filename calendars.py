@@ -0,0 +1,322 @@
+"""
+Date-bound rules: validity periods, exception calendars and closures.
+
+A CalendarRule wraps a compiled weekly rule (TimeRange or DayAndTimeRange)
+and switches it off outside an absolute date range, on the days of an
+exception calendar (e.g. public holidays), and during one-off closures
+(e.g. maintenance windows). Days are kept as a frozenset of date ordinals
+and closures as sorted boundaries, so a check costs one set lookup and one
+bisect on top of the weekly rule.
+
+Calendars are registered once by name and shared by every rule that refers
+to them.
+"""
+import bisect
+import datetime
+import itertools
+
+from evaluate_dayandtimerange import rule_cache as dayandtimerange_cache
+from immutable import Immutable
+from rule_errors import InvalidDateError, InvalidSourceError, UnknownCalendarError
+from timezones import wall_date
+from weekline import (MICROS_PER_DAY, MICROS_PER_SECOND, MICROS_PER_WEEK, boundaries, contains,
+                      merge_intervals, wall_micros)
+
+
+class Calendar(Immutable):
+    """
+    An immutable set of days.
+
+    Args:
+        dates (iterable): datetime.date objects or ISO 'YYYY-MM-DD' strings.
+        name (str): Optional name, for display.
+
+    Examples:
+        >>> holidays = Calendar(['2024-12-25', datetime.date(2024, 12, 26)], 'xmas')
+        >>> datetime.date(2024, 12, 25) in holidays, datetime.date(2024, 12, 27) in holidays
+        (True, False)
+    """
+    __slots__ = ('name', 'ordinals')
+
+    def __init__(self, dates=(), name=None):
+        ordinals = frozenset(_parse_date(value, 'exceptions').toordinal() for value in dates)
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'ordinals', ordinals)
+
+    def __contains__(self, day):
+        if isinstance(day, datetime.date):
+            day = day.toordinal()
+        return day in self.ordinals
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def __or__(self, other):
+        if not isinstance(other, Calendar):
+            return NotImplemented
+        return Calendar(self.dates() + other.dates())
+
+    def dates(self):
+        """
+        Returns the days as a sorted list of datetime.date.
+        """
+        return [datetime.date.fromordinal(ordinal) for ordinal in sorted(self.ordinals)]
+
+    def __reduce__(self):
+        return (Calendar, (self.dates(), self.name))
+
+    def __eq__(self, other):
+        if not isinstance(other, Calendar):
+            return NotImplemented
+        return self.ordinals == other.ordinals
+
+    def __hash__(self):
+        return hash(self.ordinals)
+
+    def __repr__(self):
+        return f'Calendar(<{len(self.ordinals)} days>, name={self.name!r})'
+
+
+_calendars = {}
+
+
+def register_calendar(name, dates):
+    """
+    Registers (or replaces) a named calendar that rule terms can refer to.
+
+    Returns:
+        Calendar: The shared calendar.
+    """
+    calendar = dates if isinstance(dates, Calendar) else Calendar(dates, name)
+    _calendars[name] = calendar
+    return calendar
+
+
+def get_calendar(name):
+    """
+    Returns a registered calendar.
+
+    Raises:
+        UnknownCalendarError: If no calendar has that name.
+    """
+    try:
+        return _calendars[name]
+    except (KeyError, TypeError):
+        raise UnknownCalendarError('exceptions', f'unknown calendar {name!r}', name) from None
+
+
+class CalendarRule(Immutable):
+    """
+    A weekly rule limited to a date range, minus exception days and closures.
+
+    Dates are read on the wall clock of the weekly rule's zone. The rule
+    does not match at all outside valid_from..valid_until, on exception
+    days or inside a closure, whatever its not_operator.
+
+    Args:
+        rule (TimeRange or DayAndTimeRange): The compiled weekly rule.
+        valid_from (datetime.date): First day the rule applies; None is unbounded.
+        valid_until (datetime.date): Last day the rule applies (inclusive);
+            None is unbounded.
+        exceptions (Calendar): Days the rule does not apply.
+        closures (iterable): Half-open (start, end) naive datetime pairs,
+            in the rule's wall-clock time, during which the rule does not apply.
+
+    Examples:
+        >>> from evaluate_dayandtimerange import DayAndTimeRange
+        >>> office = DayAndTimeRange(0, 9 * 3600, 4, 17 * 3600)
+        >>> rule = CalendarRule(office, exceptions=Calendar(['2024-12-25']))
+        >>> rule.matches(datetime.datetime(2024, 12, 24, 10, 0))
+        True
+        >>> rule.matches(datetime.datetime(2024, 12, 25, 10, 0))
+        False
+    """
+    __slots__ = ('rule', 'valid_from', 'valid_until', 'exceptions', 'closures',
+                 '_first', '_last', '_closed')
+
+    def __init__(self, rule, valid_from=None, valid_until=None, exceptions=None, closures=()):
+        closures = tuple(sorted(closures))
+        object.__setattr__(self, 'rule', rule)
+        object.__setattr__(self, 'valid_from', valid_from)
+        object.__setattr__(self, 'valid_until', valid_until)
+        object.__setattr__(self, 'exceptions', exceptions if exceptions is not None else Calendar())
+        object.__setattr__(self, 'closures', closures)
+        object.__setattr__(self, '_first', valid_from.toordinal() if valid_from else 0)
+        object.__setattr__(self, '_last', valid_until.toordinal() if valid_until else float('inf'))
+        object.__setattr__(self, '_closed', boundaries(merge_intervals(
+            (wall_micros(start), wall_micros(end)) for start, end in closures)))
+
+    @property
+    def tz(self):
+        return self.rule.tz
+
+    def _key(self):
+        return (self.rule, self.valid_from, self.valid_until, self.exceptions, self.closures)
+
+    def __reduce__(self):
+        return (CalendarRule, self._key())
+
+    def __eq__(self, other):
+        if not isinstance(other, CalendarRule):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (f'CalendarRule({self.rule!r}, valid_from={self.valid_from!r}, '
+                f'valid_until={self.valid_until!r}, exceptions={self.exceptions!r}, '
+                f'closures=<{len(self.closures)}>)')
+
+    def matches(self, now):
+        """
+        Evaluates the rule against a datetime.
+        """
+        ordinal, seconds, microsecond = wall_date(now, self.rule.tz)
+        if not self._first <= ordinal <= self._last or ordinal in self.exceptions.ordinals:
+            return False
+        closed = self._closed
+        if closed and contains(closed, ordinal * MICROS_PER_DAY + seconds * MICROS_PER_SECOND + microsecond):
+            return False
+        return self.rule.matches_at((ordinal - 1) % 7, seconds + microsecond / 1e6)
+
+    def iter_ranges(self, anchor, until=None):
+        """
+        Lazily yields the periods during which the rule matches.
+
+        The periods come from the weekly rule's week_intervals(), so they
+        agree with matches(), not_operator and cross-week ranges included.
+        They are half-open: the end is the first instant that no longer
+        matches. A period running across the end of a week is yielded as
+        one piece, and one already running at the start of the first week
+        starts at that Monday's midnight. Periods are cut where they cross
+        an exception day, a closure or the validity period, and pieces left
+        empty are skipped; a cut ends or starts a piece at the midnight or
+        closure boundary.
+
+        Args:
+            anchor (datetime.date): Any day of the first week.
+            until (datetime.datetime): Stop before the first period starting
+                at or after this instant. None stops after valid_until, or
+                never if that is unbounded too.
+
+        Yields:
+            tuple: The start and end datetime of each piece.
+        """
+        intervals = self.rule.week_intervals()
+        if not intervals:
+            return
+        if self.valid_until is not None:
+            last = datetime.datetime.combine(self.valid_until + datetime.timedelta(days=1),
+                                             datetime.time())
+            until = last if until is None else min(until, last)
+        if self.valid_from is not None and anchor < self.valid_from:
+            anchor = self.valid_from
+        limit = None if until is None else wall_micros(until)
+        monday = (anchor.toordinal() - anchor.weekday()) * MICROS_PER_DAY
+        pending = None
+        for week in itertools.count():
+            base = monday + week * MICROS_PER_WEEK
+            for start, stop in intervals:
+                start += base
+                stop += base
+                if pending is not None:
+                    # Join periods meeting at the week wrap, but never make
+                    # an always-active rule one endless piece
+                    if pending[1] == start and pending[1] - pending[0] < MICROS_PER_WEEK:
+                        pending = (pending[0], stop)
+                        continue
+                    yield from self._cut(*pending)
+                if limit is not None and start >= limit:
+                    return
+                pending = (start, stop)
+
+    def _cut(self, lo, hi):
+        blocked = []
+        for ordinal in range(lo // MICROS_PER_DAY, hi // MICROS_PER_DAY + 1):
+            if not self._first <= ordinal <= self._last or ordinal in self.exceptions.ordinals:
+                blocked.append((ordinal * MICROS_PER_DAY, (ordinal + 1) * MICROS_PER_DAY))
+        closed = self._closed
+        index = bisect.bisect_right(closed, lo) & ~1
+        while index < len(closed) and closed[index] <= hi:
+            blocked.append((closed[index], closed[index + 1]))
+            index += 2
+        position = lo
+        for block_start, block_stop in merge_intervals(blocked):
+            if block_start > position:
+                yield _datetime(position), _datetime(min(block_start, hi))
+            position = max(position, block_stop)
+            if position >= hi:
+                return
+        if position < hi:
+            yield _datetime(position), _datetime(hi)
+
+
+def compile_calendar_rule(data, src=None):
+    """
+    Compiles day-and-time-range terms with optional date terms.
+
+    Besides the terms accepted by compile_dayandtimerange, the terms may
+    hold 'valid_from' and 'valid_until' (ISO dates), 'exceptions' (the name
+    of a registered calendar, or a list of ISO dates) and 'closures' (a list
+    of [start, end] ISO datetimes).
+
+    Args:
+        data (dict): Either the flat logaction dict (src='logaction') or a
+            dict with 'terms' and 'condition' (src=None).
+        src (str): The source of data, 'logaction' or None.
+
+    Returns:
+        CalendarRule: The compiled rule.
+
+    Raises:
+        InvalidDateError: If a date or datetime cannot be read.
+        UnknownCalendarError: If 'exceptions' names an unregistered calendar.
+        RuleError: As raised by compile_dayandtimerange.
+    """
+    if src == 'logaction':
+        terms = data
+    elif src is None:
+        terms = data.get('terms', {})
+    else:
+        raise InvalidSourceError('src', f'invalid src {src!r}', src)
+
+    exceptions = terms.get('exceptions')
+    if isinstance(exceptions, str):
+        exceptions = get_calendar(exceptions)
+    elif exceptions is not None:
+        exceptions = Calendar(exceptions)
+    valid_from = terms.get('valid_from')
+    valid_until = terms.get('valid_until')
+    return CalendarRule(
+        dayandtimerange_cache.compile(data, src),
+        _parse_date(valid_from, 'valid_from') if valid_from is not None else None,
+        _parse_date(valid_until, 'valid_until') if valid_until is not None else None,
+        exceptions,
+        [(_parse_datetime(start, 'closures'), _parse_datetime(end, 'closures'))
+         for start, end in terms.get('closures', ())])
+
+
+def _parse_date(value, field):
+    if isinstance(value, datetime.datetime):
+        raise InvalidDateError(field, f'expected a date, got {value!r}', value)
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidDateError(field, f'expected a YYYY-MM-DD date, got {value!r}', value) from None
+
+
+def _parse_datetime(value, field):
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidDateError(field, f'expected an ISO datetime, got {value!r}', value) from None
+
+
+def _datetime(position):
+    return datetime.datetime.min + datetime.timedelta(microseconds=position - MICROS_PER_DAY)
@@ -0,0 +1,178 @@
+"""
+Sweep-line analysis of overlaps, gaps and shadowed rules in a rule set.
+
+Every rule is projected onto the week line with week_intervals(), which
+already accounts for not_operator, overnight ranges and the wrap around the
+end of the week. One sorted pass over the interval ends then visits every
+elementary segment of the week together with the rules active in it, so the
+analysis costs O(m log m) for m intervals plus the size of what is reported.
+Positions are microseconds-of-week, as everywhere on the week line.
+"""
+import collections
+
+from weekline import MICROS_PER_WEEK
+
+ConflictReport = collections.namedtuple('ConflictReport', ['overlaps', 'gaps', 'shadowed', 'empty'])
+ConflictReport.__doc__ = """\
+Result of find_conflicts().
+
+Attributes:
+    overlaps (tuple): (start, stop, count) segments where two or more rules
+        are active, count being how many.
+    gaps (tuple): (start, stop) segments where no rule is active.
+
+A segment running across the end of the week is reported once, last, with
+a stop past MICROS_PER_WEEK.
+    shadowed (set): IDs of rules that are never the only active rule, i.e.
+        whose every active moment is covered by other rules.
+    empty (set): IDs of rules that are never active.
+"""
+
+
+def _intervals(rules):
+    # week_intervals() of every rule, in the order of rules
+    zones = {rule.tz for rule in rules.values()}
+    if len(zones) > 1:
+        raise ValueError(f'rules in different zones cannot share a week line: {sorted(map(str, zones))}')
+    return [rule.week_intervals() for rule in rules.values()]
+
+
+def _events(intervals):
+    # Interval ends packed into integers that sort by position, then with
+    # stops first at equal positions since intervals are half-open, then by
+    # serial. Integers sort several times faster than tuples.
+    shift = max(len(intervals) - 1, 0).bit_length()
+    events = []
+    append = events.append
+    for serial, rule_intervals in enumerate(intervals):
+        for start, stop in rule_intervals:
+            append((start << 1 | 1) << shift | serial)
+            append(stop << 1 + shift | serial)
+    events.sort()
+    return events, shift
+
+
+def _sweep(rules, intervals):
+    # Yields (start, stop, active) for consecutive segments of the week.
+    # active is a live dict of serial -> rule ID; callers copy what they keep.
+    events, shift = _events(intervals)
+    mask = (1 << shift) - 1
+    ids = list(rules)
+    active = {}
+    position = 0
+    for event in events:
+        point = event >> shift + 1
+        if point > position:
+            yield position, point, active
+            position = point
+        serial = event & mask
+        if event >> shift & 1:
+            active[serial] = ids[serial]
+        else:
+            del active[serial]
+    if position < MICROS_PER_WEEK:
+        yield position, MICROS_PER_WEEK, active
+
+
+def find_conflicts(rules):
+    """
+    Finds overlaps, coverage gaps, shadowed and empty rules.
+
+    Args:
+        rules (dict): Mapping of rule ID to a compiled rule (or Schedule);
+            all rules must share a zone.
+
+    Returns:
+        ConflictReport: The findings.
+
+    Raises:
+        ValueError: If the rules are in different zones.
+
+    Examples:
+        >>> from evaluate_dayandtimerange import DayAndTimeRange
+        >>> report = find_conflicts({
+        ...     'day': DayAndTimeRange(0, 8 * 3600, 4, 16 * 3600 - 1, resolution='second'),
+        ...     'late': DayAndTimeRange(0, 14 * 3600, 4, 22 * 3600 - 1, resolution='second'),
+        ...     'monday': DayAndTimeRange(0, 9 * 3600, 0, 10 * 3600 - 1, resolution='second')})
+        >>> report.overlaps[:2]
+        ((32400000000, 36000000000, 2), (50400000000, 57600000000, 2))
+        >>> report.shadowed, len(report.gaps)
+        ({'monday'}, 5)
+    """
+    intervals = _intervals(rules)
+    overlaps = []
+    gaps = []
+    exclusive = set()
+    first = last = None
+    for start, stop, active in _sweep(rules, intervals):
+        count = len(active)
+        if start == 0:
+            first = set(active)
+        if stop == MICROS_PER_WEEK:
+            last = set(active)
+        if count == 0:
+            gaps.append((start, stop))
+        elif count == 1:
+            exclusive.update(active.values())
+        else:
+            overlaps.append((start, stop, count))
+    if first == last and len(first) != 1:
+        # The segments on both sides of the week boundary are one segment
+        segments = gaps if not first else overlaps
+        if len(segments) > 1:
+            head = segments.pop(0)
+            segments[-1] = (segments[-1][0], head[1] + MICROS_PER_WEEK) + head[2:]
+    empty = {rule_id for rule_id, values in zip(rules, intervals) if not values}
+    shadowed = set(rules) - exclusive - empty
+    return ConflictReport(tuple(overlaps), tuple(gaps), shadowed, empty)
+
+
+def overlap_groups(rules, min_size=2):
+    """
+    Yields every segment of the week where at least min_size rules are active.
+
+    Segments are cut at the end of the week, unlike in find_conflicts, so
+    that they can be yielded as the sweep reaches them.
+
+    Yields:
+        tuple: (start, stop, frozenset of rule IDs).
+    """
+    for start, stop, active in _sweep(rules, _intervals(rules)):
+        if len(active) >= min_size:
+            yield start, stop, frozenset(active.values())
+
+
+def overlapping_pairs(rules):
+    """
+    Yields every pair of rules that are active at the same time, once.
+
+    Each pair is yielded when the later rule (in the order of rules) first
+    starts while the other is active. Rules with several weekly intervals
+    meet the same active rules again at each of their starts, and those
+    repeats are only filtered out through the set of pairs already seen,
+    so the cost grows with the number of times rules start while others
+    are active, not with the number of distinct pairs. It still avoids
+    comparing every rule with every other.
+
+    Raises:
+        ValueError: If the rules are in different zones.
+
+    Yields:
+        tuple: (rule ID, rule ID), in the order of rules.
+    """
+    seen = set()
+    ids = list(rules)
+    active = set()
+    events, shift = _events(_intervals(rules))
+    mask = (1 << shift) - 1
+    for event in events:
+        serial = event & mask
+        if not event >> shift & 1:
+            active.discard(serial)
+            continue
+        for other in active:
+            pair = (other, serial) if other < serial else (serial, other)
+            if pair not in seen:
+                seen.add(pair)
+                yield ids[pair[0]], ids[pair[1]]
+        active.add(serial)
@@ -1,4 +1,15 @@
+import asyncio
 import datetime
+import itertools
+
+from immutable import Immutable
+from instrumentation import profiler
+from rule_cache import RuleCache
+from rule_errors import InvalidDayError, InvalidSourceError, MissingFieldError, errors
+from timeparse import parse_time, seconds_of_day
+from timezones import EPOCH_ORDINAL, validate_zone, wall_clock
+from weekline import (MICROS_PER_DAY, MICROS_PER_SECOND, complement_intervals,
+                      daily_intervals, resolution_step, truncated_window)
 
 
 async def evaluate_time_range_same_day(current_time, start_time, end_time):
@@ -130,9 +141,9 @@ def generate_time_ranges(start_day, start_time, end_day, end_time):
 
     Args:
         start_day (int): The start day of the week (0-6, where 0 is Monday).
-        start_time (str): The start time in HH:MM:SS format.
+        start_time (str): The start time in HH:MM:SS or HH:MM format.
         end_day (int): The end day of the week (0-6, where 0 is Monday).
-        end_time (str): The end time in HH:MM:SS format.
+        end_time (str): The end time in HH:MM:SS or HH:MM format.
 
     Returns:
         list of tuples: Each tuple contains the start and end datetime objects for the time ranges.
@@ -141,59 +152,419 @@ def generate_time_ranges(start_day, start_time, end_day, end_time):
         >>> generate_time_ranges(0, '22:00:00', 2, '07:30:00')
         [(datetime.datetime(2024, 6, 2, 22, 0), datetime.datetime(2024, 6, 3, 7, 30)), ...]
     """
-    time_ranges = []
+    today = datetime.datetime.today()
+    return list(itertools.islice(
+        iter_time_ranges(start_day, start_time, end_day, end_time, today),
+        _days_per_week(start_day, end_day)))
 
-    if isinstance(start_time, str):
-        start_time = datetime.datetime.strptime(start_time, "%H:%M:%S").time()
-    if isinstance(end_time, str):
-        end_time = datetime.datetime.strptime(end_time, "%H:%M:%S").time()
 
-    today = datetime.datetime.today()
-    current_weekday = today.weekday()
-    base_date = today - datetime.timedelta(days=current_weekday)
+def _days_per_week(start_day, end_day):
+    _check_day(start_day, 'start_day', strict=True)
+    _check_day(end_day, 'end_day', strict=True)
+    return (end_day - start_day) % 7 + 1
+
+
+def _time_of_day(value, field):
+    if isinstance(value, str):
+        return parse_time(value, field)
+    return value
+
+
+def _iter_day_ordinals(start_day, end_day, anchor, cursor):
+    # Yields the ordinal of the day each occurrence starts on, in order
+    days_per_week = _days_per_week(start_day, end_day)
+    week_start = anchor.toordinal() - anchor.weekday() + start_day
+    week, offset = divmod(cursor, days_per_week)
+    while True:
+        base = week_start + 7 * week
+        for day in range(offset, days_per_week):
+            yield base + day
+        week += 1
+        offset = 0
+
+
+def iter_time_ranges(start_day, start_time, end_day, end_time, anchor, until=None, cursor=0):
+    """
+    Lazily yields the occurrences of a weekly time range, week after week.
+
+    The first week is the one containing anchor, and occurrences follow the
+    same per-day windows as generate_time_ranges. Nothing is materialized,
+    so memory stays flat over any horizon.
+
+    Args:
+        start_day (int): The start day of the week (0-6, where 0 is Monday).
+        start_time (str or datetime.time): The start time in HH:MM:SS or HH:MM format.
+        end_day (int): The end day of the week (0-6, where 0 is Monday).
+        end_time (str or datetime.time): The end time in HH:MM:SS or HH:MM format.
+        anchor (datetime.date): Any day of the first week.
+        until (datetime.datetime): Stop before the first occurrence starting
+            at or after this instant. None never stops.
+        cursor (int): Number of occurrences to skip, e.g. the number already
+            consumed when resuming an earlier iteration.
+
+    Yields:
+        tuple: The start and end datetime of each occurrence.
+
+    Examples:
+        >>> ranges = iter_time_ranges(5, '23:00:00', 6, '01:00:00', datetime.date(2024, 6, 4))
+        >>> next(ranges)
+        (datetime.datetime(2024, 6, 8, 23, 0), datetime.datetime(2024, 6, 9, 1, 0))
+    """
+    start_time = _time_of_day(start_time, 'start_time')
+    end_time = _time_of_day(end_time, 'end_time')
+    overnight = start_time > end_time
+    combine = datetime.datetime.combine
+    from_ordinal = datetime.date.fromordinal
+
+    for ordinal in _iter_day_ordinals(start_day, end_day, anchor, cursor):
+        start_dt = combine(from_ordinal(ordinal), start_time)
+        if until is not None and start_dt >= until:
+            return
+        end_dt = combine(from_ordinal(ordinal + overnight), end_time)
+        yield (start_dt, end_dt)
+
+
+def iter_epoch_ranges(start_day, start_time, end_day, end_time, anchor, until=None, cursor=0):
+    """
+    Same as iter_time_ranges, but yields integer epoch seconds.
+
+    Naive wall times are read as UTC. No datetime object is created per
+    occurrence.
+
+    Args:
+        until (int): Stop before the first occurrence starting at or after
+            this epoch second. None never stops.
+
+    Yields:
+        tuple: The start and end of each occurrence in seconds since the epoch.
 
-    def create_range(current_date, start_time, end_time):
-        start_dt = datetime.datetime.combine(current_date, start_time)
-        if start_time <= end_time:
-            end_dt = datetime.datetime.combine(current_date, end_time)
+    Examples:
+        >>> next(iter_epoch_ranges(1, '08:00:00', 1, '18:00:00', datetime.date(2024, 6, 4)))
+        (1717488000, 1717524000)
+    """
+    start = seconds_of_day(start_time, 'start_time', allow_time=True)
+    end = seconds_of_day(end_time, 'end_time', allow_time=True)
+    if start > end:
+        end += 86400
+
+    for ordinal in _iter_day_ordinals(start_day, end_day, anchor, cursor):
+        midnight = (ordinal - EPOCH_ORDINAL) * 86400
+        if until is not None and midnight + start >= until:
+            return
+        yield (midnight + start, midnight + end)
+
+
+def fill_epoch_ranges(out, start_day, start_time, end_day, end_time, anchor, until=None, cursor=0):
+    """
+    Fills a preallocated flat buffer with epoch-second occurrence pairs.
+
+    Pairs are written as out[0], out[1], out[2], ... so any writable
+    sequence works, e.g. array.array('q', bytes(16 * n)) or a 1-D int64
+    numpy array.
+
+    Args:
+        out: The buffer; at most len(out) // 2 occurrences are written.
+        The remaining arguments are the same as for iter_epoch_ranges.
+
+    Returns:
+        int: The number of occurrences written. Pass cursor + this value as
+            cursor to continue where the buffer ended.
+    """
+    count = 0
+    ranges = iter_epoch_ranges(start_day, start_time, end_day, end_time, anchor, until, cursor)
+    for start, end in itertools.islice(ranges, len(out) // 2):
+        out[2 * count] = start
+        out[2 * count + 1] = end
+        count += 1
+    return count
+
+
+class DayAndTimeRange(Immutable):
+    """
+    Compiled day-and-time-range rule.
+
+    The days are kept as weekday numbers and the times as integer
+    seconds-of-day, so evaluating the rule never has to parse a time string.
+    Instances are immutable; build them once with compile_dayandtimerange and
+    reuse them for every check. A bound of -1 marks the rule as unset, in
+    which case it never matches (before not_operator is applied).
+
+    Args:
+        start_day (int): Start day of the week (0-6, where 0 is Monday).
+        start (int): Start time in seconds since midnight.
+        end_day (int): End day of the week (0-6, where 0 is Monday).
+        end (int): End time in seconds since midnight (inclusive).
+        not_operator (bool): Invert the result of the check.
+        tz (str): IANA zone the days and times are expressed in. Aware
+            datetimes are converted to it before the check; None reads them
+            as they are.
+        resolution (str): 'microsecond' (the default), 'second' or 'minute';
+            the current time is truncated to it before it is compared with
+            the bounds.
+
+    Examples:
+        >>> rule = DayAndTimeRange(0, 22 * 3600, 4, 7 * 3600 + 1800)
+        >>> rule.matches(datetime.datetime(2024, 6, 4, 6, 0))
+        True
+    """
+    __slots__ = ('start_day', 'start', 'end_day', 'end', 'not_operator', 'tz',
+                 'resolution', '_step', '_unset')
+
+    def __init__(self, start_day, start, end_day, end, not_operator=False, tz=None,
+                 resolution='microsecond'):
+        step = resolution_step(resolution)
+        object.__setattr__(self, 'start_day', start_day)
+        object.__setattr__(self, 'start', start)
+        object.__setattr__(self, 'end_day', end_day)
+        object.__setattr__(self, 'end', end)
+        object.__setattr__(self, 'not_operator', not_operator)
+        object.__setattr__(self, 'tz', tz)
+        object.__setattr__(self, 'resolution', resolution)
+        # Truncation step in seconds; None keeps the fraction of a second
+        object.__setattr__(self, '_step', None if step == 1 else step // MICROS_PER_SECOND)
+        object.__setattr__(self, '_unset', -1 in (start_day, start, end_day, end))
+
+    def _key(self):
+        return (self.start_day, self.start, self.end_day, self.end,
+                self.not_operator, self.tz, self.resolution)
+
+    def __reduce__(self):
+        return (type(self), self._key())
+
+    def __eq__(self, other):
+        if not isinstance(other, DayAndTimeRange):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash((DayAndTimeRange,) + self._key())
+
+    def __repr__(self):
+        return (f'DayAndTimeRange(start_day={self.start_day}, start={self.start}, '
+                f'end_day={self.end_day}, end={self.end}, '
+                f'not_operator={self.not_operator}, tz={self.tz!r}, '
+                f'resolution={self.resolution!r})')
+
+    def matches(self, now):
+        """
+        Evaluates the rule against a datetime.
+
+        The datetime is read in its own timezone unless the rule has a zone
+        and the datetime is aware, in which case it is converted first.
+        """
+        if self.tz is not None and now.tzinfo is not None:
+            return self.matches_at(*wall_clock(now, self.tz))
+        return self.matches_at(
+            now.weekday(),
+            now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6)
+
+    def matches_at(self, weekday, seconds):
+        """
+        Evaluates the rule against an already decomposed instant.
+
+        Args:
+            weekday (int): The weekday (0-6, where 0 is Monday).
+            seconds (float): Seconds since midnight, including any fraction.
+
+        Returns:
+            bool: True if the instant is within the range, else False.
+        """
+        if self._unset:
+            return self.not_operator ^ False
+
+        step = self._step
+        if step is not None:
+            seconds -= seconds % step
+
+        start_day = self.start_day
+        end_day = self.end_day
+        start = self.start
+        end = self.end
+
+        if start <= end:
+            in_range = start <= seconds <= end
+        else:
+            in_range = seconds >= start or seconds <= end
+
+        if start_day <= end_day:
+            result = start_day <= weekday <= end_day and in_range
+        else:
+            # Adjust for cross-week evaluation
+            weekday = (weekday + 1) % 7
+            if weekday > start_day or weekday < end_day:
+                result = in_range
+            elif weekday == start_day:
+                result = seconds >= start
+            elif weekday == end_day:
+                result = seconds <= end
+            else:
+                result = False
+
+        return self.not_operator ^ result
+
+    def week_intervals(self):
+        """
+        Projects the rule onto the week line, not_operator included.
+
+        The projection follows matches_at day by day, including the
+        cross-week weekday adjustment, so checking a position against the
+        intervals gives the same answer as evaluating the rule.
+
+        Returns:
+            tuple: Merged half-open (start, stop) microsecond-of-week intervals.
+        """
+        intervals = () if self._unset else daily_intervals(self._day_windows)
+        if self.not_operator:
+            return complement_intervals(intervals)
+        return intervals
+
+    def _day_windows(self, weekday):
+        start_day = self.start_day
+        end_day = self.end_day
+        # The end bound is inclusive down to the resolution
+        start, stop = truncated_window(self.start, self.end, self.resolution)
+
+        if self.start <= self.end:
+            in_range = ((start, stop),)
         else:
-            end_dt = datetime.datetime.combine(
-                current_date + datetime.timedelta(days=1), end_time)
-        return (start_dt, end_dt)
-
-    if start_day == end_day:
-        current_date = base_date + datetime.timedelta(days=start_day)
-        time_ranges.append(create_range(current_date, start_time, end_time))
-    elif start_day < end_day:
-        current_date = base_date + datetime.timedelta(days=start_day)
-        while current_date.weekday() != end_day:
-            time_ranges.append(create_range(
-                current_date, start_time, end_time))
-            current_date += datetime.timedelta(days=1)
-        time_ranges.append(create_range(current_date, start_time, end_time))
+            in_range = ((0, stop), (start, MICROS_PER_DAY))
+
+        if start_day <= end_day:
+            return in_range if start_day <= weekday <= end_day else ()
+
+        weekday = (weekday + 1) % 7
+        if weekday > start_day or weekday < end_day:
+            return in_range
+        if weekday == start_day:
+            return ((start, MICROS_PER_DAY),)
+        if weekday == end_day:
+            return ((0, stop),)
+        return ()
+
+
+def _check_day(value, field, strict=False):
+    # Outside strict mode any number is compared as it is, as the evaluators
+    # always did; only values that cannot be compared with a weekday fail.
+    if strict:
+        if type(value) is not int or not 0 <= value <= 6:
+            raise InvalidDayError(field, f'expected a weekday between 0 and 6, got {value!r}',
+                                  value)
+    elif not isinstance(value, (int, float)):
+        raise InvalidDayError(field, f'expected a weekday number, got {value!r}', value)
+    return value
+
+
+def _read_terms(data, src):
+    if src == 'logaction':
+        not_operator = data.get('not_operator', False)
+        start_day_of_week = data.get('start_day_of_week', -1)
+        start_time = data.get('start_time', '-1:-1:-1')
+        end_day_of_week = data.get('end_day_of_week', -1)
+        end_time = data.get('end_time', '-1:-1:-1')
+        tz = data.get('timezone')
+        resolution = data.get('resolution', 'microsecond')
+
+    elif src is None:
+        terms = data.get('terms', {})
+        condition = data.get('condition', {})
+        not_operator = condition.get('not_operator', False)
+        start_day_of_week = terms.get('start_day_of_week', -1)
+        start_time = terms.get('start_time', '-1:-1:-1')
+        end_day_of_week = terms.get('end_day_of_week', -1)
+        end_time = terms.get('end_time', '-1:-1:-1')
+        tz = terms.get('timezone')
+        resolution = terms.get('resolution', 'microsecond')
+
     else:
-        current_date = base_date + datetime.timedelta(days=start_day)
-        while current_date.weekday() != end_day:
-            time_ranges.append(create_range(
-                current_date, start_time, end_time))
-            current_date += datetime.timedelta(days=1)
-        time_ranges.append(create_range(current_date, start_time, end_time))
+        raise InvalidSourceError('src', f'invalid src {src!r}', src)
 
-    return time_ranges
+    return not_operator, start_day_of_week, start_time, end_day_of_week, end_time, tz, resolution
 
 
-async def evaluate_dayandtimerange(data, src=None):
+def _build_rule(not_operator, start_day_of_week, start_time, end_day_of_week, end_time, tz,
+                resolution, strict=False):
+    if start_day_of_week == -1 or \
+            start_time == '-1:-1:-1' or \
+            end_day_of_week == -1 or \
+            end_time == '-1:-1:-1':
+        return DayAndTimeRange(-1, -1, -1, -1, not_operator, resolution=resolution)
+
+    return DayAndTimeRange(_check_day(start_day_of_week, 'start_day_of_week', strict),
+                           seconds_of_day(start_time, 'start_time', allow_time=True),
+                           _check_day(end_day_of_week, 'end_day_of_week', strict),
+                           seconds_of_day(end_time, 'end_time', allow_time=True),
+                           not_operator, validate_zone(tz), resolution)
+
+
+_UNSET = (('start_day_of_week', -1), ('start_time', '-1:-1:-1'),
+          ('end_day_of_week', -1), ('end_time', '-1:-1:-1'))
+
+
+def compile_dayandtimerange(data, src=None, strict=False):
+    """
+    Compiles the terms of a day-and-time-range check into a DayAndTimeRange.
+
+    Args:
+        data (dict): Either the flat logaction dict (src='logaction') or a
+            dict with 'terms' and 'condition' (src=None), as accepted by
+            evaluate_dayandtimerange. An optional 'timezone' next to the
+            days and times names the rule's zone, and an optional
+            'resolution' ('microsecond' by default, 'second' or 'minute')
+            sets how the current time is truncated.
+        src (str): The source of data, 'logaction' or None.
+        strict (bool): Reject missing fields and -1 sentinels instead of
+            compiling them to a rule that never matches, and days outside 0-6
+            instead of comparing them as they are.
+
+    Returns:
+        DayAndTimeRange: The compiled rule.
+
+    Raises:
+        InvalidSourceError: If src is unknown.
+        MissingFieldError: In strict mode, if a day or time is missing or -1.
+        InvalidDayError: If a day is not a number, or in strict mode not an
+            integer between 0 and 6.
+        InvalidTimeError: If a time is not in HH:MM:SS or HH:MM format.
+        InvalidZoneError: If 'timezone' names an unknown zone.
+        InvalidResolutionError: If 'resolution' is not a known resolution.
+
+    Examples:
+        >>> compile_dayandtimerange({'terms': {'start_day_of_week': 1, 'start_time': '08:00:00',
+        ...                                    'end_day_of_week': 1, 'end_time': '18:00:00'}})
+        DayAndTimeRange(start_day=1, start=28800, end_day=1, end=64800, not_operator=False, tz=None, resolution='microsecond')
+    """
+    terms = _read_terms(data, src)
+    if strict:
+        for value, (field, sentinel) in zip(terms[1:5], _UNSET):
+            if value == sentinel:
+                raise MissingFieldError(field, 'missing or unset', value)
+    return _build_rule(*terms, strict=strict)
+
+
+# Compiled rules shared by every evaluate_dayandtimerange call, keyed on the terms.
+rule_cache = RuleCache(_read_terms, _build_rule)
+
+
+def evaluate_dayandtimerange_sync(data, src=None):
     """
     Evaluates if the current date and time fall within the specified range in data.
 
+    This is the synchronous implementation behind evaluate_dayandtimerange,
+    for callers outside an event loop. Malformed terms make the check return
+    not_operator; the error is counted in rule_errors.errors under
+    'dayandtimerange'.
+
     Args:
         data (dict): A dictionary containing:
             - 'now' (datetime): The current date and time.
             - 'terms' (dict): A dictionary with:
                 - 'start_day_of_week' (int): Start day of the week (0-6, where 0 is Monday).
-                - 'start_time' (str): Start time in HH:MM:SS format.
+                - 'start_time' (str): Start time in HH:MM:SS or HH:MM format.
                 - 'end_day_of_week' (int): End day of the week (0-6, where 0 is Monday).
-                - 'end_time' (str): End time in HH:MM:SS format.
+                - 'end_time' (str): End time in HH:MM:SS or HH:MM format.
+                - 'timezone' (str): Optional IANA zone of the days and times.
+                - 'resolution' (str): Optional truncation of the current time,
+                  'microsecond' (default), 'second' or 'minute'.
             - 'condition' (dict): A dictionary with optional 'not_operator' (bool).
 
     Returns:
@@ -210,81 +581,113 @@ async def evaluate_dayandtimerange(data, src=None):
         ...     },
         ...     'condition': {}
         ... }
-        >>> await evaluate_dayandtimerange(data)
+        >>> evaluate_dayandtimerange_sync(data)
         True
     """
+    if profiler.enabled:
+        return _evaluate_profiled(data, src)
     not_operator = False
     try:
-        current_datetime = data.get(
-            'now', datetime.datetime.now(datetime.timezone.utc))
-        current_weekday = current_datetime.weekday()
-        current_time = current_datetime.time()
-
-        if src == 'logaction':
-            not_operator = data.get('not_operator', False)
-            start_day_of_week = data.get('start_day_of_week', -1)
-            start_time = data.get('start_time', '-1:-1:-1')
-            end_day_of_week = data.get('end_day_of_week', -1)
-            end_time = data.get('end_time', '-1:-1:-1')
-
-        elif src is None:
-            terms = data.get('terms', {})
-            condition = data.get('condition', {})
-            not_operator = condition.get('not_operator', False)
-            start_day_of_week = terms.get('start_day_of_week', -1)
-            start_time = terms.get('start_time', '-1:-1:-1')
-            end_day_of_week = terms.get('end_day_of_week', -1)
-            end_time = terms.get('end_time', '-1:-1:-1')
-
-        else:
-            raise ValueError('invalid src')
-
-        if start_day_of_week == -1 or \
-                start_time == '-1:-1:-1' or \
-                end_day_of_week == -1 or \
-                end_time == '-1:-1:-1':
-            return not_operator ^ False
-
-        if isinstance(start_time, str):
-            start_time = datetime.datetime.strptime(
-                start_time, "%H:%M:%S").time()
-        if isinstance(end_time, str):
-            end_time = datetime.datetime.strptime(end_time, "%H:%M:%S").time()
-
-        def is_within_time_range(start_time, end_time, current_time):
-            if start_time <= end_time:
-                return start_time <= current_time <= end_time
-            else:
-                return current_time >= start_time or current_time <= end_time
-
-        # Explicit check for single-day ranges
-        if start_day_of_week == end_day_of_week:
-            if current_weekday == start_day_of_week:
-                if is_within_time_range(start_time, end_time, current_time):
-                    return not_operator ^ True
-
-        if start_day_of_week <= end_day_of_week:
-            if start_day_of_week <= current_weekday <= end_day_of_week:
-                if is_within_time_range(start_time, end_time, current_time):
-                    return not_operator ^ True
-        else:
-            # Adjust for cross-week evaluation
-            current_weekday = (current_weekday + 1) % 7
-            if current_weekday > start_day_of_week or current_weekday < end_day_of_week:
-                if is_within_time_range(start_time, end_time, current_time):
-                    return not_operator ^ True
-            elif current_weekday == start_day_of_week:
-                if current_time >= start_time:
-                    return not_operator ^ True
-            elif current_weekday == end_day_of_week:
-                if current_time <= end_time:
-                    return not_operator ^ True
-            elif (current_weekday == (end_day_of_week + 1) % 7):
-                if current_time <= end_time:
-                    return not_operator ^ False
+        current_datetime = data.get('now')
+        if current_datetime is None and 'now' not in data:
+            current_datetime = datetime.datetime.now(datetime.timezone.utc)
+        terms = _read_terms(data, src)
+        not_operator = terms[0]
+        return rule_cache.get(terms).matches(current_datetime)
 
+    except Exception as e:
+        errors.record('dayandtimerange', e)
         return not_operator ^ False
 
+
+def _evaluate_profiled(data, src):
+    timer = profiler.timer
+    started = timer()
+    not_operator = False
+    try:
+        current_datetime = data.get('now')
+        if current_datetime is None and 'now' not in data:
+            current_datetime = datetime.datetime.now(datetime.timezone.utc)
+        terms = _read_terms(data, src)
+        not_operator = terms[0]
+        rule = rule_cache.get(terms)
+        parsed = timer()
+        weekday, seconds = wall_clock(current_datetime, rule.tz)
+        converted = timer()
+        result = rule.matches_at(weekday, seconds)
     except Exception as e:
-        print(str(e))
+        errors.record('dayandtimerange', e)
         return not_operator ^ False
+    profiler.record('dayandtimerange', src, rule, parsed - started, converted - parsed,
+                    timer() - converted)
+    return result
+
+
+async def evaluate_dayandtimerange(data, src=None):
+    """
+    Coroutine wrapper around evaluate_dayandtimerange_sync, which documents
+    the arguments. It never awaits anything.
+    """
+    return evaluate_dayandtimerange_sync(data, src)
+
+
+def evaluate_many_sync(items, src=None):
+    """
+    Evaluates a batch of checks in one call.
+
+    Args:
+        items (iterable): Each item is either a data dict as accepted by
+            evaluate_dayandtimerange_sync, or a (rule, now) pair with a
+            compiled DayAndTimeRange and a datetime.
+        src (str): The source of the data dicts, 'logaction' or None.
+
+    Returns:
+        list of bool: One result per item, in order.
+
+    Examples:
+        >>> rule = DayAndTimeRange(1, 28800, 1, 64800)
+        >>> evaluate_many_sync([(rule, datetime.datetime(2024, 6, 4, 12, 0)),
+        ...                     (rule, datetime.datetime(2024, 6, 5, 12, 0))])
+        [True, False]
+    """
+    results = []
+    for item in items:
+        if isinstance(item, dict):
+            results.append(evaluate_dayandtimerange_sync(item, src))
+            continue
+        rule, now = item
+        try:
+            results.append(rule.matches(now))
+        except Exception as e:
+            errors.record('dayandtimerange', e)
+            results.append(rule.not_operator ^ False)
+    return results
+
+
+async def evaluate_many(items, src=None, offload_threshold=None, executor=None):
+    """
+    Evaluates a batch of checks with a single await.
+
+    This replaces gathering one evaluate_dayandtimerange coroutine per
+    check. The batch runs inline, unless it has at least offload_threshold
+    items, in which case it runs in the executor so the event loop is not
+    blocked meanwhile. The rule caches, zone tables and error counters it
+    shares with other batches are thread-safe, so a thread pool will do.
+
+    Args:
+        items (iterable): Data dicts or (rule, now) pairs, see
+            evaluate_many_sync.
+        src (str): The source of the data dicts, 'logaction' or None.
+        offload_threshold (int): Batch size from which to use the executor;
+            None never offloads.
+        executor (concurrent.futures.Executor): The executor to offload to;
+            None uses the event loop's default executor.
+
+    Returns:
+        list of bool: One result per item, in order.
+    """
+    items = list(items)
+    if offload_threshold is not None and len(items) >= offload_threshold:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, evaluate_many_sync, items, src)
+    return evaluate_many_sync(items, src)
@@ -1,38 +1,271 @@
+import asyncio
 import datetime
 
+from immutable import Immutable
+from rule_cache import RuleCache
+from instrumentation import profiler
+from rule_errors import InvalidSourceError, errors
+from timeparse import seconds_of_day
+from timezones import validate_zone, wall_clock
+from weekline import (MICROS_PER_SECOND, complement_intervals, daily_intervals, resolution_step,
+                      truncated_window)
 
-async def evaluate_timerange(data: dict, src=None):
-    try:
-        current_datetime = data.get('now', datetime.datetime.now())
 
-        if src == 'logaction':
-            not_operator = data.get('not_operator', False)
-            start = data.get('start', '')
-            end = data.get('end', '')
+class TimeRange(Immutable):
+    """
+    Compiled time-range rule.
 
-        elif src is None:
-            condition = data.get('condition', {})
-            terms = data.get('terms', {})
-            not_operator = condition.get('not_operator', False)
-            start = terms.get('start', '')
-            end = terms.get('end', '')
+    The bounds are stored as integer seconds-of-day so that evaluating the
+    rule never has to parse a time string. Instances are immutable; build
+    them once with compile_timerange and reuse them for every check.
 
-        else:
-            raise ValueError('invalid src')
+    Args:
+        start (int): Start of the range in seconds since midnight.
+        end (int): End of the range in seconds since midnight (inclusive).
+        not_operator (bool): Invert the result of the check.
+        tz (str): IANA zone the bounds are expressed in. Aware datetimes are
+            converted to it before the check; None reads them as they are.
+        resolution (str): 'minute', 'second' or 'microsecond'; the current
+            time is truncated to it before it is compared with the bounds.
+
+    Examples:
+        >>> rule = TimeRange(10 * 3600, 11 * 3600)
+        >>> rule.matches(datetime.datetime(2024, 6, 4, 10, 30))
+        True
+        >>> rule.matches(datetime.datetime(2024, 6, 4, 11, 0, 30))
+        True
+        >>> TimeRange(10 * 3600, 11 * 3600, resolution='second').matches(
+        ...     datetime.datetime(2024, 6, 4, 11, 0, 30))
+        False
+    """
+    __slots__ = ('start', 'end', 'not_operator', 'tz', 'resolution', '_step')
+
+    def __init__(self, start, end, not_operator=False, tz=None, resolution='minute'):
+        step = resolution_step(resolution)
+        object.__setattr__(self, 'start', start)
+        object.__setattr__(self, 'end', end)
+        object.__setattr__(self, 'not_operator', not_operator)
+        object.__setattr__(self, 'tz', tz)
+        object.__setattr__(self, 'resolution', resolution)
+        # Truncation step in seconds; None keeps the fraction of a second
+        object.__setattr__(self, '_step', None if step == 1 else step // MICROS_PER_SECOND)
+
+    def _key(self):
+        return (self.start, self.end, self.not_operator, self.tz, self.resolution)
+
+    def __reduce__(self):
+        return (type(self), self._key())
+
+    def __eq__(self, other):
+        if not isinstance(other, TimeRange):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash((TimeRange,) + self._key())
+
+    def __repr__(self):
+        return (f'TimeRange(start={self.start}, end={self.end}, '
+                f'not_operator={self.not_operator}, tz={self.tz!r}, '
+                f'resolution={self.resolution!r})')
+
+    def matches(self, now):
+        """
+        Evaluates the rule against a datetime, truncated to the rule's resolution.
+        """
+        if self.tz is not None and now.tzinfo is not None:
+            return self.matches_at(*wall_clock(now, self.tz))
+        step = self._step
+        if step == 60:
+            return self._check(now.hour * 3600 + now.minute * 60)
+        if step == 1:
+            return self._check(now.hour * 3600 + now.minute * 60 + now.second)
+        return self._check(now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6)
+
+    def matches_at(self, weekday, seconds):
+        """
+        Evaluates the rule against an already decomposed instant.
+
+        Args:
+            weekday (int): The weekday (0-6, where 0 is Monday). Unused, the
+                argument only exists so both rule types share one signature.
+            seconds (float): Seconds since midnight.
+        """
+        step = self._step
+        if step is not None:
+            seconds -= seconds % step
+        return self._check(seconds)
 
-        current_time = datetime.datetime.strptime(
-            current_datetime.strftime("%H:%M"), "%H:%M").time()
-        start = datetime.datetime.strptime(start, "%H:%M:%S").time()
-        end = datetime.datetime.strptime(end, "%H:%M:%S").time()
+    def week_intervals(self):
+        """
+        Projects the rule onto the week line, not_operator included.
 
+        Because the current time is truncated to the resolution, a rule is
+        active for whole minutes (or seconds): from the first one at or after
+        start up to the end of the one that contains end.
+
+        Returns:
+            tuple: Merged half-open (start, stop) microsecond-of-week intervals.
+        """
+        first, last = truncated_window(self.start, self.end, self.resolution)
+        if self.start <= self.end:
+            windows = ((first, last),)
+        else:
+            windows = ((0, last), (first, 86400 * MICROS_PER_SECOND))
+        intervals = daily_intervals(lambda weekday: windows)
+        if self.not_operator:
+            return complement_intervals(intervals)
+        return intervals
+
+    def _check(self, current_time):
+        start = self.start
+        end = self.end
         # Check if the current time is within the valid time range
         if start <= end:
             result = start <= current_time <= end
         else:
             result = current_time >= start or current_time <= end
 
-        return not_operator ^ result
+        return self.not_operator ^ result
+
+
+def _read_terms(data, src):
+    if src == 'logaction':
+        not_operator = data.get('not_operator', False)
+        start = data.get('start', '')
+        end = data.get('end', '')
+        tz = data.get('timezone')
+        resolution = data.get('resolution', 'minute')
+
+    elif src is None:
+        condition = data.get('condition', {})
+        terms = data.get('terms', {})
+        not_operator = condition.get('not_operator', False)
+        start = terms.get('start', '')
+        end = terms.get('end', '')
+        tz = terms.get('timezone')
+        resolution = terms.get('resolution', 'minute')
+
+    else:
+        raise InvalidSourceError('src', f'invalid src {src!r}', src)
+
+    return not_operator, start, end, tz, resolution
+
+
+def _build_rule(not_operator, start, end, tz, resolution):
+    return TimeRange(seconds_of_day(start, 'start'), seconds_of_day(end, 'end'),
+                     not_operator, validate_zone(tz), resolution)
+
+
+def compile_timerange(data: dict, src=None):
+    """
+    Compiles the terms of a time-range check into a TimeRange.
 
+    Args:
+        data (dict): Either the flat logaction dict (src='logaction') or a
+            dict with 'terms' and 'condition' (src=None). An optional
+            'timezone' next to 'start' and 'end' names the rule's zone, and
+            an optional 'resolution' ('minute' by default, 'second' or
+            'microsecond') sets how the current time is truncated.
+        src (str): The source of data, 'logaction' or None.
+
+    Returns:
+        TimeRange: The compiled rule.
+
+    Raises:
+        InvalidSourceError: If src is unknown.
+        MissingFieldError: If start or end is missing.
+        InvalidTimeError: If start or end is not in HH:MM:SS or HH:MM format.
+        InvalidZoneError: If 'timezone' names an unknown zone.
+        InvalidResolutionError: If 'resolution' is not a known resolution.
+    """
+    return _build_rule(*_read_terms(data, src))
+
+
+# Compiled rules shared by every evaluate_timerange call, keyed on the terms.
+rule_cache = RuleCache(_read_terms, _build_rule)
+
+
+def evaluate_timerange_sync(data: dict, src=None):
+    """
+    Synchronous evaluate_timerange, for callers outside an event loop.
+
+    Malformed terms make the check return False; the error is counted in
+    rule_errors.errors under 'timerange'.
+    """
+    if profiler.enabled:
+        return _evaluate_profiled(data, src)
+    try:
+        current_datetime = data.get('now')
+        if current_datetime is None and 'now' not in data:
+            current_datetime = datetime.datetime.now().astimezone()
+        return rule_cache.compile(data, src).matches(current_datetime)
+
+    except Exception as err:
+        errors.record('timerange', err)
+        return False
+
+
+def _evaluate_profiled(data, src):
+    timer = profiler.timer
+    started = timer()
+    try:
+        current_datetime = data.get('now')
+        if current_datetime is None and 'now' not in data:
+            current_datetime = datetime.datetime.now().astimezone()
+        rule = rule_cache.compile(data, src)
+        parsed = timer()
+        weekday, seconds = wall_clock(current_datetime, rule.tz)
+        converted = timer()
+        result = rule.matches_at(weekday, seconds)
     except Exception as err:
-        print(str(err))
+        errors.record('timerange', err)
         return False
+    profiler.record('timerange', src, rule, parsed - started, converted - parsed, timer() - converted)
+    return result
+
+
+async def evaluate_timerange(data: dict, src=None):
+    return evaluate_timerange_sync(data, src)
+
+
+def evaluate_many_sync(items, src=None):
+    """
+    Evaluates a batch of checks in one call.
+
+    Args:
+        items (iterable): Each item is either a data dict as accepted by
+            evaluate_timerange_sync, or a (rule, now) pair with a compiled
+            TimeRange and a datetime.
+        src (str): The source of the data dicts, 'logaction' or None.
+
+    Returns:
+        list of bool: One result per item, in order.
+    """
+    results = []
+    for item in items:
+        if isinstance(item, dict):
+            results.append(evaluate_timerange_sync(item, src))
+            continue
+        rule, now = item
+        try:
+            results.append(rule.matches(now))
+        except Exception as err:
+            errors.record('timerange', err)
+            results.append(False)
+    return results
+
+
+async def evaluate_many(items, src=None, offload_threshold=None, executor=None):
+    """
+    Evaluates a batch of checks with a single await.
+
+    Batches of at least offload_threshold items run in the executor (None
+    is the event loop's default) instead of on the event loop; see
+    evaluate_dayandtimerange.evaluate_many.
+    """
+    items = list(items)
+    if offload_threshold is not None and len(items) >= offload_threshold:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, evaluate_many_sync, items, src)
+    return evaluate_many_sync(items, src)
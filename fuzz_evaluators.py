@@ -0,0 +1,492 @@
+"""
+Differential fuzzing of every evaluation path against the reference evaluators.
+
+Random rules and instants are generated with a bias towards the edges that
+the historical semantics are quirky about: exact and off-by-one bounds,
+overnight ranges, the cross-week (weekday + 1) % 7 adjustment, the -1
+sentinels, days outside 0-6, midnight at the week wrap, and instants around
+the DST changes of the rule's zone. Times are also written unpadded or as
+HH:MM, with a 'resolution', and some terms are malformed or of the wrong
+type, so the error paths are compared too. Each case is evaluated by
+reference_evaluators and by every accelerated implementation; a
+disagreement is shrunk to a minimal case before it is reported.
+
+Everything runs offline and is deterministic for a given seed:
+
+    python fuzz_evaluators.py --iterations 1000000 --seed 7
+"""
+import argparse
+import concurrent.futures
+import datetime
+import io
+import json
+import random
+import sys
+import zoneinfo
+
+import evaluate_dayandtimerange
+import evaluate_timerange
+from calendars import CalendarRule
+from incremental import IncrementalEvaluator
+from reference_evaluators import reference_dayandtimerange, reference_timerange
+from rule_engine import evaluate_rule_document
+from rule_errors import RuleError
+from rule_index import RuleIndex
+from rule_store import RuleSet, dumps
+from schedule import Schedule
+from schedule_bitmap import WeekBitmap
+from timezones import wall_clock, wall_position, zone_offsets
+from weekline import boundaries, contains
+
+ZONES = (None, 'UTC', 'Europe/Berlin', 'America/New_York', 'Australia/Lord_Howe', 'Asia/Kolkata')
+SENTINEL_TIME = '-1:-1:-1'
+OUT_OF_RANGE_DAYS = (-3, -2, 7, 8, 12)
+TIME_FORMATS = ('padded', 'padded', 'padded', 'unpadded', 'short')
+RESOLUTIONS = ('minute', 'second', 'microsecond')
+INVALID_RESOLUTIONS = ('hour', '', 'Second')
+MALFORMED_TIMES = ('24:00:00', '12:60:00', '12:00:60', '12:00:00:00', '12', '', 'noon',
+                   ' 12:00:00', '12:00:00 ', '12-00-00', '1200', '12::00', '+1:00:00')
+# Days the evaluators reject, or compare as the numbers they are
+INVALID_DAYS = ('1', None, 2.5, 3.0, True, False, [1])
+_UTC = datetime.timezone.utc
+_FIRST = datetime.datetime(2023, 1, 1, tzinfo=_UTC)
+_SPAN_SECONDS = 3 * 365 * 86400
+
+
+def _time_string(seconds, style='padded'):
+    hours, minutes, seconds = seconds // 3600, seconds // 60 % 60, seconds % 60
+    if style == 'unpadded':
+        return f'{hours}:{minutes}:{seconds}'
+    if style == 'short':
+        return f'{hours:02d}:{minutes:02d}'
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}'
+
+
+def _random_seconds(rng):
+    choice = rng.random()
+    if choice < 0.15:
+        return rng.choice((0, 59, 60, 3600, 43200, 86340, 86399))
+    if choice < 0.35:
+        return rng.randrange(0, 86400, 3600)
+    return rng.randrange(86400)
+
+
+def _transition_near(rng, zone):
+    # An instant close to one of the zone's UTC offset changes, if it has any
+    lo = int(_FIRST.timestamp())
+    starts, _ = zone_offsets(zone).transitions(lo, lo + _SPAN_SECONDS)
+    starts = [start for start in starts if lo < start < lo + _SPAN_SECONDS]
+    if not starts:
+        return None
+    moment = datetime.datetime.fromtimestamp(rng.choice(starts), _UTC)
+    return moment + datetime.timedelta(seconds=rng.choice((-3600, -1, 0, 1, 1800, 3600)),
+                                       microseconds=rng.choice((0, 0, 1, 999999)))
+
+
+def random_case(rng):
+    """
+    Returns a random case: a dict of rule terms plus the instant to check.
+    """
+    kind = rng.choice(('dayandtimerange', 'dayandtimerange', 'timerange'))
+    case = {
+        'kind': kind,
+        'start_day': rng.randrange(7),
+        'start': _random_seconds(rng),
+        'end_day': rng.randrange(7),
+        'end': _random_seconds(rng),
+        'not_operator': rng.random() < 0.3,
+        'tz': rng.choice(ZONES),
+        'sentinel': None,
+        'format': rng.choice(TIME_FORMATS),
+        'resolution': None,
+        'malformed': None,
+    }
+    if rng.random() < 0.2:
+        case['end'] = case['start'] + rng.choice((-1, 0, 1)) if 0 < case['start'] < 86399 else case['start']
+    if rng.random() < 0.2:
+        case['end_day'] = case['start_day'] + rng.choice((-1, 0, 1)) if 0 < case['start_day'] < 6 else case['start_day']
+    if kind == 'dayandtimerange' and rng.random() < 0.05:
+        # Outside 0-6: the evaluators compare such days as they are
+        case[rng.choice(('start_day', 'end_day'))] = rng.choice(OUT_OF_RANGE_DAYS)
+    if kind == 'dayandtimerange' and rng.random() < 0.05:
+        case['sentinel'] = rng.choice(('start_day_of_week', 'start_time', 'end_day_of_week', 'end_time'))
+    choice = rng.random()
+    if choice < 0.02:
+        case['resolution'] = rng.choice(INVALID_RESOLUTIONS)
+    elif choice < 0.4:
+        case['resolution'] = rng.choice(RESOLUTIONS)
+    if rng.random() < 0.08:
+        if kind == 'timerange':
+            case['malformed'] = (rng.choice(('start', 'end')), rng.choice(MALFORMED_TIMES))
+        elif rng.random() < 0.5:
+            case['malformed'] = (rng.choice(('start_time', 'end_time')), rng.choice(MALFORMED_TIMES))
+        else:
+            case['malformed'] = (rng.choice(('start_day_of_week', 'end_day_of_week')),
+                                 rng.choice(INVALID_DAYS))
+
+    choice = rng.random()
+    moment = None
+    if choice < 0.25 and case['tz'] not in (None, 'UTC', 'Asia/Kolkata'):
+        moment = _transition_near(rng, case['tz'])
+    if moment is None and choice < 0.6:
+        # On a bound: the start or end day and time, give or take a little
+        day = rng.choice((case['start_day'], case['end_day'], (case['end_day'] + 1) % 7, 0, 6))
+        seconds = rng.choice((case['start'], case['end'], 0, 86399))
+        week = datetime.datetime(2024, 1, 1) + datetime.timedelta(weeks=rng.randrange(150))
+        moment = week + datetime.timedelta(days=day, seconds=seconds) + rng.choice((
+            datetime.timedelta(0), datetime.timedelta(microseconds=1),
+            datetime.timedelta(microseconds=-1), datetime.timedelta(seconds=1),
+            datetime.timedelta(seconds=-1), datetime.timedelta(seconds=59)))
+    if moment is None:
+        moment = _FIRST + datetime.timedelta(microseconds=rng.randrange(_SPAN_SECONDS * 10**6))
+
+    style = rng.choice(('naive', 'utc', 'zone'))
+    if moment.tzinfo is None and style != 'naive':
+        moment = moment.replace(tzinfo=_UTC)
+    if style == 'naive':
+        moment = moment.replace(tzinfo=None)
+    elif style == 'zone' and case['tz'] is not None:
+        moment = moment.astimezone(zoneinfo.ZoneInfo(case['tz']))
+    case['now'] = moment
+    case['lead'] = datetime.timedelta(microseconds=rng.choice((0, 1, 10**6, 3600 * 10**6, 86400 * 10**6)))
+    return case
+
+
+def case_data(case):
+    """
+    Returns the evaluator data dict (src=None) for a case.
+    """
+    start = _time_string(case['start'], case['format'])
+    end = _time_string(case['end'], case['format'])
+    if case['kind'] == 'timerange':
+        terms = {'start': start, 'end': end}
+    else:
+        terms = {'start_day_of_week': case['start_day'], 'start_time': start,
+                 'end_day_of_week': case['end_day'], 'end_time': end}
+        if case['sentinel']:
+            terms[case['sentinel']] = SENTINEL_TIME if case['sentinel'].endswith('time') else -1
+    if case['malformed'] is not None:
+        field, value = case['malformed']
+        terms[field] = value
+    if case['tz'] is not None:
+        terms['timezone'] = case['tz']
+    if case['resolution'] is not None:
+        terms['resolution'] = case['resolution']
+    return {'now': case['now'], 'terms': terms, 'condition': {'not_operator': case['not_operator']}}
+
+
+def reference(case):
+    """
+    Evaluates a case with the reference evaluators.
+
+    The reference knows nothing about zones, HH:MM times or resolutions.
+    An aware instant is first converted to the wall clock of the rule's zone
+    with zoneinfo, HH:MM is passed as HH:MM:00, and the instant is
+    truncated to the resolution. A timerange at another resolution than
+    the minute is checked as a dayandtimerange over the whole week, which
+    compares the untruncated time with the same formula.
+    """
+    data = case_data(case)
+    terms = data['terms']
+    error = False if case['kind'] == 'timerange' else case['not_operator'] ^ False
+    now = case['now']
+    if case['tz'] is not None and now.tzinfo is not None:
+        now = now.astimezone(zoneinfo.ZoneInfo(case['tz']))
+    terms.pop('timezone', None)
+    resolution = terms.pop('resolution', 'minute' if case['kind'] == 'timerange' else 'microsecond')
+    if resolution not in RESOLUTIONS:
+        return error
+    for field in ('start', 'end', 'start_time', 'end_time'):
+        value = terms.get(field)
+        if isinstance(value, str) and value.count(':') == 1:
+            terms[field] = value + ':00'
+    if resolution != 'microsecond':
+        now = now.replace(microsecond=0)
+    if resolution == 'minute':
+        now = now.replace(second=0)
+    data['now'] = now
+    if case['kind'] == 'dayandtimerange':
+        return reference_dayandtimerange(data)
+    if resolution == 'minute':
+        return reference_timerange(data)
+    try:
+        for field in ('start', 'end'):
+            datetime.datetime.strptime(terms[field], '%H:%M:%S')
+    except ValueError:
+        return error
+    data['terms'] = {'start_day_of_week': 0, 'start_time': terms['start'],
+                     'end_day_of_week': 6, 'end_time': terms['end']}
+    return reference_dayandtimerange(data)
+
+
+def _module(case):
+    return evaluate_timerange if case['kind'] == 'timerange' else evaluate_dayandtimerange
+
+
+def _compile(case):
+    if case['kind'] == 'timerange':
+        return evaluate_timerange.compile_timerange(case_data(case))
+    return evaluate_dayandtimerange.compile_dayandtimerange(case_data(case))
+
+
+def _evaluate_sync(rule, case):
+    if case['kind'] == 'timerange':
+        return evaluate_timerange.evaluate_timerange_sync(case_data(case))
+    return evaluate_dayandtimerange.evaluate_dayandtimerange_sync(case_data(case))
+
+
+def _evaluate_many(rule, case):
+    if rule is None:
+        return _module(case).evaluate_many_sync([case_data(case)])[0]
+    from_data, from_rule = _module(case).evaluate_many_sync([case_data(case), (rule, case['now'])])
+    if from_data != from_rule:
+        raise AssertionError(f'data item gave {from_data}, rule item gave {from_rule}')
+    return from_data
+
+
+def _rule_document(rule, case):
+    return evaluate_rule_document(dict(case_data(case), type=case['kind']), case['now'])
+
+
+def _week_line(rule, case):
+    return contains(boundaries(rule.week_intervals()), wall_position(case['now'], rule.tz))
+
+
+def _vectorized(rule, case):
+    now = case['now']
+    if rule.tz is not None and now.tzinfo is None:
+        return None
+    try:
+        import numpy as np
+        from vectorized import evaluate_array
+    except ImportError:
+        return None
+    if now.tzinfo is not None:
+        now = now.astimezone(_UTC).replace(tzinfo=None)
+    return bool(evaluate_array(rule, np.array([np.datetime64(now, 'us')]))[0])
+
+
+def _bitmap(rule, case):
+    # Bitmaps sample each slot at its start, which is exact for rules at
+    # minute resolution and for whole-second instants at finer ones
+    if rule.resolution == 'minute':
+        return WeekBitmap.from_rule(rule).matches(case['now'])
+    if case['now'].microsecond:
+        return None
+    return WeekBitmap.from_rule(rule, resolution=1).matches(case['now'])
+
+
+def _incremental(rule, case):
+    tracker = IncrementalEvaluator({'rule': rule})
+    tracker.active(case['now'] - case['lead'])
+    return 'rule' in tracker.active(case['now'])
+
+
+def _rule_store(rule, case):
+    # Records only hold integer days
+    if case['kind'] == 'dayandtimerange' and not (type(rule.start_day) is int is type(rule.end_day)):
+        return None
+    return RuleSet(dumps({'rule': rule}))['rule'].matches(case['now'])
+
+
+def _parallel(rule, case):
+    now = case['now']
+    if rule.tz is not None and now.tzinfo is None:
+        return None
+    try:
+        import numpy as np
+        from parallel import evaluate_parallel
+    except ImportError:
+        return None
+    if now.tzinfo is not None:
+        now = now.astimezone(_UTC).replace(tzinfo=None)
+    # A thread keeps the check in this process; the shared-memory path is the same
+    result = evaluate_parallel([rule], np.array([np.datetime64(now, 'us')]), workers=1,
+                               executor_factory=concurrent.futures.ThreadPoolExecutor)
+    return bool(result[0, 0])
+
+
+def _jsonl(rule, case):
+    try:
+        from jsonl_pipeline import evaluate_jsonl
+    except ImportError:
+        return None
+    event = dict(case_data(case), now=case['now'].isoformat())
+    output = io.BytesIO()
+    evaluate_jsonl(io.BytesIO(json.dumps(event).encode('utf-8')), kind=case['kind'], src=None,
+                   output=output)
+    return output.getvalue() == b'\x01'
+
+
+IMPLEMENTATIONS = {
+    'evaluate_sync': _evaluate_sync,
+    'evaluate_many': _evaluate_many,
+    'rule_document': _rule_document,
+    'matches': lambda rule, case: rule.matches(case['now']),
+    'matches_at': lambda rule, case: rule.matches_at(*wall_clock(case['now'], rule.tz)),
+    'week_line': _week_line,
+    'vectorized': _vectorized,
+    'rule_index': lambda rule, case: 'rule' in RuleIndex({'rule': rule}).active(case['now']),
+    'schedule': lambda rule, case: Schedule.from_rule(rule).matches(case['now']),
+    'bitmap': _bitmap,
+    'incremental': _incremental,
+    'rule_store': _rule_store,
+    'calendar_rule': lambda rule, case: CalendarRule(rule).matches(case['now']),
+    'parallel': _parallel,
+    'jsonl': _jsonl,
+}
+
+# Implementations that read the terms themselves, and so also apply to
+# cases whose terms do not compile
+DATA_IMPLEMENTATIONS = frozenset(('evaluate_sync', 'evaluate_many', 'rule_document', 'jsonl'))
+
+
+def check_case(case, implementations=None):
+    """
+    Evaluates a case with every implementation.
+
+    Args:
+        case (dict): As returned by random_case.
+        implementations (dict): Name to func(rule, case), returning a bool,
+            or None where the implementation does not apply. Defaults to
+            IMPLEMENTATIONS. When the terms do not compile, only those in
+            DATA_IMPLEMENTATIONS are run, with rule None.
+
+    Returns:
+        list: (name, expected, actual) for every disagreement with the
+            reference; empty when all agree.
+    """
+    implementations = IMPLEMENTATIONS if implementations is None else implementations
+    expected = reference(case)
+    try:
+        rule = _compile(case)
+    except RuleError:
+        rule = None
+    mismatches = []
+    for name, implementation in implementations.items():
+        if rule is None and name not in DATA_IMPLEMENTATIONS:
+            continue
+        try:
+            actual = implementation(rule, case)
+        except Exception as err:
+            mismatches.append((name, expected, err))
+            continue
+        if actual is not None and actual != expected:
+            mismatches.append((name, expected, actual))
+    return mismatches
+
+
+def _simplifications(case):
+    # Candidate cases that are simpler than case, simplest first
+    now = case['now']
+    if case['tz'] is not None:
+        yield dict(case, tz=None, now=now if now.tzinfo is None else now.replace(tzinfo=None))
+    if now.tzinfo is not None:
+        yield dict(case, now=now.astimezone(_UTC).replace(tzinfo=None) if case['tz'] is None
+                   else now.astimezone(zoneinfo.ZoneInfo(case['tz'])).replace(tzinfo=None))
+    if case['not_operator']:
+        yield dict(case, not_operator=False)
+    if case['lead']:
+        yield dict(case, lead=datetime.timedelta(0))
+    if case['sentinel'] is not None:
+        yield dict(case, sentinel=None)
+    if case['malformed'] is not None:
+        yield dict(case, malformed=None)
+    if case['resolution'] is not None:
+        yield dict(case, resolution=None)
+    if case['format'] != 'padded':
+        yield dict(case, format='padded')
+    for field in ('microsecond', 'second', 'minute', 'hour'):
+        if getattr(now, field):
+            yield dict(case, now=now.replace(**{field: 0}))
+    if now.tzinfo is None and now.date() != datetime.date(2024, 1, 1) + datetime.timedelta(days=now.weekday()):
+        # The same weekday and time in a fixed week
+        yield dict(case, now=datetime.datetime.combine(
+            datetime.date(2024, 1, 1) + datetime.timedelta(days=now.weekday()), now.time()))
+    for field in ('start', 'end'):
+        value = case[field]
+        for simpler in (0, value - value % 3600, value - value % 60, value // 2):
+            if simpler < value:
+                yield dict(case, **{field: simpler})
+    for field in ('start_day', 'end_day'):
+        if not 0 <= case[field] <= 6:
+            yield dict(case, **{field: case[field] % 7})
+        if case[field]:
+            yield dict(case, **{field: 0})
+        if case[field] > 0:
+            yield dict(case, **{field: case[field] - 1})
+
+
+def shrink(case, fails):
+    """
+    Greedily simplifies a failing case while it keeps failing.
+
+    Args:
+        case (dict): A case for which fails(case) is true.
+        fails (callable): Tells whether a case still shows the failure.
+
+    Returns:
+        dict: A case no simplification of which still fails.
+    """
+    progress = True
+    while progress:
+        progress = False
+        for candidate in _simplifications(case):
+            if fails(candidate):
+                case = candidate
+                progress = True
+                break
+    return case
+
+
+def run(iterations, seed=0, implementations=None, max_failures=10):
+    """
+    Checks random cases and returns the shrunk failures.
+
+    Returns:
+        list: (case, mismatches) pairs, at most max_failures of them.
+    """
+    rng = random.Random(seed)
+    failures = []
+    for _ in range(iterations):
+        case = random_case(rng)
+        mismatches = check_case(case, implementations)
+        if not mismatches:
+            continue
+        names = {name for name, _, _ in mismatches}
+        minimal = shrink(case, lambda candidate: any(
+            name in names for name, _, _ in check_case(candidate, implementations)))
+        failures.append((minimal, check_case(minimal, implementations)))
+        if len(failures) >= max_failures:
+            break
+    return failures
+
+
+def format_case(case):
+    """
+    Formats a case as the evaluator call that reproduces it.
+    """
+    return f'{case["kind"]}: {case_data(case)!r} (lead {case["lead"]})'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--iterations', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-failures', type=int, default=10)
+    parser.add_argument('--only', action='append', choices=sorted(IMPLEMENTATIONS),
+                        help='check only these implementations (repeatable)')
+    args = parser.parse_args(argv)
+    implementations = ({name: IMPLEMENTATIONS[name] for name in args.only}
+                       if args.only else None)
+    failures = run(args.iterations, args.seed, implementations, args.max_failures)
+    for case, mismatches in failures:
+        print(format_case(case))
+        for name, expected, actual in mismatches:
+            print(f'  {name}: expected {expected!r}, got {actual!r}')
+    print(f'{len(failures)} failing case(s) in {args.iterations} iterations (seed {args.seed})')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""
+Base class for the immutable value types: compiled rules, schedules and calendars.
+"""
+
+
+class Immutable:
+    """
+    Rejects attribute assignment and deletion after construction.
+
+    Subclasses set their slots in __init__ with object.__setattr__.
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
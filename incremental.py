@@ -0,0 +1,141 @@
+"""
+Stateful evaluation of many rules over a time-ordered stream of instants.
+
+A rule's result only changes at its transition points, so the evaluator keeps
+every rule's current result together with the instant at which it next has
+to be looked at, in a heap ordered by that instant. An event that comes
+before the earliest of those instants is answered with one comparison.
+"""
+import bisect
+import datetime
+import heapq
+import itertools
+
+from timezones import wall_position, zone_offsets
+from transitions import transition_delay, transition_points
+from weekline import SECONDS_PER_WEEK
+
+_UTC = datetime.timezone.utc
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=_UTC)
+
+
+class IncrementalEvaluator:
+    """
+    Tracks which of a set of compiled rules are active as time moves forward.
+
+    Boundaries are computed on the wall clock the rules are evaluated on:
+    naive instants are wall-clock readings, and aware instants are compared
+    in UTC, with a boundary never placed past the next UTC offset change of
+    the zone the rule is read in, so DST changes force a re-check instead of
+    being skipped over. An instant earlier than the previous one, or a
+    switch between naive and aware instants, rebuilds the state from scratch
+    and is counted in fallbacks.
+
+    Args:
+        rules (dict): Mapping of rule ID to compiled rule.
+
+    Attributes:
+        recomputed (int): Rule evaluations done because a boundary was crossed.
+        fallbacks (int): State rebuilds caused by out-of-order instants.
+
+    Examples:
+        >>> from evaluate_dayandtimerange import DayAndTimeRange
+        >>> tracker = IncrementalEvaluator({'office': DayAndTimeRange(0, 28800, 4, 64800)})
+        >>> sorted(tracker.active(datetime.datetime(2024, 6, 4, 12, 0)))
+        ['office']
+        >>> sorted(tracker.active(datetime.datetime(2024, 6, 4, 19, 0)))
+        []
+    """
+
+    def __init__(self, rules):
+        self._rules = dict(rules)
+        self._heap = []
+        self._active = set()
+        self._snapshot = frozenset()
+        self._last = None
+        self._serial = itertools.count()
+        self.recomputed = 0
+        self.fallbacks = 0
+
+    def active(self, now):
+        """
+        Returns the IDs of the rules active at now.
+
+        Args:
+            now (datetime.datetime): The instant; normally no earlier than the
+                instant of the previous call.
+
+        Returns:
+            frozenset: The active rule IDs.
+        """
+        # Aware instants are ordered in UTC: two datetimes sharing a tzinfo
+        # compare by wall clock, which is not monotonic across DST changes
+        key = now
+        if now.tzinfo is not None and now.tzinfo is not _UTC:
+            key = now.astimezone(_UTC)
+        last = self._last
+        if last is None or (key.tzinfo is None) != (last.tzinfo is None) or key < last:
+            if last is not None:
+                self.fallbacks += 1
+            self._rebuild(now)
+        else:
+            heap = self._heap
+            if heap and heap[0][0] <= key:
+                while heap and heap[0][0] <= key:
+                    _, _, rule_id = heapq.heappop(heap)
+                    self._refresh(rule_id, now)
+                    self.recomputed += 1
+                self._snapshot = frozenset(self._active)
+        self._last = key
+        return self._snapshot
+
+    def matches(self, rule_id, now):
+        """
+        Returns whether one rule is active at now, advancing the whole state.
+        """
+        return rule_id in self.active(now)
+
+    def _rebuild(self, now):
+        self._heap = []
+        self._active = set()
+        for rule_id in self._rules:
+            self._refresh(rule_id, now)
+        self._snapshot = frozenset(self._active)
+
+    def _refresh(self, rule_id, now):
+        rule = self._rules[rule_id]
+        if rule.matches(now):
+            self._active.add(rule_id)
+        else:
+            self._active.discard(rule_id)
+        boundary = _next_boundary(rule, now)
+        if boundary is not None:
+            heapq.heappush(self._heap, (boundary, next(self._serial), rule_id))
+
+
+def _next_boundary(rule, now):
+    # The first instant after now at which the rule may change, comparable
+    # with now: naive for naive instants, UTC for aware ones.
+    delay = transition_delay(transition_points(rule), wall_position(now, rule.tz))
+    if delay is None:
+        return None
+    step = datetime.timedelta(microseconds=delay)
+    if now.tzinfo is None:
+        return now + step
+    zone = rule.tz or getattr(now.tzinfo, 'key', None)
+    now = now.astimezone(_UTC)
+    change = _next_offset_change(zone, now)
+    if change is not None and change < now + step:
+        return change
+    return now + step
+
+
+def _next_offset_change(zone, now):
+    if zone is None:
+        return None
+    utc_seconds = (now - _EPOCH) // datetime.timedelta(seconds=1)
+    starts, _ = zone_offsets(zone).transitions(utc_seconds, utc_seconds + SECONDS_PER_WEEK)
+    index = bisect.bisect_right(starts, utc_seconds)
+    if index == len(starts):
+        return None
+    return _EPOCH + datetime.timedelta(seconds=starts[index])
@@ -0,0 +1,181 @@
+"""
+Opt-in timing of rule evaluations, per phase and per rule.
+
+When `profiler` is disabled the evaluators only pay for one attribute check
+per call. When it is enabled, evaluate_timerange and evaluate_dayandtimerange
+time three phases of every call with the profiler's timer:
+
+- parse: reading the terms and getting the compiled rule from the cache
+- tz: reading the weekday and time of day on the rule's wall clock
+- compare: checking the bounds
+
+Totals are kept per (evaluator, src, phase) and per compiled rule, and can
+be exported as text or in the Prometheus text exposition format.
+"""
+import contextlib
+import threading
+import time
+
+PHASES = ('parse', 'tz', 'compare')
+
+
+class Profiler:
+    """
+    Collects evaluation timings while enabled.
+
+    Args:
+        timer (callable): Returns the current time in seconds as a float;
+            time.perf_counter by default. Any monotonic clock works, e.g. a
+            fake one in tests or time.process_time.
+
+    Examples:
+        >>> ticks = iter(range(100))
+        >>> profiler = Profiler(timer=lambda: next(ticks))
+        >>> profiler.record('timerange', 'logaction', 'rule', 1, 2, 3)
+        >>> profiler.snapshot()['phases']['timerange']['logaction']
+        {'parse': (1, 1), 'tz': (1, 2), 'compare': (1, 3)}
+    """
+
+    def __init__(self, timer=time.perf_counter):
+        self.timer = timer
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.rules = {}
+
+    def enable(self, timer=None):
+        if timer is not None:
+            self.timer = timer
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def record(self, evaluator, src, rule, parse, tz, compare):
+        """
+        Adds the phase durations, in seconds, of one evaluation.
+        """
+        with self._lock:
+            for phase, seconds in zip(PHASES, (parse, tz, compare)):
+                totals = self.phases.setdefault((evaluator, src, phase), [0, 0])
+                totals[0] += 1
+                totals[1] += seconds
+            totals = self.rules.setdefault((evaluator, rule), [0, 0])
+            totals[0] += 1
+            totals[1] += parse + tz + compare
+
+    def snapshot(self):
+        """
+        Returns the totals as plain dicts.
+
+        Returns:
+            dict: {'phases': {evaluator: {src: {phase: (calls, seconds)}}},
+                'rules': {evaluator: {rule: (calls, seconds)}}}
+        """
+        with self._lock:
+            phases = {}
+            for (evaluator, src, phase), (calls, seconds) in self.phases.items():
+                phases.setdefault(evaluator, {}).setdefault(src, {})[phase] = (calls, seconds)
+            rules = {}
+            for (evaluator, rule), (calls, seconds) in self.rules.items():
+                rules.setdefault(evaluator, {})[rule] = (calls, seconds)
+        return {'phases': phases, 'rules': rules}
+
+    def slowest_rules(self, count=10):
+        """
+        Returns the rules with the most cumulative time.
+
+        Returns:
+            list: (evaluator, rule, calls, seconds) tuples, slowest first.
+        """
+        with self._lock:
+            items = [(evaluator, rule, calls, seconds)
+                     for (evaluator, rule), (calls, seconds) in self.rules.items()]
+        return sorted(items, key=lambda item: item[3], reverse=True)[:count]
+
+    def reset(self):
+        with self._lock:
+            self.phases.clear()
+            self.rules.clear()
+
+    def export_text(self):
+        """
+        Formats the totals as one line per phase and per rule.
+        """
+        lines = []
+        with self._lock:
+            for (evaluator, src, phase), (calls, seconds) in sorted(
+                    self.phases.items(), key=lambda item: tuple(map(str, item[0]))):
+                lines.append(f'phase {evaluator} src={src} {phase} calls={calls} seconds={seconds:.9f}')
+            for (evaluator, rule), (calls, seconds) in sorted(
+                    self.rules.items(), key=lambda item: -item[1][1]):
+                lines.append(f'rule {evaluator} {rule!r} calls={calls} seconds={seconds:.9f}')
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def export_prometheus(self, prefix='rule_evaluation'):
+        """
+        Formats the totals in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): Prefix of the metric names.
+        """
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda item: tuple(map(str, item[0])))
+            rules = sorted(self.rules.items(), key=lambda item: repr(item[0]))
+        lines = []
+        for metric, index, help_text, items, label_names in (
+                ('phase_calls_total', 0, 'Evaluations timed per phase.', phases,
+                 ('evaluator', 'src', 'phase')),
+                ('phase_seconds_total', 1, 'Cumulative seconds spent per phase.', phases,
+                 ('evaluator', 'src', 'phase')),
+                ('rule_calls_total', 0, 'Evaluations per compiled rule.', rules,
+                 ('evaluator', 'rule')),
+                ('rule_seconds_total', 1, 'Cumulative seconds spent per compiled rule.', rules,
+                 ('evaluator', 'rule'))):
+            name = f'{prefix}_{metric}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for key, totals in items:
+                values = [key[0]] + [value if isinstance(value, str) else repr(value) for value in key[1:]]
+                labels = ','.join(f'{label}="{_escape(value)}"'
+                                  for label, value in zip(label_names, values))
+                lines.append(f'{name}{{{labels}}} {totals[index]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+@contextlib.contextmanager
+def profiling(timer=None, reset=True):
+    """
+    Enables the shared profiler for the duration of a block.
+
+    Args:
+        timer (callable): Timer to use inside the block; the profiler's
+            current timer by default.
+        reset (bool): Clear the totals when entering the block.
+
+    Examples:
+        >>> from evaluate_timerange import evaluate_timerange_sync
+        >>> import datetime
+        >>> with profiling() as stats:
+        ...     evaluate_timerange_sync({'now': datetime.datetime(2024, 6, 4, 10, 30),
+        ...                              'start': '10:00:00', 'end': '11:00:00'}, 'logaction')
+        True
+        >>> [(evaluator, calls) for evaluator, _, calls, _ in stats.slowest_rules()]
+        [('timerange', 1)]
+    """
+    previous = (profiler.enabled, profiler.timer)
+    if reset:
+        profiler.reset()
+    profiler.enable(timer)
+    try:
+        yield profiler
+    finally:
+        profiler.enabled, profiler.timer = previous
+
+
+# Shared by evaluate_timerange and evaluate_dayandtimerange.
+profiler = Profiler()
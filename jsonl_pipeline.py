@@ -0,0 +1,224 @@
+"""
+Streaming evaluation of time-range rules over JSONL event logs.
+
+Lines are read through a large buffer and handled in fixed-size batches, so
+memory stays bounded by the batch size whatever the file size. Each line is
+decoded once with json.loads, and its timestamp and, when the rule comes
+with the event, its rule fields are read from the resulting dict. Each batch
+is then evaluated with the vectorized path, one searchsorted per distinct
+rule in the batch.
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+
+import numpy as np
+
+import evaluate_dayandtimerange
+import evaluate_timerange
+from evaluate_dayandtimerange import DayAndTimeRange
+from rule_errors import errors
+from vectorized import evaluate_positions, week_positions
+from weekline import MICROS_PER_SECOND
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_UTC_EPOCH = _EPOCH.replace(tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_decode = json.JSONDecoder().decode
+
+_CACHES = {
+    'timerange': evaluate_timerange.rule_cache,
+    'dayandtimerange': evaluate_dayandtimerange.rule_cache,
+}
+
+class PipelineStats:
+    """
+    Totals of one evaluate_jsonl run.
+
+    Attributes:
+        events (int): Lines evaluated.
+        matched (int): Events for which the rule matched.
+        errors (int): Events with a bad line, timestamp or rule; they count
+            as not matched unless the evaluator returns not_operator.
+        seconds (float): Wall time of the run.
+    """
+    __slots__ = ('events', 'matched', 'errors', 'seconds')
+
+    def __init__(self):
+        self.events = 0
+        self.matched = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    @property
+    def events_per_sec(self):
+        return self.events / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return (f'PipelineStats(events={self.events}, matched={self.matched}, '
+                f'errors={self.errors}, events_per_sec={self.events_per_sec:,.0f})')
+
+
+def _timestamp_micros(value):
+    # (wall-clock micros as written, UTC micros) since the epoch, and
+    # whether the timestamp was naive
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        micros = round(value * MICROS_PER_SECOND)
+        return micros, micros, False
+    parsed = datetime.datetime.fromisoformat(value)
+    offset = parsed.utcoffset()
+    if offset is None:
+        wall = (parsed - _EPOCH) // _MICROSECOND
+        return wall, wall, True
+    utc = (parsed - _UTC_EPOCH) // _MICROSECOND
+    return utc + offset // _MICROSECOND, utc, False
+
+
+def _evaluate_batch(lines, rule, kind, src, time_field, stats):
+    count = len(lines)
+    wall = [0] * count
+    utc = [0] * count
+    results = np.zeros(count, dtype=bool)
+    groups = {}
+    # Compiled rule per distinct terms in the batch
+    rules = {None: rule}
+    cache = _CACHES[kind]
+
+    for index, line in enumerate(lines):
+        try:
+            event = _decode(line.decode('utf-8') if isinstance(line, bytes) else line)
+            if not isinstance(event, dict):
+                raise ValueError(f'expected a JSON object, got {type(event).__name__}')
+        except ValueError as err:
+            errors.record('jsonl', err)
+            stats.errors += 1
+            continue
+
+        try:
+            stamp = _timestamp_micros(event[time_field])
+        except Exception as err:
+            errors.record('jsonl', err)
+            stamp = None
+
+        if rule is None:
+            key = None
+            try:
+                key = cache.key(event, src)
+                compiled = rules.get(key)
+                if compiled is None:
+                    compiled = rules[key] = cache.get(key)
+            except Exception as err:
+                errors.record(kind, err)
+                stats.errors += 1
+                # Same result the evaluator gives on error
+                if kind == 'dayandtimerange' and key is not None:
+                    results[index] = bool(key[0])
+                continue
+        else:
+            key = None
+            compiled = rule
+
+        if stamp is None:
+            stats.errors += 1
+            # A bad 'now' makes the evaluator return not_operator as well
+            if isinstance(compiled, DayAndTimeRange):
+                results[index] = bool(compiled.not_operator)
+            continue
+        wall[index], utc[index], naive = stamp
+        # Grouped on the terms, which hash faster than the compiled rule
+        groups.setdefault((key, naive), []).append(index)
+
+    wall = np.array(wall, dtype=np.int64)
+    utc = np.array(utc, dtype=np.int64)
+    for (key, naive), indices in groups.items():
+        compiled = rules[key]
+        indices = np.asarray(indices, dtype=np.int64)
+        # Naive timestamps are already wall-clock readings in the rule's zone
+        if compiled.tz is None or naive:
+            positions = week_positions(wall[indices].view('datetime64[us]'))
+        else:
+            positions = week_positions(utc[indices].view('datetime64[us]'), compiled.tz)
+        results[indices] = evaluate_positions(compiled, positions)
+    return results
+
+
+def evaluate_jsonl(source, rule=None, kind='dayandtimerange', src='logaction',
+                   time_field='now', batch_size=65536, buffer_size=1 << 24, output=None):
+    """
+    Evaluates every event of a JSONL log against a time-range rule.
+
+    Args:
+        source (str or file): Path of the log, or a binary file opened on it.
+        rule (TimeRange or DayAndTimeRange): Evaluate every event against this
+            compiled rule. When None, each event carries its own rule fields
+            in the layout given by kind and src.
+        kind (str): 'timerange' or 'dayandtimerange', for per-event rules.
+        src (str): 'logaction' for flat rule fields, or None for 'terms' and
+            'condition' objects, as for the evaluators.
+        time_field (str): Key of the timestamp: an ISO 8601 string or epoch
+            seconds. Timestamps are read on their own wall clock unless the
+            rule has a zone and they are aware, exactly like the evaluators'
+            'now': naive ones are then taken as the zone's wall clock.
+        batch_size (int): Events evaluated per vectorized batch.
+        buffer_size (int): Read buffer size in bytes.
+        output (file): Optional binary file receiving one byte per event,
+            1 if the rule matched and 0 otherwise.
+
+    Returns:
+        PipelineStats: Event, match and error counts and the throughput.
+    """
+    if kind not in _CACHES:
+        raise ValueError(f'invalid kind {kind!r}')
+    stats = PipelineStats()
+    started = time.perf_counter()
+    handle = open(source, 'rb', buffering=buffer_size) if isinstance(source, str) else source
+    try:
+        batch = []
+        for line in handle:
+            if not line.strip():
+                continue
+            batch.append(line)
+            if len(batch) >= batch_size:
+                _flush(batch, rule, kind, src, time_field, stats, output)
+                batch = []
+        if batch:
+            _flush(batch, rule, kind, src, time_field, stats, output)
+    finally:
+        if handle is not source:
+            handle.close()
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def _flush(batch, rule, kind, src, time_field, stats, output):
+    results = _evaluate_batch(batch, rule, kind, src, time_field, stats)
+    stats.events += len(results)
+    stats.matched += int(results.sum())
+    if output is not None:
+        output.write(results.astype(np.uint8).tobytes())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate time-range rules over a JSONL log.')
+    parser.add_argument('path')
+    parser.add_argument('--kind', default='dayandtimerange', choices=sorted(_CACHES))
+    parser.add_argument('--time-field', default='now')
+    parser.add_argument('--batch-size', type=int, default=65536)
+    parser.add_argument('--output', help='write one result byte per event to this file')
+    args = parser.parse_args(argv)
+
+    output = open(args.output, 'wb') if args.output else None
+    try:
+        stats = evaluate_jsonl(args.path, kind=args.kind, time_field=args.time_field,
+                               batch_size=args.batch_size, output=output)
+    finally:
+        if output is not None:
+            output.close()
+    print(f'{stats.events} events, {stats.matched} matched, {stats.errors} errors, '
+          f'{stats.events_per_sec:,.0f} events/sec')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Closed-form totals of how long a rule is active over a period.
+
+A rule's week_intervals() repeat every week on its wall clock, so the active
+time before any wall-clock position is a multiple of the weekly total plus a
+prefix sum of the last partial week. The active time and number of openings
+between two datetimes then cost a few bisects, whatever the length of the
+period. Aware datetimes are split at the UTC offset changes of the rule's
+zone, so DST shifts are counted in real elapsed time.
+"""
+import bisect
+import collections
+import datetime
+import functools
+import itertools
+
+from timezones import EPOCH_ORDINAL, zone_offsets
+from weekline import (MICROS_PER_DAY, MICROS_PER_SECOND, MICROS_PER_WEEK, boundaries, contains,
+                      wall_micros)
+
+Occupancy = collections.namedtuple('Occupancy', ['active', 'openings'])
+Occupancy.__doc__ = """\
+Result of occupancy().
+
+Attributes:
+    active (datetime.timedelta): Total time the rule was active.
+    openings (int): Number of times the rule switched from inactive to active.
+"""
+
+_UTC_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@functools.lru_cache(maxsize=4096)
+def _weekly(rule):
+    # (interval starts, cumulative active time before each interval, total
+    # per week, opening positions, boundaries)
+    intervals = rule.week_intervals()
+    bounds = boundaries(intervals)
+    starts = tuple(start for start, _ in intervals)
+    before = tuple(itertools.accumulate((stop - start for start, stop in intervals), initial=0))
+    openings = tuple(start for start in starts
+                     if not contains(bounds, (start - 1) % MICROS_PER_WEEK))
+    return starts, intervals, before, bounds, openings
+
+
+def _active_before(weekly, position):
+    # Active microseconds in [origin, position) on the absolute wall line
+    starts, intervals, before, _, _ = weekly
+    weeks, offset = divmod(position - MICROS_PER_DAY, MICROS_PER_WEEK)
+    index = bisect.bisect_right(starts, offset)
+    partial = before[index - 1] + min(offset, intervals[index - 1][1]) - starts[index - 1] if index else 0
+    return weeks * before[-1] + partial
+
+
+def _openings_before(weekly, position):
+    openings = weekly[4]
+    weeks, offset = divmod(position - MICROS_PER_DAY, MICROS_PER_WEEK)
+    return weeks * len(openings) + bisect.bisect_left(openings, offset)
+
+
+def _active_at(weekly, position):
+    return contains(weekly[3], (position - MICROS_PER_DAY) % MICROS_PER_WEEK)
+
+
+def _segments(start, end, zone):
+    # Yields (wall start, wall end) pieces of [start, end) over which the
+    # wall clock runs at the same offset from UTC.
+    if start.tzinfo is None or zone is None:
+        if start.tzinfo is not None:
+            end = end.astimezone(start.tzinfo)
+        yield wall_micros(start), wall_micros(end)
+        return
+    micros = datetime.timedelta(microseconds=1)
+    lo = (start - _UTC_EPOCH) // micros
+    hi = (end - _UTC_EPOCH) // micros
+    offsets = zone_offsets(zone)
+    starts, values = offsets.transitions(lo // MICROS_PER_SECOND, hi // MICROS_PER_SECOND)
+    index = bisect.bisect_right(starts, lo // MICROS_PER_SECOND) - 1
+    epoch = EPOCH_ORDINAL * MICROS_PER_DAY
+    position = lo
+    while position < hi:
+        following = starts[index + 1] * MICROS_PER_SECOND if index + 1 < len(starts) else hi
+        stop = min(following, hi)
+        shift = epoch + values[index] * MICROS_PER_SECOND
+        yield position + shift, stop + shift
+        position = stop
+        index += 1
+
+
+def occupancy(rule, start, end):
+    """
+    Returns how long a rule is active between two datetimes, and how often it opens.
+
+    Args:
+        rule: A compiled TimeRange or DayAndTimeRange, a Schedule, or any
+            object with week_intervals() and tz.
+        start (datetime.datetime): Start of the period (inclusive).
+        end (datetime.datetime): End of the period (exclusive).
+
+    Returns:
+        Occupancy: The active time and the number of openings in the period.
+            An opening at start counts only if the rule was inactive just
+            before start.
+
+    Raises:
+        ValueError: If end is before start.
+
+    Examples:
+        >>> from evaluate_dayandtimerange import DayAndTimeRange
+        >>> office = DayAndTimeRange(0, 9 * 3600, 4, 17 * 3600 - 1, resolution='second')
+        >>> occupancy(office, datetime.datetime(2024, 1, 1), datetime.datetime(2024, 4, 1))
+        Occupancy(active=datetime.timedelta(days=21, seconds=57600), openings=65)
+    """
+    if end < start:
+        raise ValueError('end must not be before start')
+    zone = rule.tz
+    if zone is None and start.tzinfo is not None:
+        zone = getattr(start.tzinfo, 'key', None)
+    weekly = _weekly(rule)
+    if not weekly[0]:
+        return Occupancy(datetime.timedelta(0), 0)
+
+    active = 0
+    openings = 0
+    previous_end = None
+    for wall_start, wall_end in _segments(start, end, zone):
+        active += _active_before(weekly, wall_end) - _active_before(weekly, wall_start)
+        openings += _openings_before(weekly, wall_end) - _openings_before(weekly, wall_start)
+        if previous_end is not None:
+            # The instant before wall_start is the end of the previous
+            # segment, not wall_start - 1, when the offset changed.
+            opens_here = not _active_at(weekly, wall_start - 1) and _active_at(weekly, wall_start)
+            opened = not _active_at(weekly, previous_end - 1) and _active_at(weekly, wall_start)
+            openings += opened - opens_here
+        previous_end = wall_end
+    return Occupancy(datetime.timedelta(microseconds=active), openings)
+
+
+def active_seconds(rule, start, end):
+    """
+    Returns the number of seconds a rule is active between two datetimes.
+    """
+    return occupancy(rule, start, end).active.total_seconds()
@@ -0,0 +1,103 @@
+"""
+Multi-process evaluation of many compiled rules against many timestamps.
+
+The rules are pickled to each worker once, through the pool initializer.
+Timestamps and results live in shared memory, so a task is only a
+(start, stop) pair naming the slice of timestamps to evaluate.
+"""
+import concurrent.futures
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from vectorized import epoch_micros, evaluate_positions, week_positions
+
+_worker = {}
+
+
+def _evaluate_into(rules, micros, out):
+    # Week positions are computed once per zone and shared by its rules
+    timestamps = micros.view('datetime64[us]')
+    positions = {}
+    for row, rule in enumerate(rules):
+        if rule.tz not in positions:
+            positions[rule.tz] = week_positions(timestamps, rule.tz)
+        out[row] = evaluate_positions(rule, positions[rule.tz])
+
+
+def evaluate_serial(rules, timestamps):
+    """
+    Evaluates every rule against every timestamp in this process.
+
+    Args:
+        rules (list): Compiled TimeRange or DayAndTimeRange rules.
+        timestamps (numpy.ndarray): A datetime64 array (UTC) or an integer
+            array of epoch seconds, as for vectorized.evaluate_array.
+
+    Returns:
+        numpy.ndarray: A (len(rules), len(timestamps)) boolean array.
+    """
+    micros = epoch_micros(timestamps)
+    out = np.empty((len(rules), len(micros)), dtype=bool)
+    _evaluate_into(rules, micros, out)
+    return out
+
+
+def _init_worker(rules, input_name, output_name, count):
+    shared_input = shared_memory.SharedMemory(name=input_name)
+    shared_output = shared_memory.SharedMemory(name=output_name)
+    _worker['shared'] = (shared_input, shared_output)
+    _worker['rules'] = rules
+    _worker['micros'] = np.ndarray((count,), dtype=np.int64, buffer=shared_input.buf)
+    _worker['out'] = np.ndarray((len(rules), count), dtype=bool, buffer=shared_output.buf)
+
+
+def _run_chunk(start, stop):
+    _evaluate_into(_worker['rules'], _worker['micros'][start:stop], _worker['out'][:, start:stop])
+    return stop - start
+
+
+def evaluate_parallel(rules, timestamps, workers=None, chunk_size=1 << 20, executor_factory=None):
+    """
+    Evaluates every rule against every timestamp across a process pool.
+
+    The result is identical to evaluate_serial.
+
+    Args:
+        rules (list): Compiled TimeRange or DayAndTimeRange rules.
+        timestamps (numpy.ndarray): See evaluate_serial.
+        workers (int): Number of worker processes; defaults to the CPU count.
+        chunk_size (int): Timestamps per task.
+        executor_factory (callable): Builds the executor from max_workers,
+            initializer and initargs; defaults to ProcessPoolExecutor.
+
+    Returns:
+        numpy.ndarray: A (len(rules), len(timestamps)) boolean array.
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be >= 1')
+    rules = list(rules)
+    micros = epoch_micros(timestamps)
+    count = len(micros)
+    if not rules or not count:
+        return np.zeros((len(rules), count), dtype=bool)
+
+    workers = workers or os.cpu_count() or 1
+    executor_factory = executor_factory or concurrent.futures.ProcessPoolExecutor
+    shared_input = shared_memory.SharedMemory(create=True, size=micros.nbytes)
+    shared_output = shared_memory.SharedMemory(create=True, size=len(rules) * count)
+    try:
+        np.ndarray(micros.shape, dtype=np.int64, buffer=shared_input.buf)[:] = micros
+        with executor_factory(max_workers=workers, initializer=_init_worker,
+                              initargs=(rules, shared_input.name, shared_output.name, count)) as pool:
+            tasks = [pool.submit(_run_chunk, start, min(start + chunk_size, count))
+                     for start in range(0, count, chunk_size)]
+            for task in concurrent.futures.as_completed(tasks):
+                task.result()
+        return np.ndarray((len(rules), count), dtype=bool, buffer=shared_output.buf).copy()
+    finally:
+        shared_input.close()
+        shared_input.unlink()
+        shared_output.close()
+        shared_output.unlink()
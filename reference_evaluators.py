@@ -0,0 +1,123 @@
+"""
+The original evaluate_timerange and evaluate_dayandtimerange, kept as the
+reference that every optimized path is checked against.
+
+The bodies are the pre-compilation implementations, unchanged except that
+they are plain functions (they never awaited anything) and no longer print
+errors. Do not optimize or fix anything here: the point of this module is
+to pin down the historical semantics, quirks included.
+"""
+import datetime
+
+
+def reference_timerange(data: dict, src=None):
+    try:
+        current_datetime = data.get('now', datetime.datetime.now())
+
+        if src == 'logaction':
+            not_operator = data.get('not_operator', False)
+            start = data.get('start', '')
+            end = data.get('end', '')
+
+        elif src is None:
+            condition = data.get('condition', {})
+            terms = data.get('terms', {})
+            not_operator = condition.get('not_operator', False)
+            start = terms.get('start', '')
+            end = terms.get('end', '')
+
+        else:
+            raise ValueError('invalid src')
+
+        current_time = datetime.datetime.strptime(
+            current_datetime.strftime("%H:%M"), "%H:%M").time()
+        start = datetime.datetime.strptime(start, "%H:%M:%S").time()
+        end = datetime.datetime.strptime(end, "%H:%M:%S").time()
+
+        # Check if the current time is within the valid time range
+        if start <= end:
+            result = start <= current_time <= end
+        else:
+            result = current_time >= start or current_time <= end
+
+        return not_operator ^ result
+
+    except Exception:
+        return False
+
+
+def reference_dayandtimerange(data, src=None):
+    not_operator = False
+    try:
+        current_datetime = data.get(
+            'now', datetime.datetime.now(datetime.timezone.utc))
+        current_weekday = current_datetime.weekday()
+        current_time = current_datetime.time()
+
+        if src == 'logaction':
+            not_operator = data.get('not_operator', False)
+            start_day_of_week = data.get('start_day_of_week', -1)
+            start_time = data.get('start_time', '-1:-1:-1')
+            end_day_of_week = data.get('end_day_of_week', -1)
+            end_time = data.get('end_time', '-1:-1:-1')
+
+        elif src is None:
+            terms = data.get('terms', {})
+            condition = data.get('condition', {})
+            not_operator = condition.get('not_operator', False)
+            start_day_of_week = terms.get('start_day_of_week', -1)
+            start_time = terms.get('start_time', '-1:-1:-1')
+            end_day_of_week = terms.get('end_day_of_week', -1)
+            end_time = terms.get('end_time', '-1:-1:-1')
+
+        else:
+            raise ValueError('invalid src')
+
+        if start_day_of_week == -1 or \
+                start_time == '-1:-1:-1' or \
+                end_day_of_week == -1 or \
+                end_time == '-1:-1:-1':
+            return not_operator ^ False
+
+        if isinstance(start_time, str):
+            start_time = datetime.datetime.strptime(
+                start_time, "%H:%M:%S").time()
+        if isinstance(end_time, str):
+            end_time = datetime.datetime.strptime(end_time, "%H:%M:%S").time()
+
+        def is_within_time_range(start_time, end_time, current_time):
+            if start_time <= end_time:
+                return start_time <= current_time <= end_time
+            else:
+                return current_time >= start_time or current_time <= end_time
+
+        # Explicit check for single-day ranges
+        if start_day_of_week == end_day_of_week:
+            if current_weekday == start_day_of_week:
+                if is_within_time_range(start_time, end_time, current_time):
+                    return not_operator ^ True
+
+        if start_day_of_week <= end_day_of_week:
+            if start_day_of_week <= current_weekday <= end_day_of_week:
+                if is_within_time_range(start_time, end_time, current_time):
+                    return not_operator ^ True
+        else:
+            # Adjust for cross-week evaluation
+            current_weekday = (current_weekday + 1) % 7
+            if current_weekday > start_day_of_week or current_weekday < end_day_of_week:
+                if is_within_time_range(start_time, end_time, current_time):
+                    return not_operator ^ True
+            elif current_weekday == start_day_of_week:
+                if current_time >= start_time:
+                    return not_operator ^ True
+            elif current_weekday == end_day_of_week:
+                if current_time <= end_time:
+                    return not_operator ^ True
+            elif (current_weekday == (end_day_of_week + 1) % 7):
+                if current_time <= end_time:
+                    return not_operator ^ False
+
+        return not_operator ^ False
+
+    except Exception:
+        return not_operator ^ False
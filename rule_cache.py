@@ -0,0 +1,129 @@
+import collections
+import threading
+
+
+class RuleCache:
+    """
+    Bounded LRU cache of compiled rules, keyed on the canonical form of their terms.
+
+    The canonical key is what key_func extracts from a data dict, so the same
+    rule arriving as a logaction dict or as terms/condition shares one entry.
+    A hit returns the compiled rule without any parsing or validation.
+    Lookups and updates take a lock, so the cache can be shared by the
+    executor threads evaluate_many offloads to; rules are built outside it.
+
+    Args:
+        key_func (callable): Takes (data, src) and returns a hashable tuple.
+        build_func (callable): Takes the unpacked key and returns the compiled rule.
+        maxsize (int): Maximum number of compiled rules kept.
+
+    Examples:
+        >>> cache = RuleCache(lambda data, src: (data['start'],), int, maxsize=2)
+        >>> cache.compile({'start': '7'})
+        7
+        >>> cache.stats()['misses']
+        1
+    """
+
+    def __init__(self, key_func, build_func, maxsize=4096):
+        if maxsize < 0:
+            raise ValueError('maxsize must be >= 0')
+        self._key_func = key_func
+        self._build_func = build_func
+        self._maxsize = maxsize
+        self._rules = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        if value < 0:
+            raise ValueError('maxsize must be >= 0')
+        with self._lock:
+            self._maxsize = value
+            self._evict()
+
+    def __len__(self):
+        return len(self._rules)
+
+    def __contains__(self, key):
+        return key in self._rules
+
+    def key(self, data, src=None):
+        """
+        Returns the canonical cache key for a data dict.
+        """
+        return self._key_func(data, src)
+
+    def get(self, key):
+        """
+        Returns the compiled rule for a canonical key, compiling it on a miss.
+        """
+        rules = self._rules
+        with self._lock:
+            try:
+                rule = rules[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                rules.move_to_end(key)
+                self.hits += 1
+                return rule
+
+        rule = self._build_func(*key)
+        if self._maxsize:
+            with self._lock:
+                rules[key] = rule
+                self._evict()
+        return rule
+
+    def compile(self, data, src=None):
+        """
+        Returns the compiled rule for a data dict, compiling it on a miss.
+        """
+        return self.get(self._key_func(data, src))
+
+    def invalidate(self, data=None, src=None):
+        """
+        Drops the entry for data, or every entry when data is None.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        if data is None:
+            with self._lock:
+                removed = len(self._rules)
+                self._rules.clear()
+            return removed
+        key = self._key_func(data, src)
+        with self._lock:
+            return 1 if self._rules.pop(key, None) is not None else 0
+
+    def stats(self):
+        """
+        Returns the cache counters as a dict suitable for export.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._rules),
+            'maxsize': self._maxsize,
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self):
+        rules = self._rules
+        while len(rules) > self._maxsize:
+            rules.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,225 @@
+"""
+Evaluates whole rule documents whose leaves are time-range conditions.
+
+A rule document is a group of conditions combined with AND or OR:
+
+    {
+        'operator': 'and',
+        'conditions': [
+            {'type': 'dayandtimerange', 'terms': {...}, 'condition': {'not_operator': False}},
+            {'operator': 'or', 'conditions': [
+                {'type': 'timerange', 'terms': {...}, 'condition': {}},
+                ...
+            ]},
+        ]
+    }
+
+Leaves use the same terms/condition layout as evaluate_timerange and
+evaluate_dayandtimerange, and are compiled through their rule caches. The
+weekday and time of day are derived once per call and zone, and shared by
+every leaf.
+"""
+import datetime
+
+import evaluate_dayandtimerange
+import evaluate_timerange
+from rule_errors import errors
+from timezones import wall_clock
+
+OPERATORS = ('and', 'or')
+
+
+class Instant:
+    """
+    The instant a batch of documents is evaluated at.
+
+    The weekday and seconds-of-day are derived at most once per zone and
+    shared by every condition.
+
+    Args:
+        now (datetime.datetime): The instant to evaluate. None is the
+            current time, which timerange conditions read on the local
+            clock and dayandtimerange conditions on the UTC clock, as their
+            evaluators do.
+        tz (datetime.tzinfo): Convert now to this zone for conditions that
+            have no zone of their own, if given.
+
+    Raises:
+        ValueError: If tz is given and now is naive, since a naive now has
+            no instant to convert.
+    """
+    __slots__ = ('now', 'tz', '_local', '_fields')
+
+    def __init__(self, now=None, tz=None):
+        local = None
+        if now is None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            local = now.astimezone()
+        elif tz is not None and now.tzinfo is None:
+            raise ValueError('cannot convert a naive now to tz')
+        self.now = now
+        self.tz = tz
+        self._local = local
+        self._fields = {}
+
+    def fields(self, zone=None, local=False):
+        """
+        Returns (weekday, seconds) on the wall clock of a rule's zone.
+
+        Args:
+            zone (str): The rule's zone, or None.
+            local (bool): Read a defaulted now on the local clock rather
+                than on the UTC clock.
+        """
+        local = local and self._local is not None
+        key = (zone, local)
+        try:
+            return self._fields[key]
+        except KeyError:
+            pass
+        now = self._local if local else self.now
+        if zone is None and self.tz is not None:
+            now = now.astimezone(self.tz)
+        fields = self._fields[key] = wall_clock(now, zone)
+        return fields
+
+
+class RuleCondition:
+    """
+    Leaf evaluating a compiled TimeRange or DayAndTimeRange.
+    """
+    __slots__ = ('rule', 'local')
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.local = isinstance(rule, evaluate_timerange.TimeRange)
+
+    def evaluate(self, instant):
+        rule = self.rule
+        return rule.matches_at(*instant.fields(rule.tz, self.local))
+
+
+class ConstantCondition:
+    """
+    Leaf standing in for a condition whose terms could not be compiled.
+
+    It returns what the matching evaluator returns on error.
+    """
+    __slots__ = ('result',)
+
+    def __init__(self, result):
+        self.result = result
+
+    def evaluate(self, instant):
+        return self.result
+
+
+class ConditionGroup:
+    """
+    Compiled group of conditions combined with 'and' or 'or'.
+
+    Evaluation short-circuits as soon as the result of the group is known.
+    """
+    __slots__ = ('operator', 'conditions')
+
+    def __init__(self, operator, conditions):
+        if operator not in OPERATORS:
+            raise ValueError(f'invalid operator {operator!r}')
+        self.operator = operator
+        self.conditions = tuple(conditions)
+
+    def matches(self, now):
+        return self.evaluate(Instant(now))
+
+    def evaluate(self, instant):
+        if self.operator == 'and':
+            for condition in self.conditions:
+                if not condition.evaluate(instant):
+                    return False
+            return True
+        for condition in self.conditions:
+            if condition.evaluate(instant):
+                return True
+        return False
+
+
+def _compile_leaf(leaf):
+    condition_type = leaf.get('type')
+    if condition_type == 'timerange':
+        try:
+            return RuleCondition(evaluate_timerange.rule_cache.compile(leaf))
+        except Exception as err:
+            errors.record('timerange', err)
+            return ConstantCondition(False)
+    if condition_type == 'dayandtimerange':
+        not_operator = False
+        try:
+            terms = evaluate_dayandtimerange.rule_cache.key(leaf)
+            not_operator = terms[0]
+            return RuleCondition(evaluate_dayandtimerange.rule_cache.get(terms))
+        except Exception as err:
+            errors.record('dayandtimerange', err)
+            return ConstantCondition(not_operator ^ False)
+    raise ValueError(f'invalid condition type {condition_type!r}')
+
+
+def compile_rule_document(document):
+    """
+    Compiles a rule document into a tree of ConditionGroup and leaf conditions.
+
+    Raises:
+        ValueError: If a group has an unknown operator or a leaf an unknown type.
+    """
+    if 'conditions' not in document:
+        return _compile_leaf(document)
+    return ConditionGroup(
+        document.get('operator', 'and'),
+        (compile_rule_document(condition) for condition in document['conditions']))
+
+
+def evaluate_rule_document(document, now=None, tz=None):
+    """
+    Evaluates a rule document at one instant.
+
+    Args:
+        document (dict): The rule document, or an already compiled one.
+        now (datetime.datetime): The instant to evaluate. Defaults to the
+            current time, read by each condition like its evaluator does.
+        tz (datetime.tzinfo): Convert now to this zone before evaluating
+            conditions that have no 'timezone' of their own. now must then
+            be aware.
+
+    Raises:
+        ValueError: If tz is given with a naive now.
+
+    Returns:
+        bool: The result of the document.
+
+    Examples:
+        >>> document = {'operator': 'or', 'conditions': [
+        ...     {'type': 'timerange', 'terms': {'start': '10:00:00', 'end': '11:00:00'}},
+        ...     {'type': 'dayandtimerange', 'terms': {
+        ...         'start_day_of_week': 5, 'start_time': '00:00:00',
+        ...         'end_day_of_week': 6, 'end_time': '23:59:59'}}]}
+        >>> evaluate_rule_document(document, datetime.datetime(2024, 6, 4, 10, 30))
+        True
+    """
+    return evaluate_rule_documents([document], now, tz)[0]
+
+
+def evaluate_rule_documents(documents, now=None, tz=None):
+    """
+    Evaluates many rule documents at the same instant.
+
+    The instant is converted and decomposed once per zone for the whole batch.
+
+    Returns:
+        list of bool: One result per document.
+    """
+    instant = Instant(now, tz)
+    results = []
+    for document in documents:
+        if isinstance(document, dict):
+            document = compile_rule_document(document)
+        results.append(bool(document.evaluate(instant)))
+    return results
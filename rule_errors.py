@@ -0,0 +1,141 @@
+"""
+Typed rule validation errors and the error accounting used by the evaluators.
+
+Compiling a rule raises a RuleError subclass naming the bad field, so
+malformed terms can be rejected once when rules are loaded. At evaluation
+time the evaluators still return False (or not_operator) on error, but
+instead of printing they count the error in `errors`, which never does I/O
+unless a logging hook has been installed.
+"""
+import collections
+import threading
+import time
+
+
+class RuleError(ValueError):
+    """
+    A rule's terms cannot be compiled.
+
+    Args:
+        field (str): The offending field, e.g. 'start_time' or 'src'.
+        message (str): What is wrong with it.
+        value: The offending value.
+    """
+    kind = 'invalid_rule'
+
+    def __init__(self, field, message, value=None):
+        super().__init__(f'{field}: {message}')
+        self.field = field
+        self.value = value
+
+
+class InvalidSourceError(RuleError):
+    kind = 'invalid_src'
+
+
+class MissingFieldError(RuleError):
+    kind = 'missing_field'
+
+
+class InvalidTimeError(RuleError):
+    kind = 'invalid_time'
+
+
+class InvalidDayError(RuleError):
+    kind = 'invalid_day'
+
+
+class InvalidZoneError(RuleError):
+    kind = 'invalid_zone'
+
+
+class InvalidResolutionError(RuleError):
+    kind = 'invalid_resolution'
+
+
+class InvalidDateError(RuleError):
+    kind = 'invalid_date'
+
+
+class UnknownCalendarError(RuleError):
+    kind = 'unknown_calendar'
+
+
+def error_kind(error):
+    """
+    Returns the counter name for an error: the RuleError kind, else the class name.
+    """
+    return getattr(error, 'kind', type(error).__name__)
+
+
+class ErrorAccounting:
+    """
+    Counts evaluation errors per source and kind, with an optional logging hook.
+
+    The hook is called as hook(source, error, suppressed) at most once every
+    min_interval seconds; suppressed is the number of errors that were only
+    counted since the previous call.
+
+    Examples:
+        >>> accounting = ErrorAccounting()
+        >>> accounting.record('timerange', InvalidTimeError('start', 'bad time', '25:00:00'))
+        >>> accounting.snapshot()
+        {'timerange': {'invalid_time': 1}}
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.counts = collections.Counter()
+        self._hook = None
+        self._min_interval = 0.0
+        self._last_call = None
+        self._suppressed = 0
+
+    def set_hook(self, hook, min_interval=1.0):
+        """
+        Installs a logging hook, or removes it when hook is None.
+        """
+        with self._lock:
+            self._hook = hook
+            self._min_interval = min_interval
+            self._last_call = None
+            self._suppressed = 0
+
+    def record(self, source, error):
+        """
+        Counts an error raised while evaluating a rule from source.
+        """
+        kind = error_kind(error)
+        with self._lock:
+            self.counts[(source, kind)] += 1
+            if self._hook is None:
+                return
+            now = self._clock()
+            if self._last_call is not None and now - self._last_call < self._min_interval:
+                self._suppressed += 1
+                return
+            suppressed = self._suppressed
+            self._last_call = now
+            self._suppressed = 0
+            hook = self._hook
+        hook(source, error, suppressed)
+
+    def snapshot(self):
+        """
+        Returns the counters as {source: {kind: count}}.
+        """
+        with self._lock:
+            counts = sorted(self.counts.items())
+        result = {}
+        for (source, kind), count in counts:
+            result.setdefault(source, {})[kind] = count
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+# Shared by evaluate_timerange, evaluate_dayandtimerange and the rule engine.
+errors = ErrorAccounting()
@@ -0,0 +1,156 @@
+"""
+Index answering "which rules are active at this instant" for many rules at once.
+"""
+import bisect
+
+from timezones import wall_position
+from weekline import MICROS_PER_WEEK
+
+
+class _Node:
+    __slots__ = ('by_start', 'by_stop')
+
+    def __init__(self):
+        self.by_start = []
+        self.by_stop = []
+
+
+class RuleIndex:
+    """
+    Interval index over the week line for many compiled rules.
+
+    Every rule is projected onto the week line with week_intervals(), which
+    already splits ranges that wrap around the end of the week. The intervals
+    are kept in a centered interval tree whose centers are the midpoints of a
+    fixed binary partition of the week, so rules can be added and removed
+    one at a time without rebalancing or rebuilding. A lookup visits one node
+    per level (about 40 for microsecond positions) plus the matching entries.
+    Rules with different zones live in separate trees, and each tree is
+    queried at the instant's wall-clock position in its zone.
+
+    Args:
+        rules (dict): Optional mapping of rule ID to compiled rule to start with.
+
+    Examples:
+        >>> import datetime
+        >>> from evaluate_dayandtimerange import DayAndTimeRange
+        >>> index = RuleIndex({'office': DayAndTimeRange(0, 28800, 4, 64800)})
+        >>> index.active(datetime.datetime(2024, 6, 4, 12, 0))
+        {'office'}
+    """
+
+    def __init__(self, rules=None):
+        self._trees = {}
+        self._entries = {}
+        self._ids = {}
+        self._next_serial = 0
+        if rules:
+            for rule_id, rule in rules.items():
+                self.add(rule_id, rule)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, rule_id):
+        return rule_id in self._entries
+
+    def rule(self, rule_id):
+        """
+        Returns the compiled rule stored under rule_id.
+        """
+        return self._entries[rule_id][0]
+
+    def add(self, rule_id, rule):
+        """
+        Adds a compiled rule, replacing any rule already stored under rule_id.
+        """
+        if rule_id in self._entries:
+            self.remove(rule_id)
+        serial = self._next_serial
+        self._next_serial += 1
+        intervals = rule.week_intervals()
+        nodes = self._trees.setdefault(rule.tz, {})
+        for start, stop in intervals:
+            center = self._center(start, stop)
+            node = nodes.get(center)
+            if node is None:
+                node = nodes[center] = _Node()
+            bisect.insort(node.by_start, (start, serial))
+            bisect.insort(node.by_stop, (stop, serial))
+        self._entries[rule_id] = (rule, serial, intervals)
+        self._ids[serial] = rule_id
+
+    def remove(self, rule_id):
+        """
+        Removes a rule.
+
+        Raises:
+            KeyError: If no rule is stored under rule_id.
+        """
+        rule, serial, intervals = self._entries.pop(rule_id)
+        del self._ids[serial]
+        nodes = self._trees[rule.tz]
+        for start, stop in intervals:
+            center = self._center(start, stop)
+            node = nodes[center]
+            del node.by_start[bisect.bisect_left(node.by_start, (start, serial))]
+            del node.by_stop[bisect.bisect_left(node.by_stop, (stop, serial))]
+            if not node.by_start:
+                del nodes[center]
+        if not nodes:
+            del self._trees[rule.tz]
+
+    def active(self, now):
+        """
+        Returns the IDs of the rules that match a datetime.
+        """
+        found = set()
+        for tz in self._trees:
+            found |= self.active_at(wall_position(now, tz), tz)
+        return found
+
+    def active_at(self, position, tz=None):
+        """
+        Returns the IDs of the rules of one zone active at a microsecond-of-week position.
+        """
+        ids = self._ids
+        nodes = self._trees.get(tz, {})
+        found = set()
+        lo = 0
+        hi = MICROS_PER_WEEK
+        while lo < hi:
+            center = (lo + hi) // 2
+            node = nodes.get(center)
+            if position < center:
+                if node is not None:
+                    for start, serial in node.by_start:
+                        if start > position:
+                            break
+                        found.add(ids[serial])
+                hi = center
+            elif position > center:
+                if node is not None:
+                    for stop, serial in reversed(node.by_stop):
+                        if stop <= position:
+                            break
+                        found.add(ids[serial])
+                lo = center + 1
+            else:
+                if node is not None:
+                    found.update(ids[serial] for _, serial in node.by_start)
+                break
+        return found
+
+    @staticmethod
+    def _center(start, stop):
+        # The first center of the partition that falls inside [start, stop)
+        lo = 0
+        hi = MICROS_PER_WEEK
+        while True:
+            center = (lo + hi) // 2
+            if stop <= center:
+                hi = center
+            elif start > center:
+                lo = center + 1
+            else:
+                return center
@@ -0,0 +1,256 @@
+"""
+Binary files of compiled rules that load without parsing.
+
+Layout (all integers little-endian):
+
+- header: magic b'RULESET\\0', format version, record size, record count,
+  zone count, string pool size, CRC-32 of everything after the header
+- records: one fixed-width record per rule (see _RECORD)
+- zones: (offset, length) of each zone name in the string pool
+- string pool: UTF-8 rule IDs and zone names
+
+Opening a file maps it read-only, checks the header and the checksum, and
+decodes nothing else: records are unpacked when a rule is asked for, so
+every worker process maps the same pages from the page cache.
+"""
+import mmap
+import struct
+import zlib
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+
+MAGIC = b'RULESET\0'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sHHIIII')
+# kind, flags, start_day, end_day, start, end, id offset, id length, zone
+# index (0 is no zone), padding
+_RECORD = struct.Struct('<BBbbiiIIH2x')
+_ZONE = struct.Struct('<II')
+
+KIND_TIMERANGE = 0
+KIND_DAYANDTIMERANGE = 1
+
+# Ranges of the signed day and bound fields
+_INT8 = (-128, 127)
+_INT32 = (-2 ** 31, 2 ** 31 - 1)
+
+_NOT_OPERATOR = 0x01
+_RESOLUTIONS = ('minute', 'second', 'microsecond')
+
+# Field layout of a record, for numpy.frombuffer
+RECORD_FIELDS = [('kind', '<u1'), ('flags', '<u1'), ('start_day', '<i1'), ('end_day', '<i1'),
+                 ('start', '<i4'), ('end', '<i4'), ('id_offset', '<u4'), ('id_length', '<u4'),
+                 ('zone', '<u2'), ('padding', 'V2')]
+
+
+def dumps(rules):
+    """
+    Serializes compiled rules.
+
+    Args:
+        rules (dict): Mapping of rule ID (str) to TimeRange or DayAndTimeRange.
+
+    Returns:
+        bytes: The file contents.
+
+    Raises:
+        TypeError: If a rule is of another type, or a day or bound is not
+            an integer.
+        ValueError: If a day or bound does not fit its record field.
+    """
+    pool = bytearray()
+    zones = {}
+    records = bytearray()
+    for rule_id, rule in rules.items():
+        if type(rule) not in (TimeRange, DayAndTimeRange):
+            raise TypeError(f'cannot serialize {type(rule).__name__}')
+        encoded = rule_id.encode('utf-8')
+        id_offset = len(pool)
+        pool += encoded
+        zone = 0
+        if rule.tz is not None:
+            if rule.tz not in zones:
+                zones[rule.tz] = len(zones) + 1
+            zone = zones[rule.tz]
+        flags = (_NOT_OPERATOR if rule.not_operator else 0) | _RESOLUTIONS.index(rule.resolution) << 1
+        start = _check_field(rule_id, 'start', rule.start, _INT32)
+        end = _check_field(rule_id, 'end', rule.end, _INT32)
+        if type(rule) is TimeRange:
+            fields = (KIND_TIMERANGE, flags, 0, 0, start, end)
+        else:
+            fields = (KIND_DAYANDTIMERANGE, flags,
+                      _check_field(rule_id, 'start_day', rule.start_day, _INT8),
+                      _check_field(rule_id, 'end_day', rule.end_day, _INT8), start, end)
+        records += _RECORD.pack(*fields, id_offset, len(encoded), zone)
+
+    zone_table = bytearray()
+    for name in zones:
+        encoded = name.encode('utf-8')
+        zone_table += _ZONE.pack(len(pool), len(encoded))
+        pool += encoded
+
+    body = bytes(records + zone_table + pool)
+    header = _HEADER.pack(MAGIC, VERSION, _RECORD.size, len(rules), len(zones), len(pool),
+                          zlib.crc32(body))
+    return header + body
+
+
+def _check_field(rule_id, field, value, bounds):
+    # struct.error is neither TypeError nor ValueError, so check first
+    if not isinstance(value, int):
+        raise TypeError(f'rule {rule_id!r}: {field} must be an integer, got {value!r}')
+    low, high = bounds
+    if not low <= value <= high:
+        raise ValueError(f'rule {rule_id!r}: {field} {value!r} is outside {low}..{high}')
+    return value
+
+
+def dump(rules, path):
+    """
+    Writes compiled rules to a file; see dumps.
+    """
+    with open(path, 'wb') as file:
+        file.write(dumps(rules))
+
+
+class RuleSet:
+    """
+    Read-only view of a serialized rule set.
+
+    Args:
+        buffer: bytes, mmap or any other object supporting the buffer
+            protocol, holding the output of dumps.
+        verify (bool): Check the CRC-32 of the body.
+
+    Raises:
+        ValueError: If the header is not a supported rule set header, the
+            buffer is truncated, or the checksum does not match.
+
+    Examples:
+        >>> rules = RuleSet(dumps({'office': DayAndTimeRange(0, 28800, 4, 64800)}))
+        >>> rules['office']
+        DayAndTimeRange(start_day=0, start=28800, end_day=4, end=64800, not_operator=False, tz=None, resolution='microsecond')
+    """
+
+    def __init__(self, buffer, verify=True):
+        view = memoryview(buffer).cast('B')
+        if len(view) < _HEADER.size:
+            raise ValueError('truncated rule set header')
+        magic, version, record_size, count, zone_count, pool_size, checksum = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('not a rule set file')
+        if version != VERSION or record_size != _RECORD.size:
+            raise ValueError(f'unsupported rule set version {version} (record size {record_size})')
+        self._records = _HEADER.size
+        self._zones = self._records + count * _RECORD.size
+        self._pool = self._zones + zone_count * _ZONE.size
+        if len(view) != self._pool + pool_size:
+            raise ValueError('rule set size does not match its header')
+        if verify and zlib.crc32(view[_HEADER.size:]) != checksum:
+            raise ValueError('rule set checksum mismatch')
+        self._view = view
+        self._buffer = buffer
+        self._count = count
+        self._zone_names = [None] * (zone_count + 1)
+        self._index = None
+
+    @classmethod
+    def open(cls, path, verify=True):
+        """
+        Maps a rule set file read-only.
+        """
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, verify)
+
+    def close(self):
+        """
+        Releases the buffer, unmapping it when it came from open.
+
+        Arrays returned by records() share the buffer and should be dropped
+        first. If some are still alive, the mapping stays valid for them and
+        is unmapped once the last one is gone. The rule set cannot be used
+        after close either way.
+        """
+        view = self._view
+        buffer = self._buffer
+        self._view = self._buffer = None
+        if view is None:
+            return
+        try:
+            view.release()
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return _RECORD.unpack_from(self._view, self._records + index * _RECORD.size)
+
+    def _string(self, offset, length):
+        start = self._pool + offset
+        return bytes(self._view[start:start + length]).decode('utf-8')
+
+    def _zone(self, zone):
+        if zone == 0:
+            return None
+        name = self._zone_names[zone]
+        if name is None:
+            offset, length = _ZONE.unpack_from(self._view, self._zones + (zone - 1) * _ZONE.size)
+            name = self._zone_names[zone] = self._string(offset, length)
+        return name
+
+    def rule_id(self, index):
+        """
+        Returns the ID of the rule at a position.
+        """
+        record = self._record(index)
+        return self._string(record[6], record[7])
+
+    def rule(self, index):
+        """
+        Builds the compiled rule at a position.
+        """
+        kind, flags, start_day, end_day, start, end, _, _, zone = self._record(index)
+        not_operator = bool(flags & _NOT_OPERATOR)
+        resolution = _RESOLUTIONS[flags >> 1 & 0x03]
+        if kind == KIND_TIMERANGE:
+            return TimeRange(start, end, not_operator, self._zone(zone), resolution)
+        return DayAndTimeRange(start_day, start, end_day, end, not_operator, self._zone(zone), resolution)
+
+    def __getitem__(self, rule_id):
+        if self._index is None:
+            self._index = {self.rule_id(index): index for index in range(self._count)}
+        return self.rule(self._index[rule_id])
+
+    def items(self):
+        """
+        Yields (rule ID, compiled rule) pairs in file order.
+        """
+        for index in range(self._count):
+            yield self.rule_id(index), self.rule(index)
+
+    def records(self):
+        """
+        Returns the records as a numpy structured array sharing the buffer.
+
+        Needs numpy; the field names are those of RECORD_FIELDS. The array
+        keeps the buffer alive, see close.
+        """
+        import numpy as np
+
+        return np.frombuffer(self._view, dtype=np.dtype(RECORD_FIELDS), count=self._count,
+                             offset=self._records)
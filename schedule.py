@@ -0,0 +1,137 @@
+"""
+Composable weekly schedules built from compiled rules.
+
+A Schedule is a normalized interval list on the week line, so a composite of
+any number of ranges costs one binary search to evaluate, the same as a
+single range.
+"""
+from immutable import Immutable
+from timezones import wall_position
+from weekline import (FULL_WEEK, MICROS_PER_SECOND, boundaries, complement_intervals, contains,
+                      intersect_intervals, merge_intervals)
+
+
+class Schedule(Immutable):
+    """
+    An immutable set of half-open microsecond-of-week intervals in one zone.
+
+    Schedules combine with | (union), & (intersection), - (difference) and
+    ~ (complement); the result is always the minimal sorted interval list.
+    Like the rules, a Schedule has week_intervals() and tz, so it can be
+    used wherever a compiled rule is projected onto the week line (the rule
+    index, the vectorized evaluator, WeekBitmap.from_rule).
+
+    Args:
+        intervals (iterable): (start, stop) microsecond-of-week pairs, in any
+            order, possibly overlapping.
+        tz (str): The IANA zone the positions are wall-clock times in.
+
+    Examples:
+        >>> import datetime
+        >>> from evaluate_dayandtimerange import DayAndTimeRange
+        >>> office = Schedule.from_rule(DayAndTimeRange(0, 9 * 3600, 4, 17 * 3600))
+        >>> lunch = Schedule.from_rule(DayAndTimeRange(0, 12 * 3600, 6, 13 * 3600 - 1))
+        >>> working = office - lunch
+        >>> working.matches(datetime.datetime(2024, 6, 4, 12, 30))
+        False
+        >>> working.matches(datetime.datetime(2024, 6, 4, 14, 0))
+        True
+    """
+    __slots__ = ('intervals', 'tz', '_bounds')
+
+    def __init__(self, intervals=(), tz=None):
+        intervals = merge_intervals(intervals)
+        object.__setattr__(self, 'intervals', intervals)
+        object.__setattr__(self, 'tz', tz)
+        object.__setattr__(self, '_bounds', boundaries(intervals))
+
+    @classmethod
+    def from_rule(cls, rule):
+        """
+        Builds the schedule of a compiled TimeRange or DayAndTimeRange rule.
+        """
+        return cls(rule.week_intervals(), rule.tz)
+
+    @classmethod
+    def always(cls, tz=None):
+        return cls(FULL_WEEK, tz)
+
+    def week_intervals(self):
+        return self.intervals
+
+    def seconds(self):
+        """
+        Returns the intervals in seconds-of-week, as (start, stop) floats.
+        """
+        return tuple((start / MICROS_PER_SECOND, stop / MICROS_PER_SECOND)
+                     for start, stop in self.intervals)
+
+    def matches(self, now):
+        """
+        Checks a datetime on the wall clock of the schedule's timezone.
+        """
+        return contains(self._bounds, wall_position(now, self.tz))
+
+    def matches_at(self, weekday, seconds):
+        """
+        Checks a weekday (0 is Monday) and a seconds-of-day value.
+        """
+        return contains(self._bounds, round((weekday * 86400 + seconds) * MICROS_PER_SECOND))
+
+    def union(self, other):
+        self._check_zone(other)
+        return Schedule(self.intervals + other.intervals, self.tz)
+
+    def intersection(self, other):
+        self._check_zone(other)
+        return Schedule(intersect_intervals(self.intervals, other.intervals), self.tz)
+
+    def difference(self, other):
+        self._check_zone(other)
+        return Schedule(intersect_intervals(self.intervals, complement_intervals(other.intervals)), self.tz)
+
+    def complement(self):
+        return Schedule(complement_intervals(self.intervals), self.tz)
+
+    def _check_zone(self, other):
+        if self.tz != other.tz:
+            raise ValueError(f'cannot combine schedules in {self.tz!r} and {other.tz!r}')
+
+    def _coerce(self, other):
+        if isinstance(other, Schedule):
+            return other
+        if hasattr(other, 'week_intervals'):
+            return Schedule.from_rule(other)
+        return None
+
+    def __or__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self.union(other)
+
+    def __and__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self.intersection(other)
+
+    def __sub__(self, other):
+        other = self._coerce(other)
+        return NotImplemented if other is None else self.difference(other)
+
+    def __invert__(self):
+        return self.complement()
+
+    def __bool__(self):
+        return bool(self.intervals)
+
+    def __reduce__(self):
+        return (Schedule, (self.intervals, self.tz))
+
+    def __eq__(self, other):
+        if not isinstance(other, Schedule):
+            return NotImplemented
+        return (self.intervals, self.tz) == (other.intervals, other.tz)
+
+    def __hash__(self):
+        return hash((self.intervals, self.tz))
+
+    def __repr__(self):
+        return f'Schedule({self.intervals!r}, tz={self.tz!r})'
@@ -0,0 +1,155 @@
+"""
+Fixed-size weekly bitmaps that compiled rules can be materialized into.
+
+A bitmap has one bit per slot of the week (10080 minutes, or 604800 seconds
+at second resolution), stored little-endian in a bytes object. Looking up an
+instant is a single index operation, and schedules combine with the bitwise
+operators.
+"""
+from immutable import Immutable
+from timezones import wall_position
+from weekline import MICROS_PER_SECOND, SECONDS_PER_WEEK
+
+RESOLUTIONS = (60, 1)
+
+
+class WeekBitmap(Immutable):
+    """
+    An immutable weekly schedule sampled at a fixed resolution.
+
+    Slot i covers [i * resolution, (i + 1) * resolution) seconds of the week
+    and is set when the schedule is active at the start of the slot, so an
+    instant is looked up with its time truncated to the resolution. That is
+    exact for TimeRange rules at minute resolution, which already truncate
+    the current time to the minute.
+
+    Examples:
+        >>> from evaluate_timerange import TimeRange
+        >>> bitmap = WeekBitmap.from_rule(TimeRange(8 * 3600, 17 * 3600))
+        >>> bitmap.matches_at(2, 12 * 3600), bitmap.matches_at(2, 18 * 3600)
+        (True, False)
+        >>> len(bitmap.data)
+        1260
+    """
+    __slots__ = ('data', 'resolution', 'tz')
+
+    def __init__(self, data, resolution=60, tz=None):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f'resolution must be one of {RESOLUTIONS}, got {resolution!r}')
+        data = bytes(data)
+        if len(data) != _byte_count(resolution):
+            raise ValueError(f'expected {_byte_count(resolution)} bytes, got {len(data)}')
+        object.__setattr__(self, 'data', data)
+        object.__setattr__(self, 'resolution', resolution)
+        object.__setattr__(self, 'tz', tz)
+
+    @classmethod
+    def from_intervals(cls, intervals, resolution=60, tz=None):
+        """
+        Builds a bitmap from half-open microsecond-of-week intervals.
+
+        Args:
+            intervals (iterable): (start, stop) pairs as returned by the
+                rules' week_intervals.
+            resolution (int): Slot length in seconds, 60 or 1.
+            tz (str): The zone the intervals are expressed in.
+        """
+        step = resolution * MICROS_PER_SECOND
+        bits = 0
+        for start, stop in intervals:
+            # Slots whose first instant falls inside [start, stop)
+            first = -(-start // step)
+            last = -(-stop // step)
+            if last > first:
+                bits |= ((1 << (last - first)) - 1) << first
+        return cls(bits.to_bytes(_byte_count(resolution), 'little'), resolution, tz)
+
+    @classmethod
+    def from_rule(cls, rule, resolution=60):
+        """
+        Materializes a compiled TimeRange or DayAndTimeRange rule.
+        """
+        return cls.from_intervals(rule.week_intervals(), resolution, rule.tz)
+
+    @classmethod
+    def from_rules(cls, rules, operator='or', resolution=60):
+        """
+        Materializes the union ('or') or intersection ('and') of rules.
+
+        All rules must share a timezone.
+        """
+        if operator not in ('and', 'or'):
+            raise ValueError(f"operator must be 'and' or 'or', got {operator!r}")
+        bitmaps = [cls.from_rule(rule, resolution) for rule in rules]
+        if not bitmaps:
+            raise ValueError('at least one rule is required')
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = result | bitmap if operator == 'or' else result & bitmap
+        return result
+
+    @property
+    def slots(self):
+        return SECONDS_PER_WEEK // self.resolution
+
+    def matches_at(self, weekday, seconds):
+        """
+        Looks up a weekday (0 is Monday) and seconds-of-day.
+        """
+        index = (weekday * 86400 + int(seconds)) // self.resolution
+        return self.data[index >> 3] >> (index & 7) & 1 == 1
+
+    def matches(self, now):
+        """
+        Looks up a datetime on the wall clock of the bitmap's timezone.
+        """
+        index = wall_position(now, self.tz) // (self.resolution * MICROS_PER_SECOND)
+        return self.data[index >> 3] >> (index & 7) & 1 == 1
+
+    def count(self):
+        """
+        Returns the number of active slots.
+        """
+        return int.from_bytes(self.data, 'little').bit_count()
+
+    def _combine(self, other, operation):
+        if not isinstance(other, WeekBitmap):
+            return NotImplemented
+        if (self.resolution, self.tz) != (other.resolution, other.tz):
+            raise ValueError('bitmaps must share resolution and timezone')
+        bits = operation(int.from_bytes(self.data, 'little'), int.from_bytes(other.data, 'little'))
+        return WeekBitmap(bits.to_bytes(len(self.data), 'little'), self.resolution, self.tz)
+
+    def __or__(self, other):
+        return self._combine(other, int.__or__)
+
+    def __and__(self, other):
+        return self._combine(other, int.__and__)
+
+    def __xor__(self, other):
+        return self._combine(other, int.__xor__)
+
+    def __sub__(self, other):
+        return self._combine(other, lambda left, right: left & ~right)
+
+    def __invert__(self):
+        bits = ~int.from_bytes(self.data, 'little') & ((1 << self.slots) - 1)
+        return WeekBitmap(bits.to_bytes(len(self.data), 'little'), self.resolution, self.tz)
+
+    def __reduce__(self):
+        return (WeekBitmap, (self.data, self.resolution, self.tz))
+
+    def __eq__(self, other):
+        if not isinstance(other, WeekBitmap):
+            return NotImplemented
+        return (self.data, self.resolution, self.tz) == (other.data, other.resolution, other.tz)
+
+    def __hash__(self):
+        return hash((self.data, self.resolution, self.tz))
+
+    def __repr__(self):
+        return f'WeekBitmap(<{self.count()}/{self.slots} slots>, resolution={self.resolution}, tz={self.tz!r})'
+
+
+def _byte_count(resolution):
+    return -(-(SECONDS_PER_WEEK // resolution) // 8)
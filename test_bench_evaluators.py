@@ -0,0 +1,25 @@
+from bench_evaluators import compare_results, measure, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+
+
+def test_compare_results_flags_regressions_over_threshold():
+    baseline = {'a': {'ops_per_sec': 100.0}, 'b': {'ops_per_sec': 100.0}}
+    results = {
+        'a': {'ops_per_sec': 85.0},
+        'b': {'ops_per_sec': 95.0},
+        'new': {'ops_per_sec': 1.0},
+    }
+    assert compare_results(results, baseline, 0.1) == [('a', 100.0, 85.0, -0.15000000000000002)]
+
+
+def test_measure_reports_latency_per_op():
+    result = measure(lambda: sum(range(100)), ops=100, samples=3, min_time=0.001)
+    assert result['p50'] <= result['p99']
+    assert result['calls'] >= 200
+    assert result['ops_per_sec'] > 0
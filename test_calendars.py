@@ -0,0 +1,109 @@
+import datetime
+import random
+
+import pytest
+
+from calendars import (Calendar, CalendarRule, compile_calendar_rule, get_calendar,
+                       register_calendar)
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+from rule_errors import InvalidDateError, UnknownCalendarError
+
+OFFICE = DayAndTimeRange(0, 9 * 3600, 4, 17 * 3600)
+HOLIDAYS = Calendar(['2024-12-24', '2024-12-25', '2024-12-26', '2025-01-01'], 'holidays')
+MAINTENANCE = [(datetime.datetime(2024, 12, 18, 12, 0), datetime.datetime(2024, 12, 18, 14, 30))]
+
+
+def test_matches_applies_dates_exceptions_and_closures():
+    rule = CalendarRule(OFFICE, datetime.date(2024, 12, 2), datetime.date(2025, 1, 31), HOLIDAYS, MAINTENANCE)
+    rng = random.Random(5)
+    start = datetime.datetime(2024, 11, 25)
+    for _ in range(5000):
+        now = start + datetime.timedelta(microseconds=rng.randrange(80 * 86400 * 10**6))
+        expected = (datetime.date(2024, 12, 2) <= now.date() <= datetime.date(2025, 1, 31)
+                    and now.date() not in HOLIDAYS
+                    and not MAINTENANCE[0][0] <= now < MAINTENANCE[0][1]
+                    and OFFICE.matches(now))
+        assert rule.matches(now) == expected, now
+
+
+def test_dates_are_read_in_the_rule_zone():
+    rule = CalendarRule(DayAndTimeRange(0, 0, 6, 86399, tz='Asia/Tokyo'), exceptions=HOLIDAYS)
+    # 16:00 UTC on Dec 23 is already Dec 24 in Tokyo
+    assert rule.matches(datetime.datetime(2024, 12, 23, 14, 0, tzinfo=datetime.timezone.utc)) is True
+    assert rule.matches(datetime.datetime(2024, 12, 23, 16, 0, tzinfo=datetime.timezone.utc)) is False
+
+
+def test_iter_ranges_skips_exception_days_and_cuts_closures():
+    rule = CalendarRule(OFFICE, valid_until=datetime.date(2024, 12, 27), exceptions=HOLIDAYS,
+                        closures=MAINTENANCE)
+    ranges = list(rule.iter_ranges(datetime.date(2024, 12, 16)))
+    day = datetime.datetime
+    # Ends are exclusive, and 17:00:00 itself still matches
+    tick = datetime.timedelta(microseconds=1)
+    assert ranges == [
+        (day(2024, 12, 16, 9), day(2024, 12, 16, 17) + tick),
+        (day(2024, 12, 17, 9), day(2024, 12, 17, 17) + tick),
+        (day(2024, 12, 18, 9), day(2024, 12, 18, 12)),
+        (day(2024, 12, 18, 14, 30), day(2024, 12, 18, 17) + tick),
+        (day(2024, 12, 19, 9), day(2024, 12, 19, 17) + tick),
+        (day(2024, 12, 20, 9), day(2024, 12, 20, 17) + tick),
+        (day(2024, 12, 23, 9), day(2024, 12, 23, 17) + tick),
+        (day(2024, 12, 27, 9), day(2024, 12, 27, 17) + tick),
+    ]
+
+
+def test_iter_ranges_cuts_overnight_occurrences_at_midnight():
+    rule = CalendarRule(TimeRange(22 * 3600, 6 * 3600, resolution='second'),
+                        exceptions=Calendar(['2024-06-05']))
+    ranges = list(rule.iter_ranges(datetime.date(2024, 6, 3), until=datetime.datetime(2024, 6, 6)))
+    assert ranges == [
+        # Already running at the start of the first week
+        (datetime.datetime(2024, 6, 3), datetime.datetime(2024, 6, 3, 6, 0, 1)),
+        (datetime.datetime(2024, 6, 3, 22), datetime.datetime(2024, 6, 4, 6, 0, 1)),
+        (datetime.datetime(2024, 6, 4, 22), datetime.datetime(2024, 6, 5)),
+        (datetime.datetime(2024, 6, 6), datetime.datetime(2024, 6, 6, 6, 0, 1)),
+    ]
+
+
+@pytest.mark.parametrize('rule', [
+    DayAndTimeRange(0, 9 * 3600, 0, 10 * 3600, True),
+    DayAndTimeRange(4, 22 * 3600, 0, 6 * 3600),
+    DayAndTimeRange(-1, -1, -1, -1, True),
+])
+def test_iter_ranges_agrees_with_matches(rule):
+    calendar_rule = CalendarRule(rule, exceptions=HOLIDAYS, closures=MAINTENANCE)
+    until = datetime.datetime(2025, 1, 6)
+    ranges = list(calendar_rule.iter_ranges(datetime.date(2024, 12, 16), until))
+    assert ranges
+    tick = datetime.timedelta(microseconds=1)
+    for start, end in ranges:
+        assert start < end
+        assert calendar_rule.matches(start) and calendar_rule.matches(end - tick)
+        # Only an always-active rule is split, at the end of each week
+        assert not calendar_rule.matches(end) or (end.weekday(), end.time()) == (0, datetime.time())
+    rng = random.Random(7)
+    origin = datetime.datetime(2024, 12, 16)
+    for _ in range(3000):
+        now = origin + datetime.timedelta(seconds=rng.randrange(21 * 86400))
+        inside = any(start <= now < end for start, end in ranges)
+        assert inside == calendar_rule.matches(now), now
+
+
+def test_compile_calendar_rule_shares_registered_calendars():
+    register_calendar('test-holidays', HOLIDAYS)
+    terms = {'start_day_of_week': 0, 'start_time': '09:00:00', 'end_day_of_week': 4,
+             'end_time': '17:00:00', 'exceptions': 'test-holidays', 'valid_from': '2024-12-01',
+             'closures': [['2024-12-18T12:00:00', '2024-12-18T14:30:00']]}
+    first = compile_calendar_rule({'terms': terms})
+    second = compile_calendar_rule(dict(terms, now=None), 'logaction')
+    assert first.exceptions is second.exceptions is get_calendar('test-holidays')
+    assert first.rule == OFFICE
+    assert first.closures == tuple(MAINTENANCE)
+    assert compile_calendar_rule({'terms': dict(terms, exceptions=['2024-12-24'])}).exceptions == Calendar(['2024-12-24'])
+    with pytest.raises(UnknownCalendarError):
+        compile_calendar_rule({'terms': dict(terms, exceptions='nope')})
+    with pytest.raises(InvalidDateError):
+        compile_calendar_rule({'terms': dict(terms, valid_until='2024-13-01')})
+    with pytest.raises(InvalidDateError):
+        Calendar([datetime.datetime(2024, 1, 1)])
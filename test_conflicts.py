@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from conflicts import find_conflicts, overlap_groups, overlapping_pairs
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+from weekline import MICROS_PER_WEEK, intersect_intervals, merge_intervals
+
+
+def random_rules(count, seed):
+    rng = random.Random(seed)
+    rules = {}
+    for index in range(count):
+        start, end = rng.randrange(86400), rng.randrange(86400)
+        if rng.random() < 0.2:
+            rules[f'r{index}'] = TimeRange(start, end, rng.random() < 0.3)
+        else:
+            rules[f'r{index}'] = DayAndTimeRange(rng.randrange(7), start, rng.randrange(7), end,
+                                                 rng.random() < 0.1, resolution='second')
+    return rules
+
+
+def test_agrees_with_pairwise_comparison():
+    rules = random_rules(40, 1)
+    rules['never'] = DayAndTimeRange(-1, -1, -1, -1)
+    rules['copy'] = rules['r0']
+    intervals = {rule_id: rule.week_intervals() for rule_id, rule in rules.items()}
+    ids = list(rules)
+    expected_pairs = {(a, b) for i, a in enumerate(ids) for b in ids[i + 1:]
+                      if intersect_intervals(intervals[a], intervals[b])}
+    assert set(overlapping_pairs(rules)) == expected_pairs
+    assert len(list(overlapping_pairs(rules))) == len(expected_pairs)
+
+    report = find_conflicts(rules)
+    assert report.empty == {'never'}
+    for rule_id in ids:
+        others = merge_intervals(interval for other in ids if other != rule_id for interval in intervals[other])
+        covered = intersect_intervals(intervals[rule_id], others) == intervals[rule_id]
+        assert (rule_id in report.shadowed) == (covered and rule_id != 'never'), rule_id
+    assert {'r0', 'copy'} <= report.shadowed
+    union = merge_intervals(interval for values in intervals.values() for interval in values)
+    uncovered = sum(stop - start for start, stop in report.gaps)
+    assert uncovered == MICROS_PER_WEEK - sum(stop - start for start, stop in union)
+
+
+def test_overlap_groups_name_the_rules():
+    rules = {
+        'night': DayAndTimeRange(4, 22 * 3600, 0, 6 * 3600),
+        'weekend': DayAndTimeRange(5, 0, 6, 86399),
+        'sunday': TimeRange(3600, 7200),
+    }
+    groups = list(overlap_groups(rules, 3))
+    assert groups and all(group == frozenset(rules) for _, _, group in groups)
+    report = find_conflicts(rules)
+    assert all(count >= 2 for _, _, count in report.overlaps)
+    assert report.shadowed == set()
+
+
+def test_different_zones_are_rejected():
+    with pytest.raises(ValueError):
+        find_conflicts({'a': TimeRange(0, 60), 'b': TimeRange(0, 60, tz='Europe/Berlin')})
+
+
+def test_segments_across_the_week_boundary_are_reported_once():
+    hour = 3600 * 1000000
+    night = TimeRange(22 * 3600, 2 * 3600 - 1, resolution='second')
+    report = find_conflicts({'night': night, 'copy': night})
+    assert len(report.overlaps) == 7
+    assert report.overlaps[0] == (22 * hour, 26 * hour, 2)
+    assert report.overlaps[-1] == (MICROS_PER_WEEK - 2 * hour, MICROS_PER_WEEK + 2 * hour, 2)
+    assert len(report.gaps) == 7
+
+    gaps = find_conflicts({'midweek': DayAndTimeRange(2, 0, 2, 86399, resolution='second')}).gaps
+    assert gaps == ((72 * hour, MICROS_PER_WEEK + 48 * hour),)
@@ -1,7 +1,15 @@
 from datetime import datetime, timezone, timedelta
 import pytest
 
-from evaluate_dayandtimerange import evaluate_dayandtimerange, generate_time_ranges
+import array
+import itertools
+from datetime import date
+
+from evaluate_dayandtimerange import (DayAndTimeRange, compile_dayandtimerange,
+                                      evaluate_dayandtimerange, evaluate_dayandtimerange_sync,
+                                      evaluate_many, evaluate_many_sync,
+                                      fill_epoch_ranges,
+                                      generate_time_ranges, iter_epoch_ranges, iter_time_ranges)
 
 ################### generate_time_ranges ###################
 
@@ -75,6 +83,56 @@ def test_generate_time_ranges_crossing_week_boundary():
         assert end_dt.time() == datetime.strptime(end_time, "%H:%M:%S").time()
         assert start_dt.date() != end_dt.date()  # Updated assertion
 
+
+def test_generate_time_ranges_invalid_day():
+    with pytest.raises(ValueError):
+        generate_time_ranges(0, '08:00:00', 7, '18:00:00')
+
+################### iter_time_ranges ###################
+
+
+def test_iter_time_ranges_first_week_matches_generate_time_ranges():
+    expected = generate_time_ranges(6, '22:00:00', 1, '07:30:00')
+    ranges = iter_time_ranges(6, '22:00:00', 1, '07:30:00', datetime.today())
+    assert list(itertools.islice(ranges, 3)) == expected
+
+
+def test_iter_time_ranges_continues_week_after_week():
+    ranges = list(iter_time_ranges(
+        5, '23:00:00', 6, '01:00:00', date(2024, 6, 4), until=datetime(2024, 6, 22)))
+    assert [start.date() for start, _ in ranges] == [
+        date(2024, 6, 8), date(2024, 6, 9), date(2024, 6, 15), date(2024, 6, 16)]
+    assert ranges[-1][1] == datetime(2024, 6, 17, 1, 0)
+
+
+def test_iter_time_ranges_resumes_from_cursor():
+    anchor = date(2024, 6, 4)
+    ranges = iter_time_ranges(0, '08:00:00', 4, '18:00:00', anchor)
+    head = list(itertools.islice(ranges, 7))
+    resumed = iter_time_ranges(0, '08:00:00', 4, '18:00:00', anchor, cursor=7)
+    assert next(resumed) == next(ranges)
+    assert head[5][0] == datetime(2024, 6, 10, 8, 0)
+
+
+def test_iter_epoch_ranges_matches_datetimes():
+    anchor = date(2024, 6, 4)
+    epoch = datetime(1970, 1, 1)
+    expected = [(int((start - epoch).total_seconds()), int((end - epoch).total_seconds()))
+                for start, end in itertools.islice(
+                    iter_time_ranges(6, '22:00:00', 1, '07:30:00', anchor), 10)]
+    assert list(itertools.islice(
+        iter_epoch_ranges(6, '22:00:00', 1, '07:30:00', anchor), 10)) == expected
+
+
+def test_fill_epoch_ranges():
+    out = array.array('q', bytes(8 * 6))
+    written = fill_epoch_ranges(out, 1, '08:00:00', 1, '18:00:00', date(2024, 6, 4))
+    assert written == 3
+    assert list(out[:2]) == [1717488000, 1717524000]
+    assert out[2] - out[0] == 7 * 86400
+    assert fill_epoch_ranges(out, 1, '08:00:00', 1, '18:00:00', date(2024, 6, 4),
+                             until=1717488001) == 1
+
 # ################### EVALUATE_DAYANDTIMERANGE ###################
 
 
@@ -352,5 +410,114 @@ async def test_third_shift_over_the_weekend_ok():
     }
     assert await evaluate_dayandtimerange(data) is True
 
+################### DayAndTimeRange ###################
+
+
+def test_compile_dayandtimerange_terms():
+    rule = compile_dayandtimerange({
+        'terms': {
+            'start_day_of_week': 0,
+            'start_time': '22:00:00',
+            'end_day_of_week': 4,
+            'end_time': '07:30:00'
+        },
+        'condition': {'not_operator': True}
+    })
+    assert rule == DayAndTimeRange(0, 79200, 4, 27000, True)
+
+
+def test_compile_dayandtimerange_sentinel_is_unset():
+    rule = compile_dayandtimerange({'start_day_of_week': 1}, 'logaction')
+    assert rule.matches(datetime(2024, 6, 4, 12, 0, 0)) is False
+    assert DayAndTimeRange(-1, -1, -1, -1, True).matches(datetime(2024, 6, 4)) is True
+
+
+def test_day_and_time_range_end_is_inclusive_to_the_microsecond():
+    rule = DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600)
+    assert rule.matches(datetime(2024, 6, 4, 18, 0, 0)) is True
+    assert rule.matches(datetime(2024, 6, 4, 18, 0, 0, 1)) is False
+
+
+def test_day_and_time_range_resolution_matches_its_week_intervals():
+    from weekline import boundaries, contains, week_position
+    for resolution in ('minute', 'second', 'microsecond'):
+        rule = DayAndTimeRange(5, 79200 + 30, 1, 27000 + 15, resolution=resolution)
+        bounds = boundaries(rule.week_intervals())
+        for now in (datetime(2024, 6, 4, 7, 30, 15, 999999), datetime(2024, 6, 4, 7, 30, 16),
+                    datetime(2024, 6, 1, 22, 0, 29), datetime(2024, 6, 1, 22, 0, 30),
+                    datetime(2024, 6, 4, 7, 30, 59, 1)):
+            assert rule.matches(now) == contains(bounds, week_position(now)), (resolution, now)
+    assert DayAndTimeRange(1, 0, 1, 64800, resolution='second').matches(datetime(2024, 6, 4, 18, 0, 0, 1))
+    assert DayAndTimeRange(1, 0, 1, 64800, resolution='minute').matches(datetime(2024, 6, 4, 18, 0, 59))
+    terms = {'start_day_of_week': 1, 'start_time': '08:00:00', 'end_day_of_week': 1,
+             'end_time': '18:00:00', 'resolution': 'minute'}
+    assert compile_dayandtimerange({'terms': terms}).resolution == 'minute'
+    with pytest.raises(ValueError):
+        compile_dayandtimerange({'terms': dict(terms, resolution=60)})
+
+
+def test_day_and_time_range_cross_week():
+    # Fri 2200 to Sun 0730
+    rule = DayAndTimeRange(5, 79200, 0, 27000)
+    assert rule.matches(datetime(2024, 6, 2, 6, 0, 0)) is True
+    assert rule.matches(datetime(2024, 6, 3, 6, 0, 0)) is False
+
+
+def test_day_and_time_range_is_immutable():
+    rule = DayAndTimeRange(1, 0, 1, 60)
+    with pytest.raises(AttributeError):
+        rule.end_day = 2
+
+
+def test_sync_within_valid_time_range():
+    data = {
+        'now': datetime(2024, 6, 4, 6, 0, 0, tzinfo=timezone.utc),  # Tuesday
+        'terms': {
+            'start_day_of_week': 0,
+            'start_time': '22:00:00',
+            'end_day_of_week': 4,
+            'end_time': '07:30:00'
+        },
+        'condition': {}
+    }
+    assert evaluate_dayandtimerange_sync(data) is True
+
+
+def test_sync_bad_time_keeps_not_operator():
+    data = {
+        'now': datetime(2024, 6, 4, 6, 0, 0, tzinfo=timezone.utc),
+        'terms': {
+            'start_day_of_week': 0,
+            'start_time': '25:00:00',
+            'end_day_of_week': 4,
+            'end_time': '07:30:00'
+        },
+        'condition': {'not_operator': True}
+    }
+    assert evaluate_dayandtimerange_sync(data) is True
+
+
+@pytest.mark.asyncio
+async def test_evaluate_many_matches_single_calls():
+    terms = {'start_day_of_week': 0, 'start_time': '22:00:00', 'end_day_of_week': 4, 'end_time': '07:30:00'}
+    rule = compile_dayandtimerange({'terms': terms})
+    instants = [datetime(2024, 6, 3, 0, 0) + timedelta(minutes=37 * step) for step in range(300)]
+    items = [{'now': now, 'terms': terms, 'condition': {'not_operator': step % 2 == 0}}
+             for step, now in enumerate(instants)]
+    expected = [evaluate_dayandtimerange_sync(item) for item in items]
+    assert await evaluate_many(items) == expected
+    assert await evaluate_many(items, offload_threshold=100) == expected
+    pairs = [(rule, now) for now in instants]
+    assert await evaluate_many(pairs, offload_threshold=1) == [rule.matches(now) for now in instants]
+    assert await evaluate_many(iter(pairs), offload_threshold=1) == [rule.matches(now) for now in instants]
+
+
+def test_evaluate_many_sync_counts_errors():
+    rule = DayAndTimeRange(1, 0, 1, 60, True)
+    bad = {'now': datetime(2024, 6, 4), 'terms': {'start_day_of_week': 'x', 'start_time': '00:00:00',
+                                                  'end_day_of_week': 1, 'end_time': '01:00:00'}}
+    assert evaluate_many_sync([(rule, 'not a datetime'), bad]) == [True, False]
+
+
 if __name__ == '__main__':
     pytest.main()
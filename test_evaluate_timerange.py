@@ -1,6 +1,7 @@
 import datetime
 import pytest
-from evaluate_timerange import evaluate_timerange
+from evaluate_timerange import (TimeRange, compile_timerange, evaluate_timerange,
+                                evaluate_many, evaluate_many_sync, evaluate_timerange_sync)
 
 
 @pytest.mark.asyncio
@@ -119,3 +120,76 @@ async def test_wrap_around_midnight_default_src_outside_range():
     expected = False
     result = await evaluate_timerange(data, src)
     assert result == expected
+
+
+def test_compile_timerange_logaction():
+    rule = compile_timerange(
+        {'not_operator': True, 'start': '10:00:00', 'end': '11:00:30'}, 'logaction')
+    assert rule == TimeRange(36000, 39630, True)
+
+
+def test_compile_timerange_invalid_src():
+    with pytest.raises(ValueError):
+        compile_timerange({'start': '10:00:00', 'end': '11:00:00'}, 'other')
+
+
+def test_time_range_matches_truncates_to_minute():
+    rule = TimeRange(10 * 3600, 11 * 3600)
+    assert rule.matches(datetime.datetime(2024, 6, 4, 11, 0, 59)) is True
+    assert rule.matches(datetime.datetime(2024, 6, 4, 11, 1)) is False
+    assert rule.matches_at(1, 11 * 3600 + 59.5) is True
+
+
+def test_time_range_resolution():
+    now = datetime.datetime(2024, 6, 4, 11, 0, 0, 500000)
+    assert TimeRange(10 * 3600, 11 * 3600, resolution='second').matches(now) is True
+    assert TimeRange(10 * 3600, 11 * 3600, resolution='microsecond').matches(now) is False
+    assert TimeRange(10 * 3600, 11 * 3600, resolution='second').matches_at(1, 11 * 3600 + 1.0) is False
+    rule = compile_timerange({'start': '10:00:00', 'end': '11:00:00', 'resolution': 'second'}, 'logaction')
+    assert rule == TimeRange(36000, 39600, resolution='second')
+    assert rule.week_intervals()[0] == (36000 * 10**6, 39601 * 10**6)
+    with pytest.raises(ValueError):
+        compile_timerange({'terms': {'start': '10:00:00', 'end': '11:00:00', 'resolution': 'hour'}})
+
+
+def test_time_range_is_immutable():
+    rule = TimeRange(0, 60)
+    with pytest.raises(AttributeError):
+        rule.start = 30
+
+
+def test_sync_within_time_range():
+    data = {
+        'now': datetime.datetime(2024, 6, 4, 10, 30),
+        'start': '10:00:00',
+        'end': '11:00:00'
+    }
+    assert evaluate_timerange_sync(data, 'logaction') is True
+
+
+def test_sync_invalid_src():
+    data = {
+        'now': datetime.datetime(2024, 6, 4, 10, 30),
+        'start': '10:00:00',
+        'end': '11:00:00'
+    }
+    assert evaluate_timerange_sync(data, 'other') is False
+
+
+def test_sync_defaults_now_only_when_missing():
+    assert evaluate_timerange_sync({'terms': {'start': '00:00:00', 'end': '23:59:59'}}) is True
+    # An explicit None is not a time, as before
+    data = {'now': None, 'terms': {'start': '00:00:00', 'end': '23:59:59'}}
+    assert evaluate_timerange_sync(data) is False
+
+
+@pytest.mark.asyncio
+async def test_evaluate_many():
+    rule = TimeRange(10 * 3600, 11 * 3600)
+    instants = [datetime.datetime(2024, 6, 4) + datetime.timedelta(minutes=7 * step) for step in range(200)]
+    items = [{'now': now, 'start': '10:00:00', 'end': '11:00:00'} for now in instants]
+    expected = [rule.matches(now) for now in instants]
+    assert await evaluate_many(items, 'logaction') == expected
+    assert await evaluate_many([(rule, now) for now in instants], offload_threshold=50) == expected
+    assert await evaluate_many(((rule, now) for now in instants), offload_threshold=50) == expected
+    assert evaluate_many_sync([(rule, None), {'start': '10:00:00'}], 'other') == [False, False]
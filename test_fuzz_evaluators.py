@@ -0,0 +1,65 @@
+import datetime
+import os
+import random
+
+import fuzz_evaluators
+from fuzz_evaluators import IMPLEMENTATIONS, check_case, random_case, run, shrink
+
+ITERATIONS = int(os.environ.get('FUZZ_ITERATIONS', 2000))
+SEED = int(os.environ.get('FUZZ_SEED', 0))
+
+
+def test_all_implementations_agree_with_the_reference():
+    failures = run(ITERATIONS, SEED)
+    assert not failures, '\n'.join(
+        f'{fuzz_evaluators.format_case(case)}: {mismatches}' for case, mismatches in failures)
+
+
+def test_generated_cases_cover_the_edges():
+    rng = random.Random(SEED)
+    cases = [random_case(rng) for _ in range(2000)]
+    assert any(case['sentinel'] for case in cases)
+    assert any(case['start_day'] > case['end_day'] for case in cases)
+    assert any(not 0 <= case['start_day'] <= 6 or not 0 <= case['end_day'] <= 6 for case in cases)
+    assert any(case['start'] > case['end'] for case in cases)
+    assert any(case['now'].tzinfo is None for case in cases)
+    assert any(case['now'].tzinfo is not None and case['tz'] == 'Europe/Berlin'
+               and case['now'].month in (3, 10) for case in cases)
+    assert {case['format'] for case in cases} == {'padded', 'unpadded', 'short'}
+    assert {case['resolution'] for case in cases} >= {None, 'second', 'microsecond', 'hour'}
+    malformed = [case['malformed'] for case in cases if case['malformed'] is not None]
+    assert any(field.endswith('time') for field, _ in malformed)
+    assert any(field.endswith('day_of_week') for field, _ in malformed)
+
+
+def test_a_broken_implementation_is_caught_and_shrunk():
+    def ignores_not_operator(rule, case):
+        return rule.matches(case['now']) ^ rule.not_operator
+
+    failures = run(500, SEED, {'broken': ignores_not_operator}, max_failures=1)
+    assert failures
+    case, mismatches = failures[0]
+    assert mismatches[0][0] == 'broken'
+    assert case['not_operator'] is True
+    assert case['tz'] is None and case['now'].tzinfo is None
+    assert case['now'].microsecond == case['now'].second == 0
+
+
+def test_shrink_stops_at_a_minimal_case():
+    case = random_case(random.Random(1))
+    assert shrink(case, lambda candidate: False) == case
+    minimal = shrink(dict(case, now=datetime.datetime(2024, 6, 5, 13, 37, 11, 5)),
+                     lambda candidate: candidate['now'].weekday() == 2)
+    assert minimal['now'] == datetime.datetime(2024, 1, 3)
+    assert check_case(minimal) == []
+
+
+def test_uncompilable_terms_are_checked_through_the_data_paths():
+    case = dict(random_case(random.Random(2)), kind='dayandtimerange', sentinel=None,
+                malformed=('start_time', '24:00:00'), not_operator=True)
+    seen = []
+    implementations = {name: lambda rule, case, name=name: seen.append((name, rule)) or True
+                       for name in IMPLEMENTATIONS}
+    assert check_case(case, implementations) == []
+    assert seen and all(rule is None for _, rule in seen)
+    assert {name for name, _ in seen} == fuzz_evaluators.DATA_IMPLEMENTATIONS
@@ -0,0 +1,75 @@
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+from incremental import IncrementalEvaluator
+
+RULES = {
+    'office': DayAndTimeRange(0, 9 * 3600, 4, 17 * 3600),
+    'weekend': DayAndTimeRange(5, 22 * 3600, 0, 6 * 3600, True),
+    'night': TimeRange(23 * 3600 + 30, 2 * 3600 + 15 * 60),
+    'berlin': DayAndTimeRange(6, 1 * 3600 + 59 * 60, 6, 3 * 3600 + 30 * 60, tz='Europe/Berlin'),
+    'unset': DayAndTimeRange(-1, -1, -1, -1),
+}
+
+
+def expected(now):
+    return {rule_id for rule_id, rule in RULES.items() if rule.matches(now)}
+
+
+def stream(start, count, seed, max_step):
+    rng = random.Random(seed)
+    now = start
+    for _ in range(count):
+        now += timedelta(microseconds=rng.randrange(max_step))
+        yield now
+
+
+def test_naive_stream_matches_direct_evaluation():
+    tracker = IncrementalEvaluator(RULES)
+    for now in stream(datetime(2024, 6, 1), 20000, 1, 120_000_000):
+        assert tracker.active(now) == expected(now)
+    assert tracker.fallbacks == 0
+    assert tracker.recomputed < 20000
+
+
+def test_aware_stream_across_dst_changes():
+    for start, zone in ((datetime(2024, 3, 30, tzinfo=timezone.utc), timezone.utc),
+                        (datetime(2024, 10, 26, tzinfo=ZoneInfo('Europe/Berlin')), ZoneInfo('Europe/Berlin'))):
+        tracker = IncrementalEvaluator(RULES)
+        for now in stream(start, 20000, 2, 60_000_000):
+            now = now.astimezone(zone)
+            assert tracker.active(now) == expected(now), now
+
+
+def test_out_of_order_instants_fall_back():
+    tracker = IncrementalEvaluator(RULES)
+    instants = list(stream(datetime(2024, 6, 1), 2000, 3, 600_000_000))
+    random.Random(4).shuffle(instants)
+    for now in instants:
+        assert tracker.active(now) == expected(now)
+    assert tracker.fallbacks > 0
+    assert not tracker.matches('unset', instants[0])
+
+
+def test_switching_between_naive_and_aware_rebuilds():
+    tracker = IncrementalEvaluator(RULES)
+    tracker.active(datetime(2024, 6, 3, 10, 0))
+    aware = datetime(2024, 6, 3, 10, 0, tzinfo=timezone.utc)
+    assert tracker.active(aware) == expected(aware)
+    assert tracker.fallbacks == 1
+
+
+def test_instants_in_a_dst_gap_are_ordered_in_utc():
+    # 02:59:59+01:00 does not exist on the Berlin wall clock; it is 01:59:59
+    # UTC, an hour after 03:00+02:00, so the second call is out of order.
+    berlin = ZoneInfo('Europe/Berlin')
+    rule = TimeRange(3 * 3600 + 42 * 60, 0, tz='Europe/Berlin')
+    tracker = IncrementalEvaluator({'rule': rule})
+    later = datetime(2023, 3, 26, 2, 59, 59, tzinfo=berlin)
+    now = datetime(2023, 3, 26, 3, 0, tzinfo=berlin)
+    assert tracker.active(later) == {'rule'}
+    assert tracker.active(now) == frozenset()
+    assert tracker.fallbacks == 1
@@ -0,0 +1,67 @@
+import itertools
+from datetime import datetime, timedelta, timezone
+
+from evaluate_dayandtimerange import DayAndTimeRange, evaluate_dayandtimerange_sync
+from evaluate_timerange import TimeRange, evaluate_timerange_sync
+from instrumentation import Profiler, profiler, profiling
+
+TERMS = {'start_day_of_week': 4, 'start_time': '22:00:00', 'end_day_of_week': 0,
+         'end_time': '07:30:00', 'timezone': 'Europe/Berlin'}
+
+
+def fake_timer():
+    ticks = itertools.count()
+    return lambda: next(ticks) * 0.5
+
+
+def test_profiled_results_match_unprofiled():
+    instants = [datetime(2024, 3, 29, tzinfo=timezone.utc) + timedelta(minutes=13 * step)
+                for step in range(800)]
+    day_items = [{'now': now, 'terms': TERMS, 'condition': {'not_operator': step % 3 == 0}}
+                 for step, now in enumerate(instants)]
+    time_items = [{'now': now, 'start': '23:00:00', 'end': '01:00:30', 'resolution': 'second'}
+                  for now in instants]
+    expected = ([evaluate_dayandtimerange_sync(item) for item in day_items],
+                [evaluate_timerange_sync(item, 'logaction') for item in time_items])
+    with profiling():
+        actual = ([evaluate_dayandtimerange_sync(item) for item in day_items],
+                  [evaluate_timerange_sync(item, 'logaction') for item in time_items])
+    assert actual == expected
+    assert profiler.enabled is False
+
+
+def test_phases_and_rules_are_counted_with_the_given_timer():
+    now = datetime(2024, 6, 4, 10, 30)
+    with profiling(timer=fake_timer()) as stats:
+        for _ in range(3):
+            evaluate_timerange_sync({'now': now, 'start': '10:00:00', 'end': '11:00:00'}, 'logaction')
+        evaluate_dayandtimerange_sync({'now': now, 'terms': TERMS})
+        evaluate_dayandtimerange_sync({'now': now, 'terms': dict(TERMS, start_time='bad')})
+    snapshot = stats.snapshot()
+    assert snapshot['phases']['timerange']['logaction'] == {
+        'parse': (3, 1.5), 'tz': (3, 1.5), 'compare': (3, 1.5)}
+    assert snapshot['phases']['dayandtimerange'][None]['parse'] == (1, 0.5)
+    assert snapshot['rules']['timerange'] == {TimeRange(36000, 39600): (3, 4.5)}
+    rule = DayAndTimeRange(4, 79200, 0, 27000, tz='Europe/Berlin')
+    assert snapshot['rules']['dayandtimerange'] == {rule: (1, 1.5)}
+    assert stats.slowest_rules(1)[0][:3] == ('timerange', TimeRange(36000, 39600), 3)
+
+
+def test_disabled_profiler_records_nothing():
+    profiler.reset()
+    evaluate_timerange_sync({'now': datetime(2024, 6, 4), 'start': '10:00:00', 'end': '11:00:00'}, 'logaction')
+    assert profiler.snapshot() == {'phases': {}, 'rules': {}}
+
+
+def test_exports():
+    stats = Profiler()
+    stats.record('timerange', 'logaction', TimeRange(0, 60, tz='Europe/Berlin'), 0.25, 0.5, 0.25)
+    text = stats.export_text()
+    assert 'phase timerange src=logaction parse calls=1 seconds=0.250000000' in text
+    assert "rule timerange TimeRange(start=0, end=60, not_operator=False, tz='Europe/Berlin'" in text
+    prometheus = stats.export_prometheus(prefix='rules')
+    assert '# TYPE rules_phase_seconds_total counter' in prometheus
+    assert 'rules_phase_calls_total{evaluator="timerange",src="logaction",phase="tz"} 1' in prometheus
+    assert ('rules_rule_seconds_total{evaluator="timerange",rule="TimeRange(start=0, end=60, '
+            'not_operator=False, tz=\'Europe/Berlin\', resolution=\'minute\')"} 1.0') in prometheus
+    assert Profiler().export_text() == ''
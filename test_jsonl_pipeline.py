@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+import io
+import json
+import pytest
+
+from evaluate_dayandtimerange import DayAndTimeRange, evaluate_dayandtimerange_sync
+from evaluate_timerange import evaluate_timerange_sync
+
+pytest.importorskip('numpy')
+from jsonl_pipeline import evaluate_jsonl  # noqa: E402
+
+RULE_FIELDS = {
+    'start_day_of_week': 0,
+    'start_time': '22:00:00',
+    'end_day_of_week': 4,
+    'end_time': '07:30:00'
+}
+
+
+def events(count):
+    start = datetime(2024, 6, 3, tzinfo=timezone(timedelta(hours=2)))
+    for index in range(count):
+        yield start + timedelta(minutes=37 * index, microseconds=index % 2)
+
+
+def write_log(records):
+    return io.BytesIO(b''.join(json.dumps(record).encode() + b'\n' for record in records))
+
+
+def test_nested_keys_do_not_shadow_top_level_fields():
+    line = json.dumps({'meta': {'now': '2024-06-04T03:00:00', 'not_operator': True},
+                       'now': '2024-06-04T10:30:00', **RULE_FIELDS})
+    output = io.BytesIO()
+    stats = evaluate_jsonl(io.BytesIO(line.encode() + b'\n[1]\n'), output=output)
+    # Tuesday 10:30 is outside Mon 22:00 - Fri 07:30 (read as the evaluator does)
+    expected = evaluate_dayandtimerange_sync(
+        dict(RULE_FIELDS, now=datetime(2024, 6, 4, 10, 30)), 'logaction')
+    assert output.getvalue() == bytes([expected, 0])
+    assert stats.errors == 1
+
+
+def test_per_event_rules_agree_with_the_evaluator():
+    records = []
+    for index, now in enumerate(events(600)):
+        record = dict(RULE_FIELDS, now=now.isoformat(), msg='event')
+        if index % 3 == 0:
+            record['not_operator'] = True
+        if index % 5 == 0:
+            record['timezone'] = 'America/New_York'
+        records.append(record)
+    output = io.BytesIO()
+    stats = evaluate_jsonl(write_log(records), batch_size=64, output=output)
+
+    expected = [evaluate_dayandtimerange_sync(
+        dict(record, now=datetime.fromisoformat(record['now'])), 'logaction') for record in records]
+    assert list(output.getvalue()) == [int(result) for result in expected]
+    assert stats.events == 600
+    assert stats.matched == sum(expected)
+    assert stats.errors == 0
+
+
+def test_timerange_kind_with_terms_layout():
+    records = [{'now': now.isoformat(),
+                'terms': {'start': '23:00:00', 'end': '01:00:00'},
+                'condition': {'not_operator': False}} for now in events(200)]
+    output = io.BytesIO()
+    evaluate_jsonl(write_log(records), kind='timerange', src=None, output=output)
+    expected = [evaluate_timerange_sync(dict(record, now=datetime.fromisoformat(record['now'])))
+                for record in records]
+    assert list(output.getvalue()) == [int(result) for result in expected]
+
+
+def test_fixed_rule_and_epoch_timestamps(tmp_path):
+    rule = DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600)
+    path = tmp_path / 'events.jsonl'
+    # Tuesday 2024-06-04 12:00 UTC and 19:00 UTC, then a broken line
+    path.write_text('{"now": 1717502400}\n{"now": 1717527600.5}\n\n{"now": "yesterday"}\n')
+    stats = evaluate_jsonl(str(path), rule=rule)
+    assert (stats.events, stats.matched, stats.errors) == (3, 1, 1)
+
+
+def test_bad_rule_counts_as_error_and_keeps_not_operator():
+    record = dict(RULE_FIELDS, now='2024-06-04T06:00:00', start_time='bad', not_operator=True)
+    output = io.BytesIO()
+    stats = evaluate_jsonl(write_log([record]), output=output)
+    assert stats.errors == 1
+    assert output.getvalue() == b'\x01'
+
+
+def test_zoned_rule_reads_naive_and_aware_timestamps_like_the_evaluator():
+    rule_fields = dict(start_day_of_week=0, start_time='09:00:00', end_day_of_week=0,
+                       end_time='09:59:59', timezone='Europe/Berlin')
+    stamps = ['2024-06-03T09:30:00', '2024-06-03T07:30:00', '2024-06-03T09:30:00+02:00',
+              '2024-06-03T07:30:00+00:00', '2024-06-03T09:30:00+00:00', 1717399800]
+    records = [dict(rule_fields, now=now) for now in stamps]
+    output = io.BytesIO()
+    evaluate_jsonl(write_log(records), output=output)
+
+    def parse(now):
+        if isinstance(now, str):
+            return datetime.fromisoformat(now)
+        return datetime.fromtimestamp(now, timezone.utc)
+
+    expected = [evaluate_dayandtimerange_sync(dict(record, now=parse(record['now'])), 'logaction')
+                for record in records]
+    assert expected == [True, False, True, True, False, True]
+    assert list(output.getvalue()) == [int(result) for result in expected]
+
+
+def test_bad_timestamp_keeps_not_operator():
+    records = [dict(RULE_FIELDS, now='garbage', not_operator=True),
+               dict(RULE_FIELDS, now='garbage')]
+    output = io.BytesIO()
+    stats = evaluate_jsonl(write_log(records), output=output)
+    assert (stats.errors, stats.matched) == (2, 1)
+    assert output.getvalue() == b'\x01\x00'
+    assert evaluate_dayandtimerange_sync(dict(records[0], now='garbage'), 'logaction') is True
+
+    stats = evaluate_jsonl(write_log([{'now': 'garbage'}]),
+                           rule=DayAndTimeRange(1, 0, 1, 3600, not_operator=True))
+    assert (stats.errors, stats.matched) == (1, 1)
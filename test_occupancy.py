@@ -0,0 +1,70 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+from occupancy import active_seconds, occupancy
+from schedule import Schedule
+
+RULES = [
+    DayAndTimeRange(0, 9 * 3600, 4, 17 * 3600, resolution='minute'),
+    DayAndTimeRange(4, 22 * 3600, 0, 6 * 3600, True, resolution='minute'),
+    DayAndTimeRange(6, 1 * 3600, 6, 3 * 3600 + 30 * 60, tz='Europe/Berlin', resolution='minute'),
+    TimeRange(23 * 3600, 2 * 3600),
+    TimeRange(0, 86399),
+]
+
+
+def sampled(rule, start, end):
+    # Per-minute sampling, exact for minute-resolution rules
+    active = openings = 0
+    before = rule.matches(start - timedelta(minutes=1))
+    now = start
+    while now < end:
+        state = rule.matches(now)
+        active += state
+        openings += state and not before
+        before = state
+        now += timedelta(minutes=1)
+    return timedelta(minutes=active), openings
+
+
+@pytest.mark.parametrize('rule', RULES)
+def test_naive_periods_match_sampling(rule):
+    rng = random.Random(7)
+    for _ in range(5):
+        start = datetime(2024, 1, 1) + timedelta(minutes=rng.randrange(60 * 24 * 60))
+        end = start + timedelta(minutes=rng.randrange(60 * 24 * 20))
+        assert tuple(occupancy(rule, start, end)) == sampled(rule, start, end)
+
+
+@pytest.mark.parametrize('rule', RULES)
+def test_aware_periods_across_dst_match_sampling(rule):
+    for start in (datetime(2024, 3, 29, 13, 7, tzinfo=timezone.utc),
+                  datetime(2024, 10, 25, 23, 59, tzinfo=timezone.utc)):
+        end = start + timedelta(days=4, minutes=13)
+        assert tuple(occupancy(rule, start, end)) == sampled(rule, start, end)
+
+
+def test_long_periods_are_whole_weeks_plus_edges():
+    rule = TimeRange(8 * 3600, 17 * 3600 + 59 * 60)
+    start = datetime(2000, 1, 1)
+    end = datetime(2030, 1, 1)
+    result = occupancy(rule, start, end)
+    days = (end - start).days
+    assert result.active == timedelta(hours=10) * days
+    assert result.openings == days
+
+
+def test_schedules_empty_rules_and_bad_periods():
+    schedule = Schedule.from_rule(RULES[0]) - TimeRange(12 * 3600, 12 * 3600 + 59 * 60)
+    monday = datetime(2024, 6, 3)
+    assert occupancy(schedule, monday, monday + timedelta(days=1)) == (timedelta(hours=7, minutes=1), 2)
+    assert occupancy(DayAndTimeRange(-1, -1, -1, -1), monday, monday + timedelta(days=9)) == (timedelta(0), 0)
+    assert active_seconds(DayAndTimeRange(-1, -1, -1, -1, True), monday, monday + timedelta(days=1)) == 86400
+    assert occupancy(RULES[0], monday + timedelta(hours=9), monday + timedelta(hours=10)).openings == 1
+    assert occupancy(RULES[0], monday + timedelta(hours=9, seconds=1), monday + timedelta(hours=10)).openings == 0
+    with pytest.raises(ValueError):
+        occupancy(RULES[0], monday, monday - timedelta(seconds=1))
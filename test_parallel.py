@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+
+np = pytest.importorskip('numpy')
+from parallel import evaluate_parallel, evaluate_serial  # noqa: E402
+
+RULES = [
+    DayAndTimeRange(0, 22 * 3600, 4, 27000),
+    DayAndTimeRange(5, 22 * 3600, 0, 27000, True),
+    DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600, tz='Europe/Berlin'),
+    TimeRange(23 * 3600, 3600),
+]
+
+
+def timestamps(count):
+    start = np.datetime64('2024-03-01T00:00:00', 'us')
+    return start + (np.arange(count, dtype=np.int64) * 7_919_000_003).astype('timedelta64[us]')
+
+
+def test_serial_agrees_with_matches():
+    stamps = timestamps(500)
+    result = evaluate_serial(RULES, stamps)
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    instants = [epoch + timedelta(microseconds=int(value)) for value in stamps.astype(np.int64)]
+    for row, rule in enumerate(RULES):
+        assert result[row].tolist() == [rule.matches(instant) for instant in instants]
+
+
+def test_parallel_is_identical_to_serial():
+    stamps = timestamps(10007)
+    result = evaluate_parallel(RULES, stamps, workers=2, chunk_size=1000)
+    assert result.shape == (len(RULES), 10007)
+    assert np.array_equal(result, evaluate_serial(RULES, stamps))
+
+
+def test_parallel_with_epoch_seconds_and_empty_input():
+    epochs = np.arange(1717459200, 1717459200 + 7 * 86400, 600, dtype=np.int64)
+    assert np.array_equal(evaluate_parallel(RULES, epochs, workers=1, chunk_size=97),
+                          evaluate_serial(RULES, epochs))
+    assert evaluate_parallel(RULES, epochs[:0]).shape == (len(RULES), 0)
+
+
+def test_invalid_chunk_size():
+    with pytest.raises(ValueError):
+        evaluate_parallel(RULES, timestamps(10), chunk_size=0)
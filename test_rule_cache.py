@@ -0,0 +1,95 @@
+import concurrent.futures
+import datetime
+import pytest
+
+import evaluate_dayandtimerange
+from evaluate_timerange import TimeRange
+from rule_cache import RuleCache
+
+
+def make_cache(maxsize=2):
+    def key(data, src):
+        return (data['start'], data['end'])
+    return RuleCache(key, lambda start, end: TimeRange(start, end), maxsize=maxsize)
+
+
+def test_hit_returns_the_same_rule():
+    cache = make_cache()
+    first = cache.compile({'start': 0, 'end': 60})
+    second = cache.compile({'start': 0, 'end': 60})
+    assert first is second
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': 2}
+
+
+def test_lru_eviction():
+    cache = make_cache()
+    cache.compile({'start': 0, 'end': 60})
+    cache.compile({'start': 60, 'end': 120})
+    # Touch the first entry so the second one is the least recently used
+    cache.compile({'start': 0, 'end': 60})
+    cache.compile({'start': 120, 'end': 180})
+    assert (0, 60) in cache
+    assert (60, 120) not in cache
+    assert cache.evictions == 1
+
+
+def test_shrinking_maxsize_evicts():
+    cache = make_cache(maxsize=3)
+    for start in range(3):
+        cache.compile({'start': start, 'end': 60})
+    cache.maxsize = 1
+    assert len(cache) == 1
+    assert cache.evictions == 2
+
+
+def test_zero_maxsize_disables_caching():
+    cache = make_cache(maxsize=0)
+    cache.compile({'start': 0, 'end': 60})
+    cache.compile({'start': 0, 'end': 60})
+    assert cache.stats()['misses'] == 2
+    assert len(cache) == 0
+
+
+def test_invalidate():
+    cache = make_cache()
+    cache.compile({'start': 0, 'end': 60})
+    cache.compile({'start': 60, 'end': 120})
+    assert cache.invalidate({'start': 0, 'end': 60}) == 1
+    assert cache.invalidate({'start': 0, 'end': 60}) == 0
+    assert cache.invalidate() == 1
+    assert len(cache) == 0
+
+
+def test_invalid_maxsize():
+    with pytest.raises(ValueError):
+        make_cache(maxsize=-1)
+
+
+@pytest.mark.asyncio
+async def test_evaluator_shares_entry_across_src():
+    cache = evaluate_dayandtimerange.rule_cache
+    cache.invalidate()
+    cache.reset_stats()
+    now = datetime.datetime(2024, 6, 4, 12, 0, 0)
+    terms = {
+        'start_day_of_week': 1,
+        'start_time': '08:00:00',
+        'end_day_of_week': 1,
+        'end_time': '18:00:00'
+    }
+    assert await evaluate_dayandtimerange.evaluate_dayandtimerange(
+        {'now': now, 'terms': terms, 'condition': {}}) is True
+    assert await evaluate_dayandtimerange.evaluate_dayandtimerange(
+        dict(terms, now=now), 'logaction') is True
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_concurrent_compiles_keep_counts_and_size_consistent():
+    cache = make_cache(maxsize=8)
+    items = [{'start': index % 16, 'end': 60} for index in range(2000)]
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        rules = list(pool.map(cache.compile, items))
+    assert [rule.start for rule in rules] == [item['start'] for item in items]
+    assert cache.hits + cache.misses == len(items)
+    assert len(cache) <= 8
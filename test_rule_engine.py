@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+
+from evaluate_dayandtimerange import evaluate_dayandtimerange_sync
+from evaluate_timerange import evaluate_timerange_sync
+from rule_engine import compile_rule_document, evaluate_rule_document, evaluate_rule_documents
+
+OFFICE_HOURS = {
+    'type': 'dayandtimerange',
+    'terms': {
+        'start_day_of_week': 0,
+        'start_time': '08:00:00',
+        'end_day_of_week': 4,
+        'end_time': '18:00:00'
+    },
+    'condition': {}
+}
+
+LUNCH = {
+    'type': 'timerange',
+    'terms': {'start': '12:00:00', 'end': '13:00:00'},
+    'condition': {'not_operator': True}
+}
+
+WEEKEND = {
+    'type': 'dayandtimerange',
+    'terms': {
+        'start_day_of_week': 5,
+        'start_time': '00:00:00',
+        'end_day_of_week': 6,
+        'end_time': '23:59:59'
+    },
+    'condition': {}
+}
+
+DOCUMENT = {
+    'operator': 'or',
+    'conditions': [
+        {'operator': 'and', 'conditions': [OFFICE_HOURS, LUNCH]},
+        WEEKEND,
+    ]
+}
+
+
+def evaluate_by_hand(now):
+    def leaf(condition):
+        data = dict(condition, now=now)
+        if condition['type'] == 'timerange':
+            return evaluate_timerange_sync(data)
+        return evaluate_dayandtimerange_sync(data)
+    return (leaf(OFFICE_HOURS) and leaf(LUNCH)) or leaf(WEEKEND)
+
+
+def test_document_agrees_with_the_evaluators():
+    now = datetime(2024, 6, 3)
+    while now < datetime(2024, 6, 10):
+        assert evaluate_rule_document(DOCUMENT, now) == evaluate_by_hand(now)
+        now += timedelta(minutes=17)
+
+
+def test_batch_of_documents():
+    now = datetime(2024, 6, 4, 12, 30)
+    compiled = compile_rule_document(DOCUMENT)
+    assert evaluate_rule_documents([DOCUMENT, compiled, OFFICE_HOURS, LUNCH], now) == \
+        [False, False, True, False]
+
+
+def test_now_is_converted_once_to_tz():
+    # 10:00 UTC is 12:00 at UTC+2, which is inside the lunch break
+    now = datetime(2024, 6, 4, 10, 0, tzinfo=timezone.utc)
+    document = {'conditions': [OFFICE_HOURS, LUNCH]}
+    assert evaluate_rule_document(document, now) is True
+    assert evaluate_rule_document(document, now, tz=timezone(timedelta(hours=2))) is False
+
+
+def test_malformed_leaf_behaves_like_the_evaluator():
+    broken = {
+        'type': 'dayandtimerange',
+        'terms': {
+            'start_day_of_week': 0,
+            'start_time': 'noon',
+            'end_day_of_week': 4,
+            'end_time': '18:00:00'
+        },
+        'condition': {'not_operator': True}
+    }
+    now = datetime(2024, 6, 4, 12, 0)
+    assert evaluate_rule_document(broken, now) == evaluate_dayandtimerange_sync(dict(broken, now=now))
+    assert evaluate_rule_document(dict(LUNCH, terms={}), now) is False
+
+
+def test_invalid_document():
+    with pytest.raises(ValueError):
+        compile_rule_document({'type': 'weekday'})
+    with pytest.raises(ValueError):
+        compile_rule_document({'operator': 'xor', 'conditions': []})
+
+
+def test_leaf_zone_overrides_document_tz():
+    berlin = dict(OFFICE_HOURS, terms=dict(OFFICE_HOURS['terms'], timezone='Europe/Berlin'))
+    # 06:30 UTC is 07:30 at UTC+1 but 08:30 in Berlin (CEST)
+    now = datetime(2024, 6, 4, 6, 30, tzinfo=timezone.utc)
+    assert evaluate_rule_document(berlin, now, tz=timezone(timedelta(hours=1))) is True
+    assert evaluate_rule_document(OFFICE_HOURS, now, tz=timezone(timedelta(hours=1))) is False
+
+
+def test_default_now_is_read_like_each_evaluator(monkeypatch):
+    monkeypatch.setenv('TZ', 'Asia/Kolkata')
+    time.tzset()
+    try:
+        local = datetime.now()
+        start = (local - timedelta(minutes=30)).strftime('%H:%M:%S')
+        end = (local + timedelta(minutes=30)).strftime('%H:%M:%S')
+        leaf = {'type': 'timerange', 'terms': {'start': start, 'end': end}, 'condition': {}}
+        # The UTC clock is 5h30 away, outside the window
+        assert evaluate_rule_document(leaf) is True
+        assert evaluate_rule_document(leaf) == evaluate_timerange_sync(leaf)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_naive_now_with_tz_is_rejected():
+    with pytest.raises(ValueError):
+        evaluate_rule_document(OFFICE_HOURS, datetime(2024, 6, 4, 12), tz=timezone.utc)
@@ -0,0 +1,103 @@
+from datetime import datetime
+import pytest
+
+from evaluate_dayandtimerange import compile_dayandtimerange, evaluate_dayandtimerange_sync, rule_cache
+from evaluate_timerange import compile_timerange, evaluate_timerange_sync
+from rule_errors import (ErrorAccounting, InvalidDayError, InvalidSourceError, InvalidTimeError,
+                         InvalidZoneError, MissingFieldError, RuleError, errors)
+
+TERMS = {
+    'start_day_of_week': 1,
+    'start_time': '08:00:00',
+    'end_day_of_week': 1,
+    'end_time': '18:00:00'
+}
+
+
+@pytest.mark.parametrize('field, value, error', [
+    ('start_time', '8am', InvalidTimeError),
+    ('end_time', '24:00:00', InvalidTimeError),
+    ('start_day_of_week', 'Monday', InvalidDayError),
+    ('end_day_of_week', '1', InvalidDayError),
+    ('timezone', 'Europe/Nowhere', InvalidZoneError),
+])
+def test_dayandtimerange_errors_name_the_field(field, value, error):
+    with pytest.raises(error) as excinfo:
+        compile_dayandtimerange({'terms': dict(TERMS, **{field: value})})
+    assert excinfo.value.field == field
+    assert excinfo.value.value == value
+    assert isinstance(excinfo.value, ValueError)
+
+
+def test_strict_mode_rejects_sentinels():
+    terms = dict(TERMS, end_time='-1:-1:-1')
+    assert compile_dayandtimerange({'terms': terms}).matches(datetime(2024, 6, 4, 12)) is False
+    with pytest.raises(MissingFieldError) as excinfo:
+        compile_dayandtimerange({'terms': terms}, strict=True)
+    assert excinfo.value.field == 'end_time'
+    with pytest.raises(MissingFieldError):
+        compile_dayandtimerange({'start_time': '08:00:00'}, 'logaction', strict=True)
+
+
+def test_only_strict_mode_rejects_days_outside_the_week():
+    # Saturday 10:00; the evaluators always compared days as they are
+    terms = dict(TERMS, start_day_of_week=0, end_day_of_week=7)
+    assert compile_dayandtimerange({'terms': terms}).matches(datetime(2024, 6, 8, 10)) is True
+    assert evaluate_dayandtimerange_sync({'now': datetime(2024, 6, 8, 10), 'terms': terms}) is True
+    with pytest.raises(InvalidDayError) as excinfo:
+        compile_dayandtimerange({'terms': terms}, strict=True)
+    assert excinfo.value.field == 'end_day_of_week'
+
+
+def test_bool_days_compare_as_numbers_whatever_is_cached():
+    # True == 1 shares a cache entry with 1, so both must compile alike
+    terms = dict(TERMS, start_day_of_week=True, end_day_of_week=True)
+    now = datetime(2024, 6, 4, 12)
+    rule_cache.invalidate()
+    assert evaluate_dayandtimerange_sync({'now': now, 'terms': terms}) is True
+    assert evaluate_dayandtimerange_sync({'now': now, 'terms': TERMS}) is True
+
+
+def test_timerange_errors_name_the_field():
+    with pytest.raises(MissingFieldError) as excinfo:
+        compile_timerange({'terms': {'start': '10:00:00'}})
+    assert excinfo.value.field == 'end'
+    with pytest.raises(InvalidTimeError) as excinfo:
+        compile_timerange({'start': '10:60:00', 'end': '11:00:00'}, 'logaction')
+    assert excinfo.value.field == 'start'
+    with pytest.raises(InvalidSourceError):
+        compile_timerange({}, 'other')
+
+
+def test_evaluators_count_errors_instead_of_printing(capsys):
+    errors.reset()
+    now = datetime(2024, 6, 4, 12)
+    assert evaluate_timerange_sync({'now': now, 'terms': {'start': 'x', 'end': 'y'}}) is False
+    assert evaluate_timerange_sync({'now': now}, 'bogus') is False
+    assert evaluate_dayandtimerange_sync(
+        {'now': now, 'terms': dict(TERMS, start_day_of_week='Tuesday')}) is False
+    assert capsys.readouterr().out == ''
+    assert errors.snapshot() == {
+        'dayandtimerange': {'invalid_day': 1},
+        'timerange': {'invalid_src': 1, 'invalid_time': 1},
+    }
+
+
+def test_hook_is_rate_limited():
+    clock = [0.0]
+    calls = []
+    accounting = ErrorAccounting(clock=lambda: clock[0])
+    accounting.set_hook(lambda source, error, suppressed: calls.append((source, suppressed)),
+                        min_interval=10)
+    error = RuleError('start', 'bad')
+    for second in range(25):
+        clock[0] = float(second)
+        accounting.record('timerange', error)
+    assert calls == [('timerange', 0), ('timerange', 9), ('timerange', 9)]
+    assert accounting.snapshot() == {'timerange': {'invalid_rule': 25}}
+
+
+def test_non_rule_errors_are_counted_by_class_name():
+    accounting = ErrorAccounting()
+    accounting.record('dayandtimerange', AttributeError('now'))
+    assert accounting.snapshot() == {'dayandtimerange': {'AttributeError': 1}}
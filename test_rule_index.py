@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+from rule_index import RuleIndex
+
+RULES = {
+    'office': DayAndTimeRange(0, 8 * 3600, 4, 18 * 3600),
+    'night': DayAndTimeRange(0, 22 * 3600, 4, 27000),
+    'weekend': DayAndTimeRange(5, 22 * 3600, 0, 27000),
+    'not_lunch': TimeRange(12 * 3600, 13 * 3600, True),
+    'unset': DayAndTimeRange(-1, -1, -1, -1),
+    'always': DayAndTimeRange(-1, -1, -1, -1, True),
+}
+
+
+def test_active_agrees_with_matches():
+    index = RuleIndex(RULES)
+    now = datetime(2024, 6, 3)
+    while now < datetime(2024, 6, 10, 1):
+        expected = {rule_id for rule_id, rule in RULES.items() if rule.matches(now)}
+        assert index.active(now) == expected
+        now += timedelta(seconds=899, microseconds=1)
+
+
+def test_boundaries_are_inclusive():
+    index = RuleIndex(RULES)
+    assert 'office' in index.active(datetime(2024, 6, 4, 18, 0, 0))
+    assert 'office' not in index.active(datetime(2024, 6, 4, 18, 0, 0, 1))
+
+
+def test_incremental_add_and_remove():
+    index = RuleIndex()
+    index.add(1, RULES['office'])
+    index.add(2, RULES['office'])
+    now = datetime(2024, 6, 4, 12, 0)
+    assert index.active(now) == {1, 2}
+    index.remove(1)
+    assert index.active(now) == {2}
+    assert len(index) == 1
+    with pytest.raises(KeyError):
+        index.remove(1)
+
+
+def test_add_replaces_existing_rule():
+    index = RuleIndex({'x': RULES['office']})
+    index.add('x', RULES['weekend'])
+    assert index.rule('x') == RULES['weekend']
+    assert index.active(datetime(2024, 6, 4, 12, 0)) == set()
+    assert index.active(datetime(2024, 6, 2, 6, 0)) == {'x'}
+
+
+def test_rules_in_different_zones():
+    index = RuleIndex({
+        'berlin': DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600, tz='Europe/Berlin'),
+        'new_york': DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600, tz='America/New_York'),
+        'utc': DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600),
+    })
+    # 17:00 in Berlin, 11:00 in New York
+    assert index.active(datetime(2024, 6, 4, 15, 0, tzinfo=timezone.utc)) == {'berlin', 'new_york', 'utc'}
+    # 20:00 in Berlin, 14:00 in New York
+    assert index.active(datetime(2024, 6, 4, 18, 0, tzinfo=timezone.utc)) == {'new_york', 'utc'}
+    index.remove('berlin')
+    assert len(index) == 2
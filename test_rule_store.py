@@ -0,0 +1,83 @@
+import pytest
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+from rule_store import RuleSet, dump, dumps
+
+RULES = {
+    'office': DayAndTimeRange(0, 28800, 4, 64800),
+    'weekend': DayAndTimeRange(4, 79200, 0, 27000, True, 'Europe/Berlin', 'minute'),
+    'night': TimeRange(82800, 3600, tz='Europe/Berlin'),
+    'lunch': TimeRange(43200, 46800, True, resolution='second'),
+    'unset': DayAndTimeRange(-1, -1, -1, -1),
+    'büro': TimeRange(0, 86399, tz='America/New_York', resolution='microsecond'),
+}
+
+
+def test_round_trip_through_a_mapped_file(tmp_path):
+    path = tmp_path / 'rules.bin'
+    dump(RULES, path)
+    with RuleSet.open(path) as rules:
+        assert len(rules) == len(RULES)
+        assert dict(rules.items()) == RULES
+        assert rules['weekend'] == RULES['weekend']
+        assert rules.rule_id(5) == 'büro'
+    assert path.stat().st_size == 28 + 24 * len(RULES) + 8 * 2 + len(
+        ''.join(RULES).encode()) + len('Europe/BerlinAmerica/New_York')
+
+
+def test_corruption_is_detected():
+    data = bytearray(dumps(RULES))
+    data[40] ^= 0xFF
+    with pytest.raises(ValueError, match='checksum'):
+        RuleSet(data)
+    assert len(RuleSet(data, verify=False)) == len(RULES)
+    with pytest.raises(ValueError, match='not a rule set'):
+        RuleSet(b'X' + bytes(data[1:]))
+    with pytest.raises(ValueError, match='size'):
+        RuleSet(bytes(data[:-1]))
+    with pytest.raises(ValueError, match='version'):
+        RuleSet(bytes(data[:8]) + b'\x02' + bytes(data[9:]))
+
+
+def test_unknown_rule_type_and_lookup_errors():
+    with pytest.raises(TypeError):
+        dumps({'x': object()})
+    rules = RuleSet(dumps(RULES))
+    with pytest.raises(KeyError):
+        rules['missing']
+    with pytest.raises(IndexError):
+        rules.rule(len(RULES))
+
+
+def test_days_and_bounds_that_do_not_fit_a_record():
+    with pytest.raises(TypeError, match="'fractional'.*start_day"):
+        dumps({'fractional': DayAndTimeRange(0.5, 0, 4, 3600)})
+    with pytest.raises(ValueError, match="'far'.*end_day 200"):
+        dumps({'far': DayAndTimeRange(0, 0, 200, 3600)})
+    with pytest.raises(ValueError, match="'long'.*end"):
+        dumps({'long': TimeRange(0, 2 ** 31)})
+
+
+def test_records_view():
+    np = pytest.importorskip('numpy')
+    records = RuleSet(dumps(RULES)).records()
+    assert records['start'].tolist() == [rule.start for rule in RULES.values()]
+    assert records['kind'].tolist() == [1, 1, 0, 0, 1, 0]
+    assert not records.flags.owndata
+    assert np.count_nonzero(records['flags'] & 1) == 2
+
+
+def test_close_with_and_without_a_live_records_array(tmp_path):
+    pytest.importorskip('numpy')
+    path = tmp_path / 'rules.bin'
+    dump(RULES, path)
+    with RuleSet.open(path) as rules:
+        assert len(rules) == len(RULES)
+    rules.close()
+
+    with RuleSet.open(path) as rules:
+        records = rules.records()
+    # The mapping outlives the rule set for the array still using it
+    assert records['start'].tolist() == [rule.start for rule in RULES.values()]
+    del records
@@ -0,0 +1,65 @@
+import pickle
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+from schedule import Schedule
+from weekline import MICROS_PER_WEEK
+
+MONDAY = datetime(2024, 6, 3)
+OFFICE = DayAndTimeRange(0, 9 * 3600, 4, 17 * 3600)
+LUNCH = TimeRange(12 * 3600, 12 * 3600 + 59 * 60)
+WEEKEND = DayAndTimeRange(5, 0, 6, 86399)
+
+
+def random_instants(count, seed=1):
+    rng = random.Random(seed)
+    return [MONDAY + timedelta(microseconds=rng.randrange(MICROS_PER_WEEK)) for _ in range(count)]
+
+
+def test_composite_matches_nested_evaluation():
+    schedule = (Schedule.from_rule(OFFICE) - LUNCH) & ~Schedule.from_rule(WEEKEND)
+    for now in random_instants(5000):
+        expected = OFFICE.matches(now) and not LUNCH.matches(now) and not WEEKEND.matches(now)
+        assert schedule.matches(now) == expected
+
+
+def test_normalization_collapses_redundant_ranges():
+    parts = [Schedule.from_rule(DayAndTimeRange(day, 9 * 3600, day, 17 * 3600)) for day in range(5)]
+    union = parts[0]
+    for part in parts[1:] + parts:
+        union = union | part
+    assert len(union.intervals) == 5
+    assert union == Schedule(union.intervals[::-1] + union.intervals)
+    assert (union | ~union) == Schedule.always()
+    assert not (union & ~union)
+
+
+def test_union_and_difference_on_raw_intervals():
+    schedule = Schedule([(10, 20), (15, 30), (40, 50)])
+    assert schedule.intervals == ((10, 30), (40, 50))
+    assert (schedule - Schedule([(25, 45)])).intervals == ((10, 25), (45, 50))
+    assert schedule.seconds() == ((10e-6, 30e-6), (40e-6, 50e-6))
+
+
+def test_matches_at_agrees_with_matches():
+    schedule = Schedule.from_rule(OFFICE) - LUNCH
+    for now in random_instants(500, seed=2):
+        seconds = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+        assert schedule.matches_at(now.weekday(), seconds) == schedule.matches(now)
+
+
+def test_zones_must_agree():
+    with pytest.raises(ValueError):
+        Schedule.from_rule(OFFICE) | Schedule.from_rule(TimeRange(0, 60, tz='Europe/Berlin'))
+
+
+def test_immutable_and_picklable():
+    schedule = Schedule.from_rule(TimeRange(0, 60, tz='Europe/Berlin'))
+    with pytest.raises(AttributeError):
+        schedule.tz = None
+    assert pickle.loads(pickle.dumps(schedule)) == schedule
+    assert schedule.matches(datetime(2024, 6, 3, 0, 0, 30))
@@ -0,0 +1,60 @@
+import pickle
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+from schedule_bitmap import WeekBitmap
+
+MONDAY = datetime(2024, 6, 3)
+
+
+def test_minute_bitmap_matches_timerange_everywhere():
+    rng = random.Random(2)
+    for rule in (TimeRange(8 * 3600 + 30, 17 * 3600 + 59), TimeRange(22 * 3600, 3600, True)):
+        bitmap = WeekBitmap.from_rule(rule)
+        assert len(bitmap.data) == 1260
+        for minute in range(0, 10080, 7):
+            now = MONDAY + timedelta(minutes=minute, seconds=rng.randrange(60))
+            assert bitmap.matches(now) == rule.matches(now)
+
+
+def test_second_bitmap_matches_dayandtimerange_on_whole_seconds():
+    rule = DayAndTimeRange(4, 22 * 3600 + 15, 1, 7 * 3600 + 30 * 60 + 59)
+    bitmap = WeekBitmap.from_rule(rule, resolution=1)
+    rng = random.Random(3)
+    for _ in range(2000):
+        now = MONDAY + timedelta(seconds=rng.randrange(7 * 86400))
+        assert bitmap.matches(now) == rule.matches(now)
+
+
+def test_set_algebra():
+    day = WeekBitmap.from_rule(TimeRange(8 * 3600, 18 * 3600))
+    lunch = WeekBitmap.from_rule(TimeRange(12 * 3600, 13 * 3600))
+    assert (day & lunch) == lunch
+    assert (day | lunch) == day
+    assert (day - lunch).count() == day.count() - lunch.count()
+    assert (~day).count() == 10080 - day.count()
+    assert ~~day == day
+    assert WeekBitmap.from_rules([TimeRange(8 * 3600, 18 * 3600), TimeRange(12 * 3600, 13 * 3600)], 'and') == lunch
+
+
+def test_mismatched_bitmaps_and_bad_arguments():
+    minute = WeekBitmap.from_rule(TimeRange(0, 60))
+    with pytest.raises(ValueError):
+        minute | WeekBitmap.from_rule(TimeRange(0, 60), resolution=1)
+    with pytest.raises(ValueError):
+        minute | WeekBitmap.from_rule(TimeRange(0, 60, tz='Europe/Berlin'))
+    with pytest.raises(ValueError):
+        WeekBitmap(b'', 60)
+    with pytest.raises(ValueError):
+        WeekBitmap.from_rules([], 'or')
+
+
+def test_immutable_and_picklable():
+    bitmap = WeekBitmap.from_rule(TimeRange(0, 60, tz='Europe/Berlin'))
+    with pytest.raises(AttributeError):
+        bitmap.tz = None
+    assert pickle.loads(pickle.dumps(bitmap)) == bitmap
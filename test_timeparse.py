@@ -0,0 +1,56 @@
+import datetime
+
+import pytest
+
+from rule_errors import InvalidTimeError, MissingFieldError
+from timeparse import parse_seconds, parse_seconds_array, parse_time, seconds_of_day
+
+
+def test_parse_seconds_agrees_with_strptime():
+    for value in ('00:00:00', '23:59:59', '07:30:15', '7:5:3', '12:00'):
+        parsed = datetime.datetime.strptime(value if value.count(':') == 2 else value + ':00', '%H:%M:%S')
+        assert parse_seconds(value) == parsed.hour * 3600 + parsed.minute * 60 + parsed.second
+
+
+@pytest.mark.parametrize('value, message', [
+    ('24:00:00', 'start_time: hours out of range (0-23)'),
+    ('10:60:00', 'start_time: minutes out of range (0-59)'),
+    ('10:00:60', 'start_time: seconds out of range (0-59)'),
+    ('10:00:00:00', 'start_time: expected HH:MM:SS or HH:MM'),
+    (' 10:00:00', 'start_time: expected HH:MM:SS or HH:MM'),
+    ('1a:00:00', 'start_time: expected HH:MM:SS or HH:MM'),
+    ('１０:00:00', 'start_time: expected HH:MM:SS or HH:MM'),
+    ('', 'start_time: expected HH:MM:SS or HH:MM'),
+    (36000, 'start_time: expected HH:MM:SS or HH:MM'),
+])
+def test_errors_name_the_field_and_component(value, message):
+    with pytest.raises(InvalidTimeError) as excinfo:
+        parse_seconds(value, 'start_time')
+    assert str(excinfo.value).startswith(message)
+    assert excinfo.value.field == 'start_time'
+
+
+def test_parse_time():
+    assert parse_time('07:30:15') == datetime.time(7, 30, 15)
+    assert parse_time('23:59') == datetime.time(23, 59)
+
+
+def test_parse_seconds_array():
+    np = pytest.importorskip('numpy')
+    values = np.array([['07:30:15', '22:00'], ['9:05:00', '00:00:00']])
+    assert parse_seconds_array(values).tolist() == [[27015, 79200], [32700, 0]]
+    objects = np.array(['07:30:15', '23:59:59', '1:2'], dtype=object)
+    assert parse_seconds_array(objects).tolist() == [27015, 86399, 3720]
+    with pytest.raises(InvalidTimeError, match='end_time: minutes out of range'):
+        parse_seconds_array(['07:30:15', '07:61:00'], 'end_time')
+    with pytest.raises(InvalidTimeError):
+        parse_seconds_array(np.array(['07:30:15', '07:30:15x']))
+
+
+def test_seconds_of_day_reads_strings_and_optionally_times():
+    assert seconds_of_day('07:30') == 27000
+    assert seconds_of_day(datetime.time(7, 30, 5), allow_time=True) == 27005
+    with pytest.raises(InvalidTimeError):
+        seconds_of_day(datetime.time(7, 30))
+    with pytest.raises(MissingFieldError):
+        seconds_of_day('', 'start')
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+import zoneinfo
+import pytest
+
+from evaluate_dayandtimerange import DayAndTimeRange, evaluate_dayandtimerange_sync
+from evaluate_timerange import evaluate_timerange_sync
+from timezones import ZoneOffsets, wall_clock, wall_position, zone_offsets
+
+
+def utc_offset(name, epoch):
+    offset = datetime.fromtimestamp(epoch, zoneinfo.ZoneInfo(name)).utcoffset()
+    return int(offset.total_seconds())
+
+
+@pytest.mark.parametrize('name', ['Europe/Berlin', 'America/New_York', 'Australia/Lord_Howe'])
+def test_offsets_agree_with_zoneinfo(name):
+    offsets = ZoneOffsets(name)
+    # Hourly samples over two years, plus the second around each transition
+    for epoch in range(1704067200, 1704067200 + 2 * 365 * 86400, 3600):
+        assert offsets.utcoffset(epoch) == utc_offset(name, epoch)
+    starts, _ = offsets.transitions(1704067200, 1704067200 + 2 * 365 * 86400)
+    for start in starts[1:]:
+        assert offsets.utcoffset(start) == utc_offset(name, start)
+        assert offsets.utcoffset(start - 1) == utc_offset(name, start - 1)
+
+
+def test_offsets_extend_backwards():
+    offsets = ZoneOffsets('Europe/Berlin')
+    assert offsets.utcoffset(1717502400) == 7200
+    assert offsets.utcoffset(0) == 3600
+
+
+def test_unknown_zone():
+    with pytest.raises(zoneinfo.ZoneInfoNotFoundError):
+        zone_offsets('Mars/Olympus_Mons')
+
+
+def test_wall_clock_converts_aware_and_keeps_naive():
+    aware = datetime(2024, 6, 4, 22, 30, 0, 5, tzinfo=timezone.utc)
+    # 00:30 on Wednesday in Berlin
+    assert wall_clock(aware, 'Europe/Berlin') == (2, 1800.000005)
+    assert wall_clock(aware.replace(tzinfo=None), 'Europe/Berlin') == (1, 81000.000005)
+    assert wall_position(aware, None) == (86400 + 81000) * 1_000_000 + 5
+
+
+def test_rule_zone_in_terms():
+    data = {
+        # 06:30 UTC is 08:30 in Berlin
+        'now': datetime(2024, 6, 4, 6, 30, tzinfo=timezone.utc),
+        'terms': {
+            'start_day_of_week': 1,
+            'start_time': '08:00:00',
+            'end_day_of_week': 1,
+            'end_time': '18:00:00',
+            'timezone': 'Europe/Berlin'
+        },
+        'condition': {}
+    }
+    assert evaluate_dayandtimerange_sync(data) is True
+    assert evaluate_dayandtimerange_sync(dict(data, terms=dict(data['terms'], timezone=None))) is False
+
+
+def test_rule_zone_in_logaction():
+    data = {
+        'now': datetime(2024, 6, 4, 14, 30, tzinfo=timezone.utc),
+        'start': '10:00:00',
+        'end': '11:00:00',
+        'timezone': 'America/New_York'
+    }
+    assert evaluate_timerange_sync(data, 'logaction') is True
+
+
+def test_unknown_rule_zone_is_an_evaluation_error():
+    data = {
+        'now': datetime(2024, 6, 4, 14, 30, tzinfo=timezone.utc),
+        'start': '10:00:00',
+        'end': '11:00:00',
+        'timezone': 'Nowhere/Special'
+    }
+    assert evaluate_timerange_sync(data, 'logaction') is False
+
+
+def test_dst_gap_and_overlap():
+    rule = DayAndTimeRange(6, 2 * 3600, 6, 3 * 3600 - 1, tz='Europe/Berlin')
+    # 2024-03-31 02:00-03:00 does not exist in Berlin: no aware instant matches
+    start = datetime(2024, 3, 31, 0, 0, tzinfo=timezone.utc)
+    instants = [start + timedelta(minutes=minutes) for minutes in range(0, 180, 5)]
+    assert not any(rule.matches(instant) for instant in instants)
+    # A naive reading inside the gap is evaluated as it is
+    assert rule.matches(datetime(2024, 3, 31, 2, 30)) is True
+    # 2024-10-27 02:00-03:00 happens twice: both occurrences match
+    overlap = datetime(2024, 10, 27, 0, 30, tzinfo=timezone.utc)
+    assert rule.matches(overlap) is True
+    assert rule.matches(overlap + timedelta(hours=1)) is True
+    assert rule.matches(overlap + timedelta(hours=2)) is False
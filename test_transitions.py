@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+from transitions import earliest_transition, next_transition, transition_delay, transition_points
+from weekline import MICROS_PER_WEEK
+
+
+def test_next_transition_same_day():
+    rule = DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600)
+    assert next_transition(rule, datetime(2024, 6, 4, 7, 0)) == datetime(2024, 6, 4, 8, 0)
+    assert next_transition(rule, datetime(2024, 6, 4, 8, 0)) == datetime(2024, 6, 4, 18, 0, 0, 1)
+    # Wraps to the following week
+    assert next_transition(rule, datetime(2024, 6, 5, 0, 0)) == datetime(2024, 6, 11, 8, 0)
+
+
+def test_next_transition_respects_not_operator():
+    rule = TimeRange(23 * 3600, 3600, True)
+    assert rule.matches(datetime(2024, 6, 4, 12, 0)) is True
+    assert next_transition(rule, datetime(2024, 6, 4, 12, 0)) == datetime(2024, 6, 4, 23, 0)
+    assert next_transition(rule, datetime(2024, 6, 4, 23, 0)) == datetime(2024, 6, 5, 1, 1)
+
+
+def test_no_transition_across_the_week_boundary():
+    # Fri 2200 to Sun 0730 is one window spanning Monday 00:00 on the week line
+    rule = DayAndTimeRange(5, 22 * 3600, 0, 27000)
+    assert 0 not in transition_points(rule)
+
+
+def test_constant_rule_has_no_transition():
+    assert next_transition(DayAndTimeRange(-1, -1, -1, -1), datetime(2024, 6, 4)) is None
+
+
+def test_result_changes_exactly_at_transition():
+    rules = [
+        DayAndTimeRange(0, 22 * 3600, 4, 27000),
+        DayAndTimeRange(5, 22 * 3600, 0, 27000, True),
+        TimeRange(10 * 3600 + 30, 11 * 3600),
+    ]
+    for rule in rules:
+        now = datetime(2024, 6, 3, 3, 17)
+        for _ in range(20):
+            following = next_transition(rule, now)
+            assert rule.matches(following) != rule.matches(following - timedelta(microseconds=1))
+            assert rule.matches(now) == rule.matches(following - timedelta(microseconds=1))
+            now = following
+
+
+def test_earliest_transition():
+    rules = {
+        'a': DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600),
+        'b': TimeRange(8 * 3600, 9 * 3600),
+        'c': DayAndTimeRange(2, 0, 2, 3600),
+        'never': DayAndTimeRange(-1, -1, -1, -1),
+    }
+    assert earliest_transition(rules, datetime(2024, 6, 4, 7, 0)) == \
+        (datetime(2024, 6, 4, 8, 0), {'a', 'b'})
+    assert earliest_transition({'never': rules['never']}, datetime(2024, 6, 4)) == (None, set())
+
+
+def test_next_transition_in_rule_zone():
+    rule = DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600, tz='Europe/Berlin')
+    now = datetime(2024, 6, 4, 5, 0, tzinfo=timezone.utc)
+    following = next_transition(rule, now)
+    assert following == datetime(2024, 6, 4, 6, 0, tzinfo=timezone.utc)
+    assert rule.matches(following) is True
+    assert rule.matches(following - timedelta(microseconds=1)) is False
+
+
+def test_transition_delay_wraps_around_the_week():
+    points = (100, 500)
+    assert transition_delay(points, 0) == 100
+    assert transition_delay(points, 100) == 400
+    assert transition_delay(points, 500) == MICROS_PER_WEEK - 400
+    assert transition_delay((), 0) is None
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from evaluate_dayandtimerange import DayAndTimeRange
+from evaluate_timerange import TimeRange
+
+np = pytest.importorskip('numpy')
+from vectorized import evaluate_array, week_positions  # noqa: E402
+
+
+def sample_instants():
+    start = datetime(2024, 6, 3)
+    return [start + timedelta(seconds=seconds, microseconds=micros)
+            for seconds in range(0, 8 * 86400, 1799)
+            for micros in (0, 1)]
+
+
+RULES = [
+    DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600),
+    DayAndTimeRange(0, 22 * 3600, 4, 27000),
+    DayAndTimeRange(5, 22 * 3600, 0, 27000),
+    DayAndTimeRange(4, 23 * 3600, 2, 3600, True),
+    DayAndTimeRange(-1, -1, -1, -1, True),
+    TimeRange(36000, 39600),
+    TimeRange(23 * 3600, 3600, True),
+]
+
+
+@pytest.mark.parametrize('rule', RULES)
+def test_evaluate_array_agrees_with_matches(rule):
+    instants = sample_instants()
+    mask = evaluate_array(rule, np.array(instants, dtype='datetime64[us]'))
+    assert mask.tolist() == [rule.matches(instant) for instant in instants]
+
+
+def test_epoch_seconds_input():
+    rule = DayAndTimeRange(1, 8 * 3600, 1, 18 * 3600)
+    # 2024-06-04 12:00:00 and 19:00:00 UTC, a Tuesday
+    epochs = np.array([1717502400, 1717527600], dtype=np.int64)
+    assert evaluate_array(rule, epochs).tolist() == [True, False]
+
+
+def test_week_positions_rejects_floats():
+    with pytest.raises(TypeError):
+        week_positions(np.array([1.5]))
+
+
+def test_zone_rule_agrees_with_matches_on_utc_instants():
+    rule = DayAndTimeRange(6, 2 * 3600, 0, 3600, tz='America/New_York')
+    start = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    instants = [start + timedelta(minutes=minutes) for minutes in range(0, 60 * 24 * 30, 13)]
+    timestamps = np.array([instant.replace(tzinfo=None) for instant in instants],
+                          dtype='datetime64[us]')
+    assert evaluate_array(rule, timestamps).tolist() == [rule.matches(instant) for instant in instants]
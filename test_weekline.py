@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from weekline import (MICROS_PER_DAY, MICROS_PER_WEEK, boundaries, complement_intervals,
+                      contains, intersect_intervals, merge_intervals, wall_micros, week_position)
+
+
+def test_week_position_includes_microseconds():
+    assert week_position(datetime(2024, 6, 3, 0, 0, 0)) == 0
+    assert week_position(datetime(2024, 6, 9, 23, 59, 59, 999999)) == MICROS_PER_WEEK - 1
+
+
+def test_merge_intervals_joins_touching_and_drops_empty():
+    assert merge_intervals([(10, 20), (0, 10), (15, 18), (30, 30)]) == ((0, 20),)
+
+
+def test_complement_intervals():
+    assert complement_intervals(()) == ((0, MICROS_PER_WEEK),)
+    assert complement_intervals(((0, MICROS_PER_DAY),)) == ((MICROS_PER_DAY, MICROS_PER_WEEK),)
+
+
+def test_intersect_intervals():
+    assert intersect_intervals(((0, 10), (20, 30)), ((5, 25), (28, 40))) == ((5, 10), (20, 25), (28, 30))
+    assert intersect_intervals(((0, 10),), ((10, 20),)) == ()
+    assert intersect_intervals((), ((0, MICROS_PER_DAY),)) == ()
+
+
+def test_contains_is_half_open():
+    bounds = boundaries(((10, 20), (30, 40)))
+    assert contains(bounds, 10) is True
+    assert contains(bounds, 19) is True
+    assert contains(bounds, 20) is False
+    assert contains(bounds, 5) is False
+
+
+def test_wall_micros_ignores_tzinfo_and_spans_days():
+    naive = datetime(2024, 6, 4, 10, 30, 0, 5)
+    assert wall_micros(naive) == wall_micros(naive.replace(tzinfo=timezone.utc))
+    assert wall_micros(datetime(2024, 6, 5)) - wall_micros(datetime(2024, 6, 4)) == MICROS_PER_DAY
@@ -0,0 +1,160 @@
+"""
+Parsers for the HH:MM:SS and HH:MM times used in rule terms.
+
+These replace datetime.strptime(value, "%H:%M:%S"), which builds a regex
+match and a whole datetime for every call. Like strptime, each field may be
+written with one or two digits, so existing rules keep their meaning; HH:MM
+is read as HH:MM:00.
+"""
+import datetime
+
+from rule_errors import InvalidTimeError, MissingFieldError
+
+_LIMITS = (('hours', 23), ('minutes', 59), ('seconds', 59))
+
+
+def parse_seconds(value, field='time'):
+    """
+    Parses an HH:MM:SS or HH:MM string into seconds since midnight.
+
+    Args:
+        value (str): The time.
+        field (str): The rule field the value came from, used in errors.
+
+    Returns:
+        int: Seconds since midnight.
+
+    Raises:
+        InvalidTimeError: If the value is not a time, or a component is out
+            of range; the message names the component.
+
+    Examples:
+        >>> parse_seconds('07:30:15')
+        27015
+        >>> parse_seconds('22:00')
+        79200
+        >>> parse_seconds('24:00:00', 'end_time')
+        Traceback (most recent call last):
+            ...
+        rule_errors.InvalidTimeError: end_time: hours out of range (0-23) in '24:00:00'
+    """
+    if type(value) is str and len(value) == 8 and value.isascii() and value[2] == ':' == value[5]:
+        hours = value[0:2]
+        minutes = value[3:5]
+        seconds = value[6:8]
+        if hours.isdigit() and minutes.isdigit() and seconds.isdigit():
+            hours = int(hours)
+            minutes = int(minutes)
+            seconds = int(seconds)
+            if hours < 24 and minutes < 60 and seconds < 60:
+                return hours * 3600 + minutes * 60 + seconds
+    return _parse_slow(value, field)
+
+
+def _parse_slow(value, field):
+    if not isinstance(value, str) or not value.isascii():
+        raise InvalidTimeError(field, f'expected HH:MM:SS or HH:MM, got {value!r}', value)
+    parts = value.split(':')
+    if len(parts) not in (2, 3) or not all(0 < len(part) <= 2 and part.isdigit() for part in parts):
+        raise InvalidTimeError(field, f'expected HH:MM:SS or HH:MM, got {value!r}', value)
+    total = 0
+    for (name, limit), part, scale in zip(_LIMITS, parts, (3600, 60, 1)):
+        number = int(part)
+        if number > limit:
+            raise InvalidTimeError(field, f'{name} out of range (0-{limit}) in {value!r}', value)
+        total += number * scale
+    return total
+
+
+def seconds_of_day(value, field='time', allow_time=False):
+    """
+    Reads a rule time term as seconds since midnight.
+
+    Args:
+        value (str or datetime.time): An HH:MM:SS or HH:MM string, or a
+            datetime.time when allow_time is set.
+        field (str): The rule field the value came from, used in errors.
+        allow_time (bool): Accept datetime.time objects as well.
+
+    Raises:
+        MissingFieldError: If the value is the empty string.
+        InvalidTimeError: If the value is not a valid time.
+
+    Examples:
+        >>> seconds_of_day(datetime.time(7, 30), allow_time=True)
+        27000
+    """
+    if allow_time and isinstance(value, datetime.time):
+        return value.hour * 3600 + value.minute * 60 + value.second
+    if value == '':
+        raise MissingFieldError(field, 'missing time')
+    return parse_seconds(value, field)
+
+
+def parse_time(value, field='time'):
+    """
+    Parses an HH:MM:SS or HH:MM string into a datetime.time.
+
+    Examples:
+        >>> parse_time('07:30')
+        datetime.time(7, 30)
+    """
+    hours, seconds = divmod(parse_seconds(value, field), 3600)
+    return datetime.time(hours, *divmod(seconds, 60))
+
+
+def parse_seconds_array(values, field='time'):
+    """
+    Parses an array of HH:MM:SS or HH:MM strings into seconds since midnight.
+
+    Zero-padded values are checked and converted as a block of character
+    codes; anything else goes through parse_seconds one element at a time.
+    Needs numpy.
+
+    Args:
+        values (array-like): Strings, in any shape.
+        field (str): The rule field the values came from, used in errors.
+
+    Returns:
+        numpy.ndarray: int64 seconds since midnight, in the shape of values.
+
+    Raises:
+        InvalidTimeError: For the first value that is not a valid time.
+
+    Examples:
+        >>> parse_seconds_array(['07:30:15', '22:00', '9:05:00']).tolist()
+        [27015, 79200, 32700]
+    """
+    import numpy as np
+
+    values = np.asarray(values)
+    if values.dtype.kind not in 'UO':
+        raise InvalidTimeError(field, f'expected strings, got an array of {values.dtype}')
+    flat = values.reshape(-1)
+    result = np.empty(flat.shape, dtype=np.int64)
+    if values.dtype.kind == 'O' or values.dtype.itemsize > 8 * 4:
+        lengths = np.fromiter((len(value) if isinstance(value, str) else -1 for value in flat),
+                              dtype=np.int64, count=len(flat))
+        fixed = np.flatnonzero((lengths == 8) | (lengths == 5))
+        codes = flat[fixed].astype('U8')
+    else:
+        fixed = np.arange(len(flat))
+        codes = flat.astype('U8')
+    codes = codes.view(np.uint32).reshape(-1, 8).astype(np.int64)
+    digits = codes - ord('0')
+    is_digit = (digits >= 0) & (digits <= 9)
+    colon = codes == ord(':')
+    long_form = (is_digit[:, [0, 1, 3, 4, 6, 7]].all(axis=1) & colon[:, 2] & colon[:, 5])
+    short_form = (is_digit[:, [0, 1, 3, 4]].all(axis=1) & colon[:, 2] & (codes[:, 5:] == 0).all(axis=1))
+    good = long_form | short_form
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 3] * 10 + digits[:, 4]
+    seconds = np.where(long_form, digits[:, 6] * 10 + digits[:, 7], 0)
+    good &= (hours < 24) & (minutes < 60) & (seconds < 60)
+    result[fixed[good]] = (hours * 3600 + minutes * 60 + seconds)[good]
+
+    slow = np.ones(len(flat), dtype=bool)
+    slow[fixed[good]] = False
+    for index in np.flatnonzero(slow):
+        result[index] = parse_seconds(flat[index].item() if values.dtype.kind == 'U' else flat[index], field)
+    return result.reshape(values.shape)
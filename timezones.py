@@ -0,0 +1,215 @@
+"""
+Cached UTC offset lookups for the zones rules are written in.
+
+Rules may name the IANA zone their days and times are expressed in. Looking
+an offset up through zoneinfo for every event is slow, so each zone gets a
+ZoneOffsets table of its UTC offset transitions, probed once per span of
+years and then searched with bisect.
+
+Aware instants always map to exactly one wall-clock reading in the zone, so
+DST gaps and overlaps need no special handling for them: during an overlap
+the wall clock reads the repeated hour twice, and a gap is simply never read.
+Naive datetimes are taken to already be wall-clock readings in the rule's
+zone and are evaluated as they are, without conversion. A naive time inside a
+gap is evaluated by its reading, and both occurrences of an ambiguous time
+give the same result.
+"""
+import bisect
+import datetime
+import functools
+import threading
+import zoneinfo
+
+from rule_errors import InvalidZoneError
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+
+_PROBE_STEP = 6 * 3600
+_SPAN = 8 * 365 * 86400
+
+
+class ZoneOffsets:
+    """
+    UTC offset transitions of one zone, extended lazily as instants are looked up.
+
+    Args:
+        name (str): The IANA zone name, e.g. 'Europe/Berlin'.
+
+    Raises:
+        zoneinfo.ZoneInfoNotFoundError: If the zone does not exist.
+
+    Examples:
+        >>> ZoneOffsets('Europe/Berlin').utcoffset(1717502400)
+        7200
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.zone = zoneinfo.ZoneInfo(name)
+        # (lo, hi, starts, offsets), replaced as a whole when it is extended
+        # so that readers on other threads always see a consistent table
+        self._table = (None, None, (), ())
+        self._lock = threading.Lock()
+
+    def _offset(self, utc_seconds):
+        offset = datetime.datetime.fromtimestamp(utc_seconds, self.zone).utcoffset()
+        return offset.days * 86400 + offset.seconds
+
+    def _probe(self, lo, hi):
+        # Returns (start, offset) pairs for [lo, hi): the offset at lo, then
+        # every change, located to the second by bisection.
+        changes = [(lo, self._offset(lo))]
+        position = lo
+        while position < hi:
+            step = min(position + _PROBE_STEP, hi)
+            offset = self._offset(step)
+            if offset != changes[-1][1]:
+                before = position
+                after = step
+                while after - before > 1:
+                    middle = (before + after) // 2
+                    if self._offset(middle) == changes[-1][1]:
+                        before = middle
+                    else:
+                        after = middle
+                changes.append((after, self._offset(after)))
+            position = step
+        return changes
+
+    def ensure(self, lo, hi):
+        """
+        Makes sure transitions between two UTC epoch seconds are known.
+
+        Returns:
+            tuple: The (lo, hi, starts, offsets) table covering them.
+        """
+        table = self._table
+        if table[0] is not None and table[0] <= lo and hi < table[1]:
+            return table
+        with self._lock:
+            table_lo, table_hi, starts, offsets = self._table
+            if table_lo is None:
+                table_lo = table_hi = lo - lo % _SPAN
+                changes = self._probe(table_lo, table_lo + 1)
+                starts = [changes[0][0]]
+                offsets = [changes[0][1]]
+            else:
+                starts = list(starts)
+                offsets = list(offsets)
+            while lo < table_lo:
+                changes = self._probe(table_lo - _SPAN, table_lo)
+                if changes[-1][1] == offsets[0]:
+                    starts[0] = changes.pop()[0]
+                starts[:0] = [start for start, _ in changes]
+                offsets[:0] = [offset for _, offset in changes]
+                table_lo -= _SPAN
+            while hi >= table_hi:
+                changes = self._probe(table_hi, table_hi + _SPAN)
+                if changes[0][1] == offsets[-1]:
+                    changes.pop(0)
+                starts.extend(start for start, _ in changes)
+                offsets.extend(offset for _, offset in changes)
+                table_hi += _SPAN
+            table = self._table = (table_lo, table_hi, starts, offsets)
+        return table
+
+    def transitions(self, lo, hi):
+        """
+        Returns the (starts, offsets) lists covering two UTC epoch seconds.
+
+        offsets[i] applies from starts[i] up to starts[i + 1]. The lists are
+        the internal tables and must not be modified.
+        """
+        table = self.ensure(lo, hi)
+        return table[2], table[3]
+
+    def utcoffset(self, utc_seconds):
+        """
+        Returns the UTC offset in seconds in effect at a UTC epoch second.
+        """
+        lo, hi, starts, offsets = self._table
+        if lo is None or not lo <= utc_seconds < hi:
+            lo, hi, starts, offsets = self.ensure(utc_seconds, utc_seconds)
+        return offsets[bisect.bisect_right(starts, utc_seconds) - 1]
+
+
+@functools.lru_cache(maxsize=None)
+def zone_offsets(name):
+    """
+    Returns the shared ZoneOffsets table for a zone name.
+    """
+    return ZoneOffsets(name)
+
+
+def validate_zone(name):
+    """
+    Checks that a zone name exists, so bad rules fail when they are compiled.
+
+    Raises:
+        InvalidZoneError: If the zone does not exist.
+    """
+    if name is not None:
+        try:
+            zone_offsets(name)
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError, TypeError) as err:
+            raise InvalidZoneError('timezone', f'unknown zone {name!r}', name) from err
+    return name
+
+
+def wall_date(now, tz):
+    """
+    Returns the date of now on the wall clock of a zone, with its time of day.
+
+    Args:
+        now (datetime.datetime): The instant, read as in wall_clock.
+        tz (str): The IANA zone name, or None.
+
+    Returns:
+        tuple: (ordinal, seconds, microsecond), where ordinal is the
+            proleptic Gregorian ordinal of the date (its weekday is
+            (ordinal - 1) % 7) and seconds are whole seconds-of-day.
+    """
+    if tz is None or now.tzinfo is None:
+        return (now.toordinal(), now.hour * 3600 + now.minute * 60 + now.second,
+                now.microsecond)
+    offset = now.utcoffset()
+    utc = ((now.toordinal() - EPOCH_ORDINAL) * 86400
+           + now.hour * 3600 + now.minute * 60 + now.second
+           - offset.days * 86400 - offset.seconds)
+    days, seconds = divmod(utc + zone_offsets(tz).utcoffset(utc), 86400)
+    return days + EPOCH_ORDINAL, seconds, now.microsecond
+
+
+def wall_clock(now, tz):
+    """
+    Returns the weekday and seconds-of-day of now on the wall clock of a zone.
+
+    Args:
+        now (datetime.datetime): The instant. Naive datetimes, and any datetime
+            when tz is None, are read as they are.
+        tz (str): The IANA zone name, or None.
+
+    Returns:
+        tuple: (weekday, seconds) as accepted by the rules' matches_at.
+    """
+    ordinal, seconds, microsecond = wall_date(now, tz)
+    return (ordinal - 1) % 7, seconds + microsecond / 1e6
+
+
+def wall_position(now, tz):
+    """
+    Returns the microsecond-of-week position of now on the wall clock of a zone.
+    """
+    ordinal, seconds, microsecond = wall_date(now, tz)
+    return ((ordinal - 1) % 7 * 86400 + seconds) * 1_000_000 + microsecond
+
+
+def localize(now, tz):
+    """
+    Converts an aware datetime to a zone; naive datetimes and tz=None pass through.
+    """
+    if tz is None or now.tzinfo is None:
+        return now
+    return now.astimezone(zone_offsets(tz).zone)
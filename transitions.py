@@ -0,0 +1,108 @@
+"""
+Next-transition queries, so callers can sleep until a rule flips instead of polling.
+"""
+import bisect
+import datetime
+import functools
+
+from timezones import localize
+from weekline import MICROS_PER_WEEK, boundaries, contains, week_position
+
+
+@functools.lru_cache(maxsize=4096)
+def transition_points(rule):
+    """
+    Returns the week positions at which a compiled rule changes its result.
+
+    The points come from the rule's week_intervals(), so not_operator is
+    already taken into account. Interval ends that meet across the end of
+    the week are not transitions.
+
+    Returns:
+        tuple: Sorted microsecond-of-week positions; empty if the rule is
+            constant.
+    """
+    bounds = boundaries(rule.week_intervals())
+    points = set()
+    for point in bounds:
+        point %= MICROS_PER_WEEK
+        if contains(bounds, point) != contains(bounds, (point - 1) % MICROS_PER_WEEK):
+            points.add(point)
+    return tuple(sorted(points))
+
+
+def transition_delay(points, position):
+    """
+    Returns the time from a week position to the next transition point.
+
+    Args:
+        points (tuple): Sorted transition points, as from transition_points.
+        position (int): The current microsecond-of-week position.
+
+    Returns:
+        int: Microseconds until the first point after position, wrapping
+            around the end of the week, or None if there are no points.
+
+    Examples:
+        >>> transition_delay((100, 500), 100)
+        400
+    """
+    if not points:
+        return None
+    index = bisect.bisect_right(points, position)
+    if index == len(points):
+        return points[0] + MICROS_PER_WEEK - position
+    return points[index] - position
+
+
+def next_transition(rule, now):
+    """
+    Returns the first instant after now at which the rule's result changes.
+
+    Transitions are found on the wall clock of the rule's zone, so when the
+    rule has a zone and now is aware, the result is expressed in that zone.
+
+    Args:
+        rule (TimeRange or DayAndTimeRange): The compiled rule.
+        now (datetime.datetime): The current date and time.
+
+    Returns:
+        datetime.datetime: The next transition, or None if the rule never
+            changes.
+
+    Examples:
+        >>> from evaluate_dayandtimerange import DayAndTimeRange
+        >>> next_transition(DayAndTimeRange(1, 28800, 1, 64800), datetime.datetime(2024, 6, 4, 12, 0))
+        datetime.datetime(2024, 6, 4, 18, 0, 0, 1)
+    """
+    now = localize(now, rule.tz)
+    delay = transition_delay(transition_points(rule), week_position(now))
+    if delay is None:
+        return None
+    return now + datetime.timedelta(microseconds=delay)
+
+
+def earliest_transition(rules, now):
+    """
+    Returns the first instant after now at which any rule of a set changes.
+
+    Args:
+        rules (dict): Mapping of rule ID to compiled rule.
+        now (datetime.datetime): The current date and time.
+
+    Returns:
+        tuple: (datetime.datetime, set) with the transition and the IDs of
+            the rules that change at that instant, or (None, set()) if no
+            rule ever changes.
+    """
+    best = None
+    flipping = set()
+    for rule_id, rule in rules.items():
+        when = next_transition(rule, now)
+        if when is None or (best is not None and when > best):
+            continue
+        if when != best:
+            best = when
+            flipping = set()
+        flipping.add(rule_id)
+    return best, flipping
@@ -0,0 +1,102 @@
+"""
+NumPy batch evaluation of one compiled rule against many timestamps.
+
+The rule is projected onto the week line once (see weekline), and every
+timestamp is reduced to its microsecond-of-week position with integer array
+arithmetic, so a whole batch is answered by a single searchsorted over the
+rule's interval boundaries.
+
+Timestamps are UTC instants. A rule without a zone reads them on the UTC wall
+clock, a rule with a zone has them shifted by the zone's cached offset table.
+"""
+import functools
+
+import numpy as np
+
+from timezones import EPOCH_WEEKDAY, zone_offsets
+from weekline import MICROS_PER_DAY, MICROS_PER_SECOND, MICROS_PER_WEEK, boundaries
+
+
+def epoch_micros(timestamps):
+    """
+    Converts timestamps to int64 microseconds since the Unix epoch.
+
+    Args:
+        timestamps (numpy.ndarray): A datetime64 array (any unit, UTC), or an
+            integer array of seconds since the Unix epoch.
+    """
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        return timestamps.astype('datetime64[us]').astype(np.int64)
+    if np.issubdtype(timestamps.dtype, np.integer):
+        return timestamps.astype(np.int64) * MICROS_PER_SECOND
+    raise TypeError(f'unsupported timestamp dtype {timestamps.dtype}')
+
+
+def week_positions(timestamps, tz=None):
+    """
+    Converts timestamps to microsecond-of-week positions.
+
+    Args:
+        timestamps (numpy.ndarray): A datetime64 array (any unit, UTC), or an
+            integer array of seconds since the Unix epoch.
+        tz (str): IANA zone whose wall clock the positions are read on.
+
+    Returns:
+        numpy.ndarray: An int64 array of positions, 0 being Monday 00:00:00.
+
+    Examples:
+        >>> week_positions(np.array(['2024-06-04T00:00:01'], dtype='datetime64[s]'))
+        array([86401000000])
+    """
+    micros = epoch_micros(timestamps)
+    if tz is not None:
+        micros = micros + _utc_offsets(tz, micros // MICROS_PER_SECOND) * MICROS_PER_SECOND
+    return (micros + EPOCH_WEEKDAY * MICROS_PER_DAY) % MICROS_PER_WEEK
+
+
+def _utc_offsets(tz, seconds):
+    if not len(seconds):
+        return seconds
+    starts, offsets = zone_offsets(tz).transitions(int(seconds.min()), int(seconds.max()))
+    index = np.searchsorted(np.asarray(starts, dtype=np.int64), seconds, side='right') - 1
+    return np.asarray(offsets, dtype=np.int64)[index]
+
+
+@functools.lru_cache(maxsize=4096)
+def _rule_boundaries(rule):
+    return np.array(boundaries(rule.week_intervals()), dtype=np.int64)
+
+
+def evaluate_positions(rule, positions):
+    """
+    Evaluates a compiled rule against precomputed week positions.
+
+    Returns:
+        numpy.ndarray: A boolean mask, True where the rule matches.
+    """
+    index = np.searchsorted(_rule_boundaries(rule), positions, side='right')
+    return (index & 1).astype(bool)
+
+
+def evaluate_array(rule, timestamps):
+    """
+    Evaluates a compiled rule against an array of timestamps.
+
+    The result agrees with rule.matches() on the equivalent aware UTC
+    datetimes, not_operator and the rule's zone included.
+
+    Args:
+        rule (TimeRange or DayAndTimeRange): The compiled rule.
+        timestamps (numpy.ndarray): See week_positions.
+
+    Returns:
+        numpy.ndarray: A boolean mask, True where the rule matches.
+
+    Examples:
+        >>> from evaluate_timerange import TimeRange
+        >>> ts = np.array(['2024-06-04T10:30', '2024-06-04T09:30'], dtype='datetime64[m]')
+        >>> evaluate_array(TimeRange(36000, 39600), ts)
+        array([ True, False])
+    """
+    return evaluate_positions(rule, week_positions(timestamps, rule.tz))
@@ -0,0 +1,193 @@
+"""
+Helpers for the seconds-of-week line that compiled rules are projected onto.
+
+Positions on the line are integer microseconds since Monday 00:00:00, so the
+inclusive HH:MM:SS bounds of the evaluators stay exact for instants that carry
+a fractional second. Interval lists are sorted tuples of half-open
+(start, stop) pairs with no overlapping or touching neighbours.
+"""
+import bisect
+
+from rule_errors import InvalidResolutionError
+
+MICROS_PER_SECOND = 1_000_000
+SECONDS_PER_DAY = 86400
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+MICROS_PER_DAY = SECONDS_PER_DAY * MICROS_PER_SECOND
+MICROS_PER_WEEK = SECONDS_PER_WEEK * MICROS_PER_SECOND
+
+FULL_WEEK = ((0, MICROS_PER_WEEK),)
+
+# How far the current time is truncated before a rule compares it with its
+# bounds, in microseconds, per rule resolution
+RESOLUTIONS = {'minute': 60 * MICROS_PER_SECOND, 'second': MICROS_PER_SECOND, 'microsecond': 1}
+
+
+def week_position(now):
+    """
+    Returns the position of a datetime on the week line, in its own timezone.
+
+    Examples:
+        >>> import datetime
+        >>> week_position(datetime.datetime(2024, 6, 4, 0, 0, 1))
+        86401000000
+    """
+    return (now.weekday() * MICROS_PER_DAY
+            + (now.hour * 3600 + now.minute * 60 + now.second) * MICROS_PER_SECOND
+            + now.microsecond)
+
+
+def wall_micros(value):
+    """
+    Returns the microseconds from the start of ordinal day 0 to a datetime.
+
+    The datetime is read on its own wall clock, ignoring any tzinfo, so
+    positions of different days can be compared and subtracted.
+
+    Examples:
+        >>> import datetime
+        >>> wall_micros(datetime.datetime(1, 1, 1)) == MICROS_PER_DAY
+        True
+    """
+    return (value.toordinal() * MICROS_PER_DAY
+            + (value.hour * 3600 + value.minute * 60 + value.second) * MICROS_PER_SECOND
+            + value.microsecond)
+
+
+def resolution_step(resolution):
+    """
+    Returns the truncation step of a rule resolution in microseconds.
+
+    Raises:
+        InvalidResolutionError: If the resolution is not one of RESOLUTIONS.
+
+    Examples:
+        >>> resolution_step('second')
+        1000000
+    """
+    try:
+        return RESOLUTIONS[resolution]
+    except (KeyError, TypeError):
+        raise InvalidResolutionError(
+            'resolution', f'expected one of {", ".join(RESOLUTIONS)}, got {resolution!r}',
+            resolution) from None
+
+
+def truncated_window(start, end, resolution):
+    """
+    Returns the positions within a day that a rule's bounds accept.
+
+    A position is accepted when, truncated to the resolution, it lies
+    between the inclusive start and end seconds-of-day.
+
+    Returns:
+        tuple: The half-open (start, stop) microsecond window; it is empty
+            when no truncated time falls between the bounds.
+
+    Examples:
+        >>> truncated_window(10, 70, 'minute')
+        (60000000, 120000000)
+        >>> truncated_window(10, 70, 'microsecond')
+        (10000000, 70000001)
+    """
+    step = resolution_step(resolution)
+    first = -(-start * MICROS_PER_SECOND // step) * step
+    stop = (end * MICROS_PER_SECOND // step + 1) * step
+    return first, stop
+
+
+def merge_intervals(intervals):
+    """
+    Sorts intervals and merges the ones that overlap or touch.
+
+    Empty intervals are dropped.
+
+    Examples:
+        >>> merge_intervals([(5, 8), (0, 2), (2, 3), (4, 4)])
+        ((0, 3), (5, 8))
+    """
+    merged = []
+    for start, stop in sorted(intervals):
+        if start >= stop:
+            continue
+        if merged and start <= merged[-1][1]:
+            if stop > merged[-1][1]:
+                merged[-1][1] = stop
+        else:
+            merged.append([start, stop])
+    return tuple((start, stop) for start, stop in merged)
+
+
+def complement_intervals(intervals):
+    """
+    Returns the parts of the week not covered by a merged interval list.
+
+    Examples:
+        >>> complement_intervals(((0, 10), (20, 30)))[:2]
+        ((10, 20), (30, 604800000000))
+    """
+    result = []
+    position = 0
+    for start, stop in intervals:
+        if start > position:
+            result.append((position, start))
+        position = stop
+    if position < MICROS_PER_WEEK:
+        result.append((position, MICROS_PER_WEEK))
+    return tuple(result)
+
+
+def intersect_intervals(left, right):
+    """
+    Intersects two merged interval lists.
+
+    Examples:
+        >>> intersect_intervals(((0, 10), (20, 30)), ((5, 25),))
+        ((5, 10), (20, 25))
+    """
+    result = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        start = max(left[i][0], right[j][0])
+        stop = min(left[i][1], right[j][1])
+        if start < stop:
+            result.append((start, stop))
+        if left[i][1] < right[j][1]:
+            i += 1
+        else:
+            j += 1
+    return tuple(result)
+
+
+def boundaries(intervals):
+    """
+    Flattens a merged interval list into its sorted boundary positions.
+
+    A position is inside the intervals when bisect_right over the boundaries
+    returns an odd index.
+    """
+    return tuple(point for interval in intervals for point in interval)
+
+
+def contains(bounds, position):
+    """
+    Checks a week position against the output of boundaries().
+    """
+    return bisect.bisect_right(bounds, position) & 1 == 1
+
+
+def daily_intervals(day_windows):
+    """
+    Projects per-weekday windows onto the week line.
+
+    Args:
+        day_windows (callable): Takes a weekday (0-6) and returns half-open
+            (start, stop) microsecond windows within that day.
+
+    Returns:
+        tuple: The merged interval list.
+    """
+    return merge_intervals(
+        (weekday * MICROS_PER_DAY + start, weekday * MICROS_PER_DAY + stop)
+        for weekday in range(7)
+        for start, stop in day_windows(weekday))